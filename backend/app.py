@@ -1,40 +1,142 @@
 """
-Flask backend for Employee Onboarding Chatbot
+Quart (ASGI) backend for Employee Onboarding Chatbot
 Handles Azure OpenAI integration and function calling
 """
 
 import os
 import json
-from flask import Flask, request, jsonify
-from flask_cors import CORS
-from openai import AzureOpenAI
+import time
+import uuid
+import asyncio
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from quart import Quart, Response, request, jsonify
+from quart_cors import cors
+from openai import AsyncAzureOpenAI
 from dotenv import load_dotenv
 
-from mock_data import onboarding_faqs, mock_knowledge_base, mock_hr_policy
-from functions import FUNCTION_DEFINITIONS, ALL_TOOLS, FORMAT_RESPONSE_TOOL, execute_function
+from mock_data import (
+    onboarding_faqs, mock_knowledge_base, mock_hr_policy,
+    get_data_version, bump_data_version, get_employee_data_version,
+    get_directory_version, get_knowledge_version, bump_knowledge_version
+)
+from functions import TOOLS, FORMAT_TOOL_CHOICE, tool_registry, repository, employee_resolver
+from prompt_cache import PromptCache
+from session_store import create_session_store
+from context_manager import create_context_manager
+from streaming import sse_event, JSONStringFieldStreamer
+from intent_router import create_intent_router
+from knowledge_index import build_knowledge_chunks, create_knowledge_retriever
+from response_cache import create_response_cache
+from ingest import ENTITIES, ingest
+from greetings import GREETING_DAYS_THRESHOLD, build_greeting, batch_greetings, ndjson_lines, create_greeting_cache
+from tracing import create_tracer
+from llm_transport import create_http_client
+from token_usage import BUDGET_OK, BUDGET_HARD, create_usage_ledger, usage_counts, add_counts, empty_counts
+from context_manager import estimate_tokens, message_tokens
+from metrics import PROMETHEUS_CONTENT_TYPE
 
 # Load environment variables
 load_dotenv()
 
-# Initialize Flask app
-app = Flask(__name__)
-CORS(app)  # Enable CORS for React frontend
+# Initialize Quart app (Flask-compatible API, served over ASGI)
+app = Quart(__name__)
+app = cors(app, allow_origin="*")  # Enable CORS for React frontend
+
+# Pooled keep-alive transport with timeouts, retries and optional hedging (see llm_transport.py)
+llm_http_client, llm_transport = create_http_client()
 
-# Initialize Azure OpenAI client
-client = AzureOpenAI(
+# Initialize Azure OpenAI client - async, so waiting on the LLM never pins a worker
+client = AsyncAzureOpenAI(
     azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
     api_key=os.getenv("AZURE_OPENAI_API_KEY"),
     api_version="2024-07-01-preview",  # Use fixed version for stability
+    http_client=llm_http_client,  # its timeouts apply to every call
+    max_retries=0  # retries happen in llm_transport, which also honours retry-after-ms
 )
 
 DEPLOYMENT_NAME = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
 
+# Employee the chat is about when the user says "tôi"
+DEFAULT_EMPLOYEE_ID = os.getenv("DEFAULT_EMPLOYEE_ID", "E123")
+
+# Agent loop limits: tool-calling rounds per request, and a per-request deadline that
+# bounds every LLM call (retries included). The last AGENT_FORMAT_RESERVE_SECONDS are
+# kept for the forced format call, and a round only starts if it gets at least as long
+AGENT_MAX_STEPS = int(os.getenv("AGENT_MAX_STEPS", 3))
+AGENT_DEADLINE_SECONDS = float(os.getenv("AGENT_DEADLINE_SECONDS", 20))
+AGENT_FORMAT_RESERVE_SECONDS = float(os.getenv("AGENT_FORMAT_RESERVE_SECONDS", 5))
+ANSWER_MAX_TOKENS = 800
+
+# Cheaper turns for employees over their soft daily token budget (see token_usage.py):
+# one tool-calling round and shorter answers
+SOFT_BUDGET_MAX_STEPS = 1
+SOFT_BUDGET_MAX_TOKENS = 400
+
+# Stop reasons of completed answers - the only ones the response cache stores
+CACHEABLE_STOP_REASONS = {"answer", "format", "router"}
+
+# Token usage is flushed to TOKEN_USAGE_FILE this often
+TOKEN_USAGE_FLUSH_SECONDS = float(os.getenv("TOKEN_USAGE_FLUSH_SECONDS", 60))
+
+# Ask for a usage chunk at the end of streamed completions. Needs an api-version that
+# supports stream_options; without it, streamed calls are counted with estimated tokens
+STREAM_OPTIONS = {"stream_options": {"include_usage": True}} if os.getenv("STREAM_INCLUDE_USAGE", "false").lower() == "true" else {}
+
+# Bulk ingest: rows per transaction, and the largest accepted upload
+# (Quart's 16 MB default request limit is too small for full HR exports)
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", 1000))
+app.config["MAX_CONTENT_LENGTH"] = int(os.getenv("INGEST_MAX_BYTES", 512 * 1024 * 1024))
+
+# Per-request spans and latency histograms (/api/metrics), optional OTLP file export
+tracer = create_tracer()
+
+# Token usage per employee / tool path / day, and the daily budgets
+usage_ledger = create_usage_ledger()
+
+# Tool functions are synchronous - run them in a bounded pool off the event loop
+tool_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("TOOL_EXECUTOR_WORKERS", 8)),
+    thread_name_prefix="tool"
+)
+
+
+async def run_tool(func, *args):
+    """Run a synchronous tool function in the bounded tool executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(tool_executor, func, *args)
+
+
+async def call_tool(name, arguments):
+    """Validate and run one LLM tool call in the tool executor, with its timeout"""
+    with tracer.span("tool.execute", tool=name) as span:
+        result = await tool_registry.execute_async(name, arguments, run_tool)
+        if span is not None:
+            span.set(success=result.get("success", True) is not False)
+        return result
+
+
+async def execute_tool_calls(tool_calls):
+    """
+    Run all tool calls requested in one LLM response concurrently
+    
+    Args:
+        tool_calls: List of {"id", "name", "arguments"} dicts
+    
+    Returns:
+        list: Function results, in the same order as tool_calls
+    """
+    return await asyncio.gather(*(
+        call_tool(call["name"], call["arguments"])
+        for call in tool_calls
+    ))
+
 
 def create_system_prompt():
     """
     Create enhanced system prompt with few-shot examples and formatting guidelines
     """
-    base_prompt = """Bạn là Trợ lý Onboarding thông minh của FPT Software. Nhiệm vụ của bạn là hỗ trợ nhân viên mới trong quá trình onboarding một cách chủ động và hiệu quả.
+    parts = ["""Bạn là Trợ lý Onboarding thông minh của FPT Software. Nhiệm vụ của bạn là hỗ trợ nhân viên mới trong quá trình onboarding một cách chủ động và hiệu quả.
 
 ## Tính cách
 - Thân thiện, chuyên nghiệp, nhiệt tình
@@ -68,13 +170,13 @@ def create_system_prompt():
 
 ## Ví dụ FAQ
 
-"""
+"""]
     
     # Add few-shot examples from FAQ
     for i, faq in enumerate(onboarding_faqs[:4], 1):
-        base_prompt += f"**Q{i}:** {faq['q']}\n**A{i}:** {faq['a']}\n\n"
+        parts.append(f"**Q{i}:** {faq['q']}\n**A{i}:** {faq['a']}\n\n")
     
-    base_prompt += """
+    parts.append("""
 ## Ví dụ format phản hồi tốt
 
 **Danh sách nhiệm vụ:**
@@ -101,68 +203,12 @@ Bot: "Tuyệt vời! Em thấy nhiệm vụ **[T01] Hoàn thành khóa học Sec
 User: "Đúng rồi"
 Bot: [Gọi update_task_status] → [Gọi get_next_task] → Phản hồi với nhiệm vụ tiếp theo
 
-## Knowledge Base - IT Support
+## Knowledge Base
 
-"""
+Các mục Knowledge Base (IT Support, HR Systems, Office, HR Policy) liên quan đến câu hỏi hiện tại được cung cấp trong tin nhắn hệ thống ngay sau đây. Với câu hỏi về IT, HR và văn phòng, chỉ trả lời dựa trên các mục đó; nếu không có mục phù hợp → áp dụng quy tắc "Xử lý không biết".
+""")
     
-    # Add IT support knowledge
-    for item in mock_knowledge_base["it_support"]:
-        if "topic" in item:
-            base_prompt += f"\n**{item['topic']}:**\n"
-            for key, value in item.items():
-                if key != "topic":
-                    base_prompt += f"- {key.capitalize()}: {value}\n"
-    
-    base_prompt += "\n## Knowledge Base - HR Systems\n"
-    
-    # Add HR systems knowledge
-    for item in mock_knowledge_base["hr_systems"]:
-        base_prompt += f"\n**{item['name']}** ({item['system']}):\n"
-        base_prompt += f"- Link: {item['link']}\n"
-        base_prompt += f"- Mô tả: {item['description']}\n"
-        if "approval" in item:
-            base_prompt += f"- Phê duyệt: {item['approval']}\n"
-        if "deadline" in item:
-            base_prompt += f"- Deadline: {item['deadline']}\n"
-        if "availability" in item:
-            base_prompt += f"- Thời gian: {item['availability']}\n"
-    
-    base_prompt += "\n## Office Information\n"
-    
-    # Add office info
-    for office in mock_knowledge_base["office_info"]:
-        base_prompt += f"\n**{office['location']}:**\n"
-        base_prompt += f"- Địa chỉ: {office['address']}\n"
-        base_prompt += f"- Giờ làm việc: {office['working_hours']}\n"
-        base_prompt += f"- Parking: {office['parking']}\n"
-        base_prompt += f"- Canteen: {office['canteen']}\n"
-    
-    # ========== HR POLICY KNOWLEDGE BASE (Extended) ==========
-    base_prompt += "\n\n## HR Policy - Lương & Phúc lợi (Compensation & Benefits)\n"
-    for key, value in mock_hr_policy["compensation"].items():
-        base_prompt += f"- **{key}**: {value}\n"
-    
-    base_prompt += "\n**Phúc lợi (Benefits):**\n"
-    for key, value in mock_hr_policy["benefits"].items():
-        base_prompt += f"- **{key}**: {value}\n"
-    
-    base_prompt += "\n## HR Policy - Nghỉ phép & Chấm công (Leave & Time-Off)\n"
-    for key, value in mock_hr_policy["leave_policy"].items():
-        base_prompt += f"- **{key}**: {value}\n"
-    
-    base_prompt += "\n## HR Policy - Đào tạo & Phát triển (Training & Career)\n"
-    for key, value in mock_hr_policy["career"].items():
-        base_prompt += f"- **{key}**: {value}\n"
-    
-    base_prompt += "\n## HR Policy - Hệ thống Nội bộ (Internal Systems)\n"
-    for system, desc in mock_hr_policy["internal_systems"].items():
-        base_prompt += f"- **{system}**: {desc}\n"
-    
-    base_prompt += "\n## HR Policy - Chính sách Chi phí (Expense Policy)\n"
-    for key, value in mock_hr_policy["expense_policy"].items():
-        base_prompt += f"- **{key}**: {value}\n"
-    
-    base_prompt += """
+    parts.append("""
 
 ## Quy tắc Format Phản hồi (QUAN TRỌNG)
 
@@ -178,167 +224,1016 @@ Bot: [Gọi update_task_status] → [Gọi get_next_task] → Phản hồi với
 Suggestions phải NGẮN GỌN (< 50 ký tự) và HÀNH ĐỘNG được.
 
 Hãy áp dụng phong cách trên cho mọi phản hồi. Luôn nhớ XÁC NHẬN trước khi update task.
-"""
+""")
     
-    return base_prompt
+    return "".join(parts)
 
 
-@app.route('/api/chat', methods=['POST'])
-def chat():
+# Cache the system prompt - it only changes when the FAQ examples change
+prompt_cache = PromptCache(create_system_prompt, sources=lambda: onboarding_faqs)
+
+# Knowledge base index, built once at startup - only the chunks relevant to the
+# current message are sent to the LLM instead of the whole knowledge base
+knowledge_retriever = create_knowledge_retriever(
+    lambda: build_knowledge_chunks(mock_knowledge_base, mock_hr_policy)
+)
+
+# Server-side conversation history (memory or sqlite, see session_store.py)
+session_store = create_session_store()
+
+
+async def summarize_conversation(previous_summary, messages):
     """
-    Main chat endpoint
-    Receives message history and returns assistant response
+    Fold older conversation turns into a short running summary
+    Runs as a background task (see ContextManager.schedule_summary)
     """
-    try:
-        data = request.json
-        messages = data.get('messages', [])
-        
-        if not messages:
-            return jsonify({"error": "No messages provided"}), 400
-        
-        # Add system prompt if not present
-        if not messages or messages[0].get("role") != "system":
-            system_message = {
-                "role": "system",
-                "content": create_system_prompt()
-            }
-            messages.insert(0, system_message)
-        
-        # Step 1: Call Azure OpenAI with ALL tools (including format tool)
-        response = client.chat.completions.create(
+    lines = []
+    if previous_summary:
+        lines.append(f"Tóm tắt trước đó: {previous_summary}")
+    for message in messages:
+        for call in message.get("tool_calls") or []:
+            lines.append(f"assistant gọi {call['function']['name']}({call['function']['arguments']})")
+        if message.get("function_call"):
+            lines.append(f"assistant gọi {message['function_call']['name']}({message['function_call']['arguments']})")
+        elif message.get("content"):
+            lines.append(f"{message.get('name') or message['role']}: {message['content']}")
+    
+    with tracer.span("llm.summary"):
+        response = await client.chat.completions.create(
             model=DEPLOYMENT_NAME,
-            messages=messages,
-            functions=ALL_TOOLS,
-            function_call="auto",
-            temperature=0.7,
-            max_tokens=800
+            messages=[
+                {
+                    "role": "system",
+                    "content": "Tóm tắt ngắn gọn (tối đa 150 từ) cuộc hội thoại onboarding sau. "
+                               "Giữ lại tên, mã nhân viên, mã nhiệm vụ, trạng thái đã cập nhật và các yêu cầu còn dang dở."
+                },
+                {"role": "user", "content": "\n".join(lines)}
+            ],
+            temperature=0.3,
+            max_tokens=300
         )
+    usage_ledger.record(None, "summary", usage_counts(response.usage))
+    return response.choices[0].message.content or previous_summary
+
+
+# Token-budgeted history window with background summarization
+context_manager = create_context_manager(
+    summarizer=summarize_conversation,
+    store=session_store
+)
+
+
+def assistant_response(content, suggested_prompts=None):
+    """Build the assistant response payload returned to the frontend"""
+    return {
+        "role": "assistant",
+        "content": content,
+        "suggested_prompts": suggested_prompts or []
+    }
+
+
+def parse_format_response(function_args, fallback, trace):
+    """
+    Parse format_user_response arguments into an assistant response
+    Falls back to `fallback` (and marks the trace, see fallback_text()) if they are unusable
+    """
+    try:
+        format_data = json.loads(function_args)
+    except json.JSONDecodeError:
+        format_data = {}
+    if not format_data.get("main_answer"):
+        trace["fallback"] = True
+        return assistant_response(fallback)
+    return assistant_response(format_data["main_answer"], format_data.get("suggested_prompts", []))
+
+
+def fallback_text(content, fallback, trace):
+    """
+    The model's text, or a canned fallback when it sent none
+    Using the fallback is marked on the trace so the answer is never cached
+    """
+    if content:
+        return content
+    trace["fallback"] = True
+    return fallback
+
+
+def split_tool_calls(tool_calls):
+    """
+    Separate the format_user_response call from real function calls
+    
+    Returns:
+        tuple: (format_call or None, list of real tool calls)
+    """
+    format_call = None
+    real_calls = []
+    for call in tool_calls:
+        if call["name"] == "format_user_response":
+            format_call = call
+        else:
+            real_calls.append(call)
+    return format_call, real_calls
+
+
+def append_tool_results(messages, tool_calls, results):
+    """Add the assistant tool_calls message and one tool message per result"""
+    messages.append({
+        "role": "assistant",
+        "content": None,
+        "tool_calls": [
+            {
+                "id": call["id"],
+                "type": "function",
+                "function": {"name": call["name"], "arguments": call["arguments"]}
+            }
+            for call in tool_calls
+        ]
+    })
+    with tracer.span("json.tool_results", count=len(results)):
+        for call, result in zip(tool_calls, results):
+            messages.append({
+                "role": "tool",
+                "tool_call_id": call["id"],
+                "content": json.dumps(result, ensure_ascii=False)
+            })
+
+
+def resolve_employee_id(identifier):
+    """
+    Canonical ID of the employee a chat is about, checked through the employee resolver
+
+    Args:
+        identifier: Employee ID or name sent by the client (None means DEFAULT_EMPLOYEE_ID)
+
+    Returns:
+        str: Employee ID, or None if nobody matches
+    """
+    employee = employee_resolver.resolve(identifier or DEFAULT_EMPLOYEE_ID)
+    return employee["employee_id"] if employee else None
+
+
+def session_employee(session, identifier):
+    """
+    Employee of a session, fixed on its first turn
+
+    Later turns keep that employee whatever the client sends, so budgets,
+    routed answers and cached answers of a conversation all belong to one
+    employee and a session cannot switch to a fresh budget midway.
+
+    Returns:
+        str: Employee ID, or None if the first turn named an unknown employee
+    """
+    if not session.get("employee_id"):
+        session["employee_id"] = resolve_employee_id(identifier)
+    return session["employee_id"]
+
+
+def employee_note(employee_id):
+    """
+    System note telling the model who "tôi" is when it is not DEFAULT_EMPLOYEE_ID
+    (the tool descriptions tell it to use the default ID)
+    """
+    if employee_id == DEFAULT_EMPLOYEE_ID:
+        return None
+    return (f"Người dùng hiện tại là nhân viên {employee_id}. Khi người dùng nói 'tôi' hoặc "
+            f"'của tôi', hãy dùng mã nhân viên '{employee_id}' thay cho '{DEFAULT_EMPLOYEE_ID}'.")
+
+
+def with_employee_note(knowledge, employee_id):
+    """Append the employee note (if any) to the retrieved knowledge system message"""
+    note = employee_note(employee_id)
+    if note is None:
+        return knowledge
+    return f"{knowledge}\n\n{note}" if knowledge else note
+
+
+def new_agent_trace(employee_id):
+    """
+    Per-request record of the agent loop: step latencies, token usage and why it stopped
+    The loop limits are tightened here for employees over their soft token budget
+    """
+    budget = usage_ledger.budget_state(employee_id)
+    return {
+        "steps": [],
+        "stop_reason": None,
+        "fallback": False,
+        "max_steps": AGENT_MAX_STEPS if budget == BUDGET_OK else SOFT_BUDGET_MAX_STEPS,
+        "max_tokens": ANSWER_MAX_TOKENS if budget == BUDGET_OK else SOFT_BUDGET_MAX_TOKENS,
+        "deadline_seconds": AGENT_DEADLINE_SECONDS,
+        "employee_id": employee_id,
+        "budget": budget,
+        "usage": empty_counts()
+    }
+
+
+def tool_path(trace):
+    """Tools a turn went through, in first-call order (e.g. "update_task_status+get_next_task")"""
+    tools = dict.fromkeys(name for step in trace["steps"] for name in step["tools"])
+    return "+".join(tools) or "direct"
+
+
+def record_turn_usage(trace):
+    """Book a turn's LLM token usage for its employee and tool path"""
+    usage_ledger.record(trace["employee_id"], tool_path(trace), trace["usage"])
+
+
+def budget_exhausted_response(trace):
+    """Answer for an employee over the hard token budget when neither cache nor router could help"""
+    trace["stop_reason"] = "budget"
+    return assistant_response(
+        "Hôm nay anh đã dùng hết hạn mức trợ lý AI. Em vẫn có thể trả lời nhanh các câu hỏi "
+        "về nhiệm vụ, ngày phép, lịch họp team, buddy và quản lý của anh.",
+        ["Nhiệm vụ của tôi là gì?", "Tôi còn bao nhiêu ngày phép?", "Khi nào team tôi họp?"]
+    )
+
+
+def elapsed_ms(started):
+    return round((time.perf_counter() - started) * 1000, 2)
+
+
+def step_seconds(deadline):
+    """
+    Time a tool-calling round may take before the deadline, keeping the format
+    call's reserve; None if too little is left to start one
+    """
+    seconds = deadline - time.monotonic() - AGENT_FORMAT_RESERVE_SECONDS
+    return seconds if seconds >= AGENT_FORMAT_RESERVE_SECONDS else None
+
+
+def format_seconds(deadline):
+    """Time the forced format call may take: what is left, but at least the reserve"""
+    return max(deadline - time.monotonic(), AGENT_FORMAT_RESERVE_SECONDS)
+
+
+def timed_out_response(trace):
+    """Answer when even the forced format call missed the deadline"""
+    trace["stop_reason"] = "timeout"
+    return assistant_response(
+        "Xin lỗi, em chưa kịp tổng hợp câu trả lời. Anh vui lòng thử lại sau ít phút nhé."
+    )
+
+
+async def generate_response(messages, trace):
+    """
+    Run the bounded tool-calling loop for a conversation
+    
+    Each step lets the model call tools (executed concurrently) and see their
+    results, so chained workflows like update_task_status → get_next_task
+    finish in one request. The loop exits early when the model answers with
+    format_user_response; after trace["max_steps"] rounds (AGENT_MAX_STEPS, or
+    fewer over the soft token budget) or once too little of the deadline is
+    left for another round, one last call forces format_user_response. Every
+    call is cut off at the deadline (see step_seconds / format_seconds). Token
+    usage of every call is added to trace["usage"].
+    
+    Args:
+        messages: Full message list (system prompt first). Tool call and
+            tool result messages are appended to it in place.
+        trace: Dict from new_agent_trace(), filled with per-step latencies
+    
+    Returns:
+        dict: Assistant response with content and suggested_prompts
+    """
+    deadline = time.monotonic() + AGENT_DEADLINE_SECONDS
+    
+    for step in range(1, trace["max_steps"] + 1):
+        timeout = step_seconds(deadline)
+        if timeout is None:
+            trace["stop_reason"] = "deadline"
+            break
+        started = time.perf_counter()
+        try:
+            with tracer.span("llm.completion", step=step, tool_choice="auto"):
+                response = await asyncio.wait_for(client.chat.completions.create(
+                    model=DEPLOYMENT_NAME,
+                    messages=messages,
+                    tools=TOOLS,
+                    tool_choice="auto",
+                    temperature=0.7,
+                    max_tokens=trace["max_tokens"]
+                ), timeout)
+        except asyncio.TimeoutError:
+            trace["steps"].append({"step": step, "llm_ms": elapsed_ms(started), "tools": [], "timed_out": True})
+            trace["stop_reason"] = "deadline"
+            break
+        llm_ms = elapsed_ms(started)
+        add_counts(trace["usage"], usage_counts(response.usage))
         
         response_message = response.choices[0].message
+        tool_calls = [
+            {"id": call.id, "name": call.function.name, "arguments": call.function.arguments}
+            for call in response_message.tool_calls or []
+        ]
+        format_call, real_calls = split_tool_calls(tool_calls)
         
-        # Check if LLM wants to call a function
-        if response_message.function_call:
-            function_name = response_message.function_call.name
-            function_args = response_message.function_call.arguments
-            
-            # Case 1: Format tool - this is the final response
-            if function_name == "format_user_response":
-                try:
-                    format_data = json.loads(function_args)
-                    return jsonify({
-                        "success": True,
-                        "messages": messages,
-                        "response": {
-                            "role": "assistant",
-                            "content": format_data.get("main_answer", ""),
-                            "suggested_prompts": format_data.get("suggested_prompts", [])
-                        }
-                    })
-                except json.JSONDecodeError:
-                    # Fallback if format parsing fails
-                    return jsonify({
-                        "success": True,
-                        "messages": messages,
-                        "response": {
-                            "role": "assistant",
-                            "content": response_message.content or "Xin lỗi, có lỗi xảy ra.",
-                            "suggested_prompts": []
-                        }
-                    })
-            
-            # Case 2: Real function call (get_employee_info, update_task, etc.)
-            # Execute the function
-            function_result = execute_function(function_name, function_args)
-            
-            # Add assistant's function call to messages
-            messages.append({
-                "role": "assistant",
-                "content": None,
-                "function_call": {
-                    "name": function_name,
-                    "arguments": function_args
-                }
-            })
-            
-            # Add function result to messages
-            messages.append({
-                "role": "function",
-                "name": function_name,
-                "content": json.dumps(function_result, ensure_ascii=False)
-            })
-            
-            # Step 2: Call LLM again and FORCE it to use format tool
-            second_response = client.chat.completions.create(
+        # No tool call - should not happen with format tool, but handle it
+        if not tool_calls:
+            trace["steps"].append({"step": step, "llm_ms": llm_ms, "tools": []})
+            trace["stop_reason"] = "answer"
+            return assistant_response(fallback_text(response_message.content, "Xin chào!", trace))
+        
+        # Only the format tool - the model is done, this is the final response
+        if not real_calls:
+            trace["steps"].append({"step": step, "llm_ms": llm_ms, "tools": []})
+            trace["stop_reason"] = "format"
+            return parse_format_response(
+                format_call["arguments"],
+                response_message.content or "Xin lỗi, có lỗi xảy ra.",
+                trace
+            )
+        
+        # Real tool calls (get_employee_info, update_task, etc.)
+        # Execute all of them concurrently and send every result back at once
+        started = time.perf_counter()
+        results = await execute_tool_calls(real_calls)
+        trace["steps"].append({
+            "step": step,
+            "llm_ms": llm_ms,
+            "tools": [call["name"] for call in real_calls],
+            "tools_ms": elapsed_ms(started)
+        })
+        append_tool_results(messages, real_calls, results)
+    else:
+        trace["stop_reason"] = "max_steps"
+    
+    # Final step: FORCE the format tool
+    started = time.perf_counter()
+    try:
+        with tracer.span("llm.completion", step="format", tool_choice="format_user_response"):
+            final_response = await asyncio.wait_for(client.chat.completions.create(
                 model=DEPLOYMENT_NAME,
                 messages=messages,
-                functions=ALL_TOOLS,
-                function_call={"name": "format_user_response"},  # Force format tool
+                tools=TOOLS,
+                tool_choice=FORMAT_TOOL_CHOICE,  # Force format tool
                 temperature=0.7,
-                max_tokens=800
+                max_tokens=trace["max_tokens"]
+            ), format_seconds(deadline))
+    except asyncio.TimeoutError:
+        trace["steps"].append({"step": "format", "llm_ms": elapsed_ms(started), "tools": [], "timed_out": True})
+        return timed_out_response(trace)
+    add_counts(trace["usage"], usage_counts(final_response.usage))
+    trace["steps"].append({"step": "format", "llm_ms": elapsed_ms(started), "tools": []})
+    
+    final_message = final_response.choices[0].message
+    
+    # Parse format tool response
+    for call in final_message.tool_calls or []:
+        if call.function.name == "format_user_response":
+            return parse_format_response(
+                call.function.arguments,
+                final_message.content or "Đã xử lý xong.",
+                trace
             )
-            
-            final_message = second_response.choices[0].message
-            
-            # Parse format tool response
-            if final_message.function_call and final_message.function_call.name == "format_user_response":
-                try:
-                    format_data = json.loads(final_message.function_call.arguments)
-                    return jsonify({
-                        "success": True,
-                        "messages": messages,
-                        "response": {
-                            "role": "assistant",
-                            "content": format_data.get("main_answer", ""),
-                            "suggested_prompts": format_data.get("suggested_prompts", [])
-                        }
-                    })
-                except json.JSONDecodeError:
-                    pass
-            
-            # Fallback
+    
+    # Fallback
+    return assistant_response(fallback_text(final_message.content, "Đã xử lý xong.", trace))
+
+
+intent_router = create_intent_router()
+response_cache = create_response_cache()
+
+# Greetings per employee per day, rebuilt in the background after midnight
+greeting_cache = create_greeting_cache(get_employee_data_version)
+
+
+async def route_locally(user_message, messages, trace):
+    """
+    Answer a deterministic question without the LLM
+    
+    Calls the routed function directly and renders the intent's template.
+    The call and its result are appended to `messages` like a real tool call,
+    so later turns see the same history as an LLM-handled turn.
+    
+    Returns:
+        dict: Assistant response, or None to fall back to the LLM
+    """
+    route = intent_router.match(user_message, trace["employee_id"])
+    if route is None:
+        return None
+    
+    started = time.perf_counter()
+    arguments = json.dumps(route["arguments"], ensure_ascii=False)
+    result = await call_tool(route["function"], arguments)
+    rendered = intent_router.render(route, result)
+    if rendered is None:
+        return None
+    
+    call = {"id": f"call_router_{uuid.uuid4().hex[:12]}", "name": route["function"], "arguments": arguments}
+    append_tool_results(messages, [call], [result])
+    trace["steps"].append({
+        "step": "router",
+        "llm_ms": 0,
+        "tools": [route["function"]],
+        "tools_ms": elapsed_ms(started)
+    })
+    trace["stop_reason"] = "router"
+    trace["intent"] = route["intent"]
+    return assistant_response(*rendered)
+
+
+def conversation_context(history, summary=None):
+    """
+    What a follow-up message may refer to: the running summary and the last assistant answer
+
+    Args:
+        history: Conversation before the new user message (no system prompt)
+        summary: Session summary, if any
+    """
+    last_answer = next(
+        (m["content"] for m in reversed(history) if m.get("role") == "assistant" and m.get("content")),
+        None
+    )
+    return [summary, last_answer]
+
+
+def data_versions(employee_id):
+    """
+    Version stamps an employee's answers depend on: their own data, the shared
+    knowledge (knowledge base, policies, courses) and the employee directory
+    """
+    return [get_employee_data_version(employee_id), get_knowledge_version(), get_directory_version()]
+
+
+def lookup_cached_response(user_message, context, trace):
+    """
+    Check the response cache before doing any work for a turn
+
+    Args:
+        context: Conversation context from conversation_context()
+
+    Returns:
+        tuple: (cache key for storing the answer later, cached response or None)
+    """
+    # The key is taken before answering: if data changes meanwhile, the answer
+    # is stored under the old versions and never served
+    key = response_cache.key(user_message, trace["employee_id"], data_versions(trace["employee_id"]), context)
+    response = response_cache.get(key)
+    if response is not None:
+        trace["stop_reason"] = "cache"
+    return key, response
+
+
+def store_cached_response(key, response, trace):
+    """
+    Cache a turn's response if it is a completed answer
+
+    Budget, deadline, timeout and max-steps replies and canned fallbacks are
+    never cached, nor are turns whose tools changed data.
+    """
+    if trace["stop_reason"] not in CACHEABLE_STOP_REASONS or trace["fallback"]:
+        return
+    tools_called = [name for step in trace["steps"] for name in step["tools"]]
+    response_cache.put(key, response, tools_called)
+
+
+async def answer_turn(user_message, context, messages, trace):
+    """
+    Answer a user message from the response cache, the intent router, or the
+    agent loop - whichever is cheapest and applies
+
+    Args:
+        context: Conversation context from conversation_context()
+
+    Returns:
+        dict: Assistant response
+    """
+    key, response = lookup_cached_response(user_message, context, trace)
+    if response is not None:
+        tracer.annotate(answered_by="cache")
+        return response
+    response = await route_locally(user_message, messages, trace)
+    if response is None and trace["budget"] == BUDGET_HARD:
+        response = budget_exhausted_response(trace)
+    elif response is None:
+        response = await generate_response(messages, trace)
+        record_turn_usage(trace)
+    tracer.annotate(answered_by=trace["stop_reason"] if trace["stop_reason"] in ("router", "budget") else "llm")
+    store_cached_response(key, response, trace)
+    return response
+
+
+def start_turn(session, user_message):
+    """
+    Prepare the LLM window for a new user message in a session
+    (session_employee() must have fixed the session's employee)
+    
+    Returns:
+        tuple: (history, messages, context) - full history including the new
+            message, the budgeted LLM window, and the context report
+    """
+    # Build a new list so a failed turn never leaves a partial history behind
+    history = session["messages"] + [{"role": "user", "content": user_message}]
+    knowledge, knowledge_report = knowledge_retriever.retrieve(user_message)
+    knowledge = with_employee_note(knowledge, session["employee_id"])
+    messages, context = context_manager.build(prompt_cache.get(), history, session, knowledge)
+    context["knowledge"] = knowledge_report
+    return history, messages, context
+
+
+def finish_turn(session, history, new_messages, response, context):
+    """Store a completed turn and schedule summarization if the window overflowed"""
+    # Store history without the system prompt (re-injected on every turn)
+    history += new_messages
+    history.append({"role": "assistant", "content": response["content"]})
+    session["messages"] = history
+    session_store.save(session)
+    
+    if context["needs_summary"]:
+        context_manager.schedule_summary(session["session_id"])
+
+
+@app.route('/api/chat', methods=['POST'])
+@tracer.traced("/api/chat")
+async def chat():
+    """
+    Main chat endpoint
+    
+    Session mode: receives {"session_id", "message"} and keeps the history
+    server-side. A new session is issued when session_id is missing or expired.
+    
+    Legacy mode: receives the full {"messages"} history and echoes it back.
+    """
+    try:
+        data = await request.get_json() or {}
+        
+        if "message" not in data and "messages" in data:
+            return await chat_stateless(data.get('messages', []), data.get('employee_id'))
+        
+        user_message = (data.get('message') or '').strip()
+        if not user_message:
+            return jsonify({"error": "No message provided"}), 400
+        
+        session = session_store.get_or_create(data.get('session_id'))
+        employee_id = session_employee(session, data.get('employee_id'))
+        if employee_id is None:
+            return jsonify({"success": False, "error": "Employee not found"}), 404
+        with tracer.span("prompt.build"):
+            history, messages, context = start_turn(session, user_message)
+        
+        window_size = len(messages)
+        trace = new_agent_trace(employee_id)
+        cache_context = conversation_context(session["messages"], session.get("summary"))
+        response = await answer_turn(user_message, cache_context, messages, trace)
+        finish_turn(session, history, messages[window_size:], response, context)
+        
+        with tracer.span("json.response"):
             return jsonify({
                 "success": True,
-                "messages": messages,
-                "response": {
-                    "role": "assistant",
-                    "content": final_message.content or "Đã xử lý xong.",
-                    "suggested_prompts": []
-                }
+                "session_id": session["session_id"],
+                "response": response,
+                "context": context,
+                "agent": trace
             })
         
-        # No function call - should not happen with format tool, but handle it
+    except Exception as e:
+        print(f"Error in chat endpoint: {str(e)}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
+async def chat_stateless(messages, identifier):
+    """Handle a legacy request that carries the whole message history"""
+    if not messages:
+        return jsonify({"error": "No messages provided"}), 400
+    employee_id = resolve_employee_id(identifier)
+    if employee_id is None:
+        return jsonify({"success": False, "error": "Employee not found"}), 404
+    
+    # Add system prompt if not present
+    if messages[0].get("role") != "system":
+        messages.insert(0, {
+            "role": "system",
+            "content": prompt_cache.get()
+        })
+    
+    last_user = next((m.get("content") for m in reversed(messages) if m.get("role") == "user"), None)
+    with tracer.span("prompt.build"):
+        knowledge, knowledge_report = knowledge_retriever.retrieve(last_user)
+        knowledge = with_employee_note(knowledge, employee_id)
+        window, context = context_manager.build(messages[0]["content"], messages[1:], knowledge=knowledge)
+    context["knowledge"] = knowledge_report
+    window_size = len(window)
+    trace = new_agent_trace(employee_id)
+    if messages[-1].get("role") == "user":
+        response = await answer_turn(messages[-1].get("content"), conversation_context(messages[1:-1]), window, trace)
+    elif trace["budget"] == BUDGET_HARD:
+        response = budget_exhausted_response(trace)
+    else:
+        response = await generate_response(window, trace)
+        record_turn_usage(trace)
+    messages += window[window_size:]
+    
+    with tracer.span("json.response"):
         return jsonify({
             "success": True,
             "messages": messages,
-            "response": {
-                "role": "assistant",
-                "content": response_message.content or "Xin chào!",
-                "suggested_prompts": []
-            }
+            "response": response,
+            "context": context,
+            "agent": trace
         })
+
+
+@app.route('/api/session/<session_id>', methods=['DELETE'])
+async def delete_session(session_id):
+    """Discard a server-side conversation (e.g. when the user clears the chat)"""
+    deleted = session_store.delete(session_id)
+    return jsonify({
+        "success": True,
+        "deleted": deleted
+    })
+
+
+async def consume_stream(stream, streamed):
+    """
+    Read a streamed completion, forwarding main_answer text as it arrives
+    
+    Args:
+        stream: Async iterator of completion chunks
+        streamed: Dict filled with the tool_calls ({"id", "name", "arguments"})
+            and content of the full message once the stream is exhausted
+    
+    Yields:
+        tuple: ("token", {"text": ...}) events
+    """
+    calls = {}
+    content = []
+    answer_streamer = JSONStringFieldStreamer("main_answer")
+    streamed["usage"] = None
+    
+    async for chunk in stream:
+        # With STREAM_OPTIONS, the last chunk carries the usage and no choices
+        if getattr(chunk, "usage", None) is not None:
+            streamed["usage"] = chunk.usage
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
         
-    except Exception as e:
-        print(f"Error in chat endpoint: {str(e)}")
+        # Tool calls arrive interleaved, identified by their index
+        for tool_delta in delta.tool_calls or []:
+            call = calls.setdefault(tool_delta.index, {"id": None, "name": None, "arguments": []})
+            if tool_delta.id:
+                call["id"] = tool_delta.id
+            if not tool_delta.function:
+                continue
+            if tool_delta.function.name:
+                call["name"] = tool_delta.function.name
+            if tool_delta.function.arguments:
+                call["arguments"].append(tool_delta.function.arguments)
+                if call["name"] == "format_user_response":
+                    text = answer_streamer.feed(tool_delta.function.arguments)
+                    if text:
+                        yield "token", {"text": text}
+        
+        if delta.content:
+            content.append(delta.content)
+            yield "token", {"text": delta.content}
+    
+    streamed["tool_calls"] = [
+        {"id": call["id"], "name": call["name"], "arguments": "".join(call["arguments"])}
+        for _, call in sorted(calls.items())
+    ]
+    streamed["content"] = "".join(content)
+
+
+# Tool definitions are sent with every call; counted once for usage estimates
+TOOLS_TOKENS = estimate_tokens(json.dumps(TOOLS, ensure_ascii=False))
+
+
+def streamed_usage(messages, streamed):
+    """Token counts of a streamed call: the reported usage, or an estimate if none was sent"""
+    if streamed["usage"] is not None:
+        return usage_counts(streamed["usage"])
+    counts = usage_counts(None)
+    counts["prompt_tokens"] = TOOLS_TOKENS + sum(message_tokens(message) for message in messages)
+    counts["completion_tokens"] = estimate_tokens(streamed["content"]) + sum(
+        estimate_tokens(call["arguments"]) for call in streamed["tool_calls"]
+    )
+    counts["total_tokens"] = counts["prompt_tokens"] + counts["completion_tokens"]
+    return counts
+
+
+async def until_deadline(stream, deadline):
+    """
+    Iterate a streamed completion, raising asyncio.TimeoutError once `deadline`
+    (time.monotonic()) passes; the stream is closed either way
+    """
+    chunks = stream.__aiter__()
+    try:
+        while True:
+            try:
+                chunk = await asyncio.wait_for(chunks.__anext__(), max(deadline - time.monotonic(), 0))
+            except StopAsyncIteration:
+                return
+            yield chunk
+    finally:
+        await stream.close()
+
+
+async def timed_tool_call(call):
+    """Execute one tool call and measure its duration"""
+    started = time.perf_counter()
+    result = await call_tool(call["name"], call["arguments"])
+    return call, result, elapsed_ms(started)
+
+
+async def stream_response(messages, outcome, trace):
+    """
+    Streaming variant of generate_response()
+    
+    Yields (event, data) tuples and stores the final assistant response in
+    outcome["response"]. Tool call and tool result messages are appended
+    to `messages`; per-step latencies are recorded in `trace`. Each call,
+    including reading its stream, is cut off at the deadline like in
+    generate_response().
+    """
+    deadline = time.monotonic() + AGENT_DEADLINE_SECONDS
+    streamed = {}
+    
+    for step in range(1, trace["max_steps"] + 1):
+        timeout = step_seconds(deadline)
+        if timeout is None:
+            trace["stop_reason"] = "deadline"
+            break
+        started = time.perf_counter()
+        cutoff = time.monotonic() + timeout
+        try:
+            with tracer.span("llm.completion", step=step, tool_choice="auto", stream=True):
+                stream = await asyncio.wait_for(client.chat.completions.create(
+                    model=DEPLOYMENT_NAME,
+                    messages=messages,
+                    tools=TOOLS,
+                    tool_choice="auto",
+                    temperature=0.7,
+                    max_tokens=trace["max_tokens"],
+                    stream=True,
+                    **STREAM_OPTIONS
+                ), timeout)
+                async for event in consume_stream(until_deadline(stream, cutoff), streamed):
+                    yield event
+        except asyncio.TimeoutError:
+            trace["steps"].append({"step": step, "llm_ms": elapsed_ms(started), "tools": [], "timed_out": True})
+            trace["stop_reason"] = "deadline"
+            break
+        llm_ms = elapsed_ms(started)
+        add_counts(trace["usage"], streamed_usage(messages, streamed))
+        
+        format_call, real_calls = split_tool_calls(streamed["tool_calls"])
+        
+        if not streamed["tool_calls"]:
+            trace["steps"].append({"step": step, "llm_ms": llm_ms, "tools": []})
+            trace["stop_reason"] = "answer"
+            outcome["response"] = assistant_response(fallback_text(streamed["content"], "Xin chào!", trace))
+            return
+        
+        if not real_calls:
+            trace["steps"].append({"step": step, "llm_ms": llm_ms, "tools": []})
+            trace["stop_reason"] = "format"
+            outcome["response"] = parse_format_response(
+                format_call["arguments"], streamed["content"] or "Xin lỗi, có lỗi xảy ra.", trace
+            )
+            return
+        
+        # Real tool calls run concurrently - report progress as each one finishes
+        for call in real_calls:
+            yield "tool_started", {"step": step, "name": call["name"], "arguments": call["arguments"]}
+        started = time.perf_counter()
+        results = {}
+        for next_done in asyncio.as_completed([timed_tool_call(call) for call in real_calls]):
+            call, result, duration_ms = await next_done
+            results[call["id"]] = result
+            yield "tool_finished", {
+                "step": step,
+                "name": call["name"],
+                "success": result.get("success", True),
+                "duration_ms": duration_ms
+            }
+        trace["steps"].append({
+            "step": step,
+            "llm_ms": llm_ms,
+            "tools": [call["name"] for call in real_calls],
+            "tools_ms": elapsed_ms(started)
+        })
+        append_tool_results(messages, real_calls, [results[call["id"]] for call in real_calls])
+    else:
+        trace["stop_reason"] = "max_steps"
+    
+    started = time.perf_counter()
+    timeout = format_seconds(deadline)
+    cutoff = time.monotonic() + timeout
+    try:
+        with tracer.span("llm.completion", step="format", tool_choice="format_user_response", stream=True):
+            stream = await asyncio.wait_for(client.chat.completions.create(
+                model=DEPLOYMENT_NAME,
+                messages=messages,
+                tools=TOOLS,
+                tool_choice=FORMAT_TOOL_CHOICE,  # Force format tool
+                temperature=0.7,
+                max_tokens=trace["max_tokens"],
+                stream=True,
+                **STREAM_OPTIONS
+            ), timeout)
+            async for event in consume_stream(until_deadline(stream, cutoff), streamed):
+                yield event
+    except asyncio.TimeoutError:
+        trace["steps"].append({"step": "format", "llm_ms": elapsed_ms(started), "tools": [], "timed_out": True})
+        outcome["response"] = timed_out_response(trace)
+        yield "token", {"text": outcome["response"]["content"]}
+        return
+    add_counts(trace["usage"], streamed_usage(messages, streamed))
+    trace["steps"].append({"step": "format", "llm_ms": elapsed_ms(started), "tools": []})
+    
+    format_call, _ = split_tool_calls(streamed["tool_calls"])
+    if format_call:
+        outcome["response"] = parse_format_response(
+            format_call["arguments"], streamed["content"] or "Đã xử lý xong.", trace
+        )
+    else:
+        outcome["response"] = assistant_response(fallback_text(streamed["content"], "Đã xử lý xong.", trace))
+
+
+@app.route('/api/chat/stream', methods=['POST'])
+async def chat_stream():
+    """
+    Streaming chat endpoint (Server-Sent Events)
+    
+    Receives {"session_id", "message"} like /api/chat and emits:
+    session -> [tool_started -> tool_finished] -> token* -> suggested_prompts -> done
+    An "error" event is sent instead if the turn fails.
+    """
+    data = await request.get_json() or {}
+    user_message = (data.get('message') or '').strip()
+    if not user_message:
+        return jsonify({"error": "No message provided"}), 400
+    
+    session = session_store.get_or_create(data.get('session_id'))
+    employee_id = session_employee(session, data.get('employee_id'))
+    if employee_id is None:
+        return jsonify({"success": False, "error": "Employee not found"}), 404
+    
+    async def generate():
+        # The body runs after the handler has returned, so the trace is opened here
+        with tracer.request("/api/chat/stream") as root:
+            try:
+                yield sse_event("session", {"session_id": session["session_id"]})
+                
+                with tracer.span("prompt.build"):
+                    history, messages, context = start_turn(session, user_message)
+                window_size = len(messages)
+                
+                trace = new_agent_trace(employee_id)
+                cache_context = conversation_context(session["messages"], session.get("summary"))
+                cache_key, response = lookup_cached_response(user_message, cache_context, trace)
+                if response is None:
+                    response = await route_locally(user_message, messages, trace)
+                    if response is None and trace["budget"] == BUDGET_HARD:
+                        response = budget_exhausted_response(trace)
+                        yield sse_event("token", {"text": response["content"]})
+                    elif response is None:
+                        outcome = {}
+                        async for event, payload in stream_response(messages, outcome, trace):
+                            yield sse_event(event, payload)
+                        response = outcome["response"]
+                        record_turn_usage(trace)
+                    else:
+                        yield sse_event("token", {"text": response["content"]})
+                    store_cached_response(cache_key, response, trace)
+                else:
+                    yield sse_event("token", {"text": response["content"]})
+                tracer.annotate(answered_by=trace["stop_reason"] if trace["stop_reason"] in ("cache", "router", "budget") else "llm")
+                
+                finish_turn(session, history, messages[window_size:], response, context)
+                
+                yield sse_event("suggested_prompts", {
+                    "suggested_prompts": response["suggested_prompts"]
+                })
+                with tracer.span("json.response"):
+                    done = sse_event("done", {
+                        "content": response["content"],
+                        "context": context,
+                        "agent": trace
+                    })
+                yield done
+            except Exception as e:
+                print(f"Error in chat stream: {str(e)}")
+                if root is not None:
+                    # The 200 header is already sent; record the failed turn as a server error
+                    root.error = str(e) or type(e).__name__
+                    root.set(**{"http.status_code": 500})
+                yield sse_event("error", {"error": str(e)})
+    
+    response = Response(
+        generate(),
+        mimetype="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # Disable proxy buffering
+        }
+    )
+    response.timeout = None  # Long generations must not be cut off
+    return response
+
+
+@app.route('/api/knowledge-base/reload', methods=['POST'])
+async def reload_knowledge_base():
+    """
+    Pick up edits to the FAQ / knowledge base / HR policy data
+    Rebuilds the knowledge base index and the system prompt, and retires cached answers
+    """
+    knowledge_retriever.rebuild()
+    prompt_cache.invalidate()
+    bump_knowledge_version()
+    version = bump_data_version()
+    return jsonify({
+        "success": True,
+        "data_version": version
+    })
+
+
+@app.route('/api/ingest/<entity>', methods=['POST'])
+async def ingest_data(entity):
+    """
+    Bulk-load employees / tasks / leave balances / courses from a CSV or JSONL request body
+    The body is spooled to a temporary file chunk by chunk, then ingested in the tool pool
+    """
+    fmt = request.args.get("format", "csv")
+    if entity not in ENTITIES or fmt not in ("csv", "jsonl"):
         return jsonify({
             "success": False,
-            "error": str(e)
-        }), 500
+            "error": f"Unsupported entity or format: {entity}, {fmt}"
+        }), 400
+
+    with tempfile.TemporaryFile("w+b") as spool:
+        async for chunk in request.body:
+            spool.write(chunk)
+        spool.seek(0)
+
+        def run():
+            with open(spool.fileno(), encoding="utf-8-sig", newline="", closefd=False) as file:
+                return ingest(repository, entity, file, fmt, INGEST_BATCH_SIZE)
+
+        report = await run_tool(run)
+
+    return jsonify(dict(report, success=True))
+
+
+@app.route('/api/urgent-tasks', methods=['GET'])
+async def urgent_tasks():
+    """
+    Pending tasks of all employees due within ?days= days (default 2), earliest first
+    For HR dashboards; served from the due-date index, not a scan over all tasks
+    """
+    days = request.args.get("days", 2, type=int)
+    tasks = await run_tool(repository.get_all_urgent_tasks, days)
+    return jsonify({
+        "success": True,
+        "days_threshold": days,
+        "urgent_tasks": tasks,
+        "count": len(tasks)
+    })
+
+
+@app.route('/api/next-tasks', methods=['GET'])
+async def next_tasks():
+    """
+    An employee's next pending tasks, most urgent first (the "what's next" list)
+    Query: ?employee_id=E123&limit=3
+    """
+    from functions import get_next_task
+    
+    employee_id = request.args.get("employee_id", DEFAULT_EMPLOYEE_ID)
+    limit = request.args.get("limit", 3, type=int)
+    result = await run_tool(get_next_task, employee_id, max(limit, 1))
+    if not result.get("success"):
+        return jsonify(result), 404
+    result.setdefault("next_tasks", [result["next_task"]] if result["next_task"] else [])
+    return jsonify(result)
 
 
 @app.route('/api/greeting', methods=['POST'])
-def get_greeting():
+@tracer.traced("/api/greeting")
+async def get_greeting():
     """
     Generate proactive greeting for a specific employee
     Checks for urgent tasks and creates personalized welcome message
     """
     try:
-        data = request.json
+        data = await request.get_json() or {}
         employee_id = data.get('employee_id', 'E123')  # Default to E123
         
-        from functions import get_employee_info, check_urgent_tasks
+        # Welcome screen loads are served from the daily cache
+        greeting = greeting_cache.get(employee_id)
+        tracer.annotate(cache_hit=greeting is not None)
+        if greeting is not None:
+            with tracer.span("json.response"):
+                return jsonify(greeting)
+        
+        from functions import get_employee_info
         
         # Get employee info
-        emp_result = get_employee_info(employee_id)
+        with tracer.span("greeting.employee_lookup"):
+            emp_result = await run_tool(get_employee_info, employee_id)
         if not emp_result.get("success"):
             return jsonify({
                 "success": False,
@@ -346,36 +1241,24 @@ def get_greeting():
             }), 404
         
         employee = emp_result["data"]
-        name = employee["name"].split()[-1]  # Get first name
-        
-        # Check for urgent tasks
-        urgent_result = check_urgent_tasks(employee_id)
-        urgent_tasks = urgent_result.get("urgent_tasks", [])
-        
-        # Build greeting message
-        greeting = f"👋 Chào {name}! Em là Trợ lý Onboarding của FPT Software.\n\n"
-        
-        if urgent_tasks:
-            if len(urgent_tasks) == 1:
-                task = urgent_tasks[0]
-                days_text = "hôm nay" if task["days_left"] == 0 else f"trong {task['days_left']} ngày tới"
-                greeting += f"⚠️ Em thấy có **{task['task']}** sắp đến hạn {days_text}. "
-                greeting += "Anh nhớ hoàn thành nhé!\n\n"
-            else:
-                greeting += f"⚠️ Em thấy anh có **{len(urgent_tasks)} nhiệm vụ** sắp đến hạn. "
-                greeting += "Anh có muốn xem chi tiết không?\n\n"
+        resolved_id = employee["employee_id"]
+        greeting = greeting_cache.get(resolved_id) if resolved_id != employee_id else None
+        if greeting is not None:
+            tracer.annotate(cache_hit=True)
+            with tracer.span("json.response"):
+                return jsonify(greeting)
         
-        greeting += "Em có thể giúp gì cho anh hôm nay?"
+        # Check for urgent tasks, counted from the day the greeting is cached for
+        version = get_employee_data_version(resolved_id)
+        day = greeting_cache.today()
+        with tracer.span("greeting.urgent_tasks"):
+            urgent_tasks = await run_tool(repository.get_urgent_tasks, resolved_id, GREETING_DAYS_THRESHOLD, day)
+        with tracer.span("greeting.build"):
+            greeting = build_greeting(employee, urgent_tasks)
+        greeting_cache.put(resolved_id, greeting, version, day)
         
-        return jsonify({
-            "success": True,
-            "greeting": greeting,
-            "employee": {
-                "id": employee_id,
-                "name": employee["name"]
-            },
-            "urgent_tasks_count": len(urgent_tasks)
-        })
+        with tracer.span("json.response"):
+            return jsonify(greeting)
         
     except Exception as e:
         print(f"Error generating greeting: {str(e)}")
@@ -385,15 +1268,130 @@ def get_greeting():
         }), 500
 
 
+@app.route('/api/greetings/batch', methods=['POST'])
+async def get_greetings_batch():
+    """
+    Greetings for many employees in one call, streamed as NDJSON (one JSON object per line)
+    Body: {"employee_ids": [...]} and/or {"department": ...} / {"team_name": ...}
+    """
+    data = await request.get_json() or {}
+    employee_ids = data.get("employee_ids")
+    department = data.get("department")
+    team_name = data.get("team_name")
+    if employee_ids is None and not department and not team_name:
+        return jsonify({
+            "success": False,
+            "error": "Provide employee_ids, department or team_name"
+        }), 400
+    if employee_ids is not None and (
+            not isinstance(employee_ids, list) or not all(isinstance(eid, str) for eid in employee_ids)):
+        return jsonify({
+            "success": False,
+            "error": "employee_ids must be a list of strings"
+        }), 400
+
+    chunks = ndjson_lines(batch_greetings(repository, employee_ids, department, team_name, greeting_cache.today()))
+
+    async def generate():
+        # The repository is synchronous: pull each chunk of lines in the tool pool
+        while True:
+            chunk = await run_tool(next, chunks, None)
+            if chunk is None:
+                break
+            yield chunk
+
+    response = Response(generate(), mimetype="application/x-ndjson")
+    response.timeout = None
+    return response
+
+
+@app.route('/api/usage', methods=['GET'])
+async def token_usage():
+    """
+    LLM token usage grouped by day, employee and tool path
+    Query: ?days=7 (including today, default 1) and optional &employee_id=E123
+    """
+    days = request.args.get("days", 1, type=int)
+    employee_id = request.args.get("employee_id")
+    report = usage_ledger.report(days, employee_id)
+    report["budgets"] = {"soft": usage_ledger.soft_budget, "hard": usage_ledger.hard_budget}
+    if employee_id:
+        report["employee"] = {
+            "employee_id": employee_id,
+            "tokens_today": usage_ledger.tokens_today(employee_id),
+            "budget": usage_ledger.budget_state(employee_id)
+        }
+    return jsonify(dict(report, success=True))
+
+
+async def flush_token_usage_periodically():
+    """Append new token usage to TOKEN_USAGE_FILE every TOKEN_USAGE_FLUSH_SECONDS"""
+    while True:
+        await asyncio.sleep(TOKEN_USAGE_FLUSH_SECONDS)
+        try:
+            await run_tool(usage_ledger.flush)
+        except Exception as e:
+            print(f"Error flushing token usage: {str(e)}")
+
+
+async def regenerate_greetings_daily():
+    """Rebuild cached greetings right after each midnight, so mornings start with cache hits"""
+    while True:
+        await asyncio.sleep(greeting_cache.seconds_until_midnight() + 1)
+        try:
+            count = await run_tool(greeting_cache.regenerate, repository)
+            print(f"🌅 Regenerated {count} greetings for {greeting_cache.today()}")
+        except Exception as e:
+            print(f"Error regenerating greetings: {str(e)}")
+
+
+@app.before_serving
+async def start_background_jobs():
+    # Keep a reference so the task is not garbage collected while running
+    app.greeting_job = asyncio.get_running_loop().create_task(regenerate_greetings_daily())
+    app.usage_job = asyncio.get_running_loop().create_task(flush_token_usage_periodically())
+
+
+@app.after_serving
+async def stop_background_jobs():
+    app.greeting_job.cancel()
+    app.usage_job.cancel()
+    try:
+        usage_ledger.flush()
+    except OSError as e:
+        print(f"Error flushing token usage: {str(e)}")
+    await llm_http_client.aclose()
+
+
 @app.route('/api/health', methods=['GET'])
-def health():
+async def health():
     """Health check endpoint"""
     return jsonify({
         "status": "healthy",
-        "service": "Employee Onboarding Chatbot API"
+        "service": "Employee Onboarding Chatbot API",
+        "prompt_cache": prompt_cache.stats(),
+        "knowledge_base": knowledge_retriever.stats(),
+        "sessions": session_store.stats(),
+        "storage": repository.stats(),
+        "employee_resolver": employee_resolver.stats(),
+        "tools": tool_registry.stats(),
+        "tracing": tracer.stats(),
+        "token_usage": usage_ledger.stats(),
+        "llm_transport": llm_transport.stats(),
+        "router": intent_router.stats(),
+        "response_cache": dict(response_cache.stats(), data_version=get_data_version(),
+                                 knowledge_version=get_knowledge_version()),
+        "greeting_cache": greeting_cache.stats()
     })
 
 
+@app.route('/api/metrics', methods=['GET'])
+async def prometheus_metrics():
+    """Request, span and tool latency histograms in the Prometheus text format"""
+    lines = tracer.prometheus_lines() + tool_registry.prometheus_lines()
+    return Response("\n".join(lines) + "\n", content_type=PROMETHEUS_CONTENT_TYPE)
+
+
 if __name__ == '__main__':
     # Check for required environment variables
     required_vars = [
@@ -416,5 +1414,5 @@ if __name__ == '__main__':
     port = int(os.getenv('PORT', 5000))
     host = os.getenv('HOST', '0.0.0.0')
     
-    print(f"\n🚀 Starting Flask server on {host}:{port}")
+    print(f"\n🚀 Starting Quart server on {host}:{port}")
     app.run(debug=False, host=host, port=port)
@@ -0,0 +1,301 @@
+"""
+Offline stand-in for the Azure OpenAI chat completions API
+Replays scripted function calls / format_user_response answers with configurable latency
+
+Usage:
+    python benchmarks/fake_openai_server.py --port 8001 --latency lognormal:0.8,0.4
+    python benchmarks/fake_openai_server.py --port 8001 --error-rate 0.2 --retry-after 0.5
+
+Point the backend at it with:
+    AZURE_OPENAI_ENDPOINT=http://127.0.0.1:8001 AZURE_OPENAI_API_KEY=fake
+    AZURE_OPENAI_DEPLOYMENT_NAME=fake
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+
+from quart import Quart, Response, request, jsonify
+
+
+# Default script: rules whose keywords appear in the last user message decide
+# which functions the "model" calls ("then" chains a follow-up call after the
+# result comes back). Unmatched messages are answered directly with
+# format_user_response.
+DEFAULT_SCRIPT = [
+    {"match": ["hoàn thành", "xong", "done"], "function": "update_task_status",
+     "arguments": {"task_id": "T01", "new_status": "Done"},
+     "then": {"function": "get_next_task", "arguments": {"employee_identifier": "E123"}}},
+    {"match": ["phép", "leave"], "function": "get_leave_balance",
+     "arguments": {"employee_identifier": "E123"}},
+    {"match": ["nhiệm vụ", "task"], "function": "get_onboarding_tasks",
+     "arguments": {"employee_identifier": "E123"}},
+    {"match": ["họp", "meeting", "team"], "function": "get_team_meetings",
+     "arguments": {"employee_identifier": "E123"}},
+    {"match": ["khóa học", "course", "đào tạo"], "function": "search_training_courses",
+     "arguments": {"keyword": "React"}},
+    {"match": ["buddy", "manager", "quản lý"], "function": "get_employee_info",
+     "arguments": {"employee_identifier": "E123"}}
+]
+
+FORMAT_ANSWER = {
+    "main_answer": "Đây là câu trả lời mô phỏng từ **fake LLM** để đo hiệu năng. "
+                   "Nội dung đủ dài để giống một phản hồi thật với Markdown và emoji ✅.",
+    "suggested_prompts": [
+        "Nhiệm vụ của tôi là gì?",
+        "Tôi còn bao nhiêu ngày phép?",
+        "Khi nào có meeting?"
+    ]
+}
+
+
+class LatencyModel:
+    """
+    Samples per-call latency in seconds
+
+    Spec formats:
+        fixed:0.5
+        uniform:0.2,1.0
+        normal:0.8,0.2        (mean, stddev; clipped at 0)
+        lognormal:0.8,0.4     (median, sigma of the underlying normal)
+    """
+
+    def __init__(self, spec, seed=None):
+        self.spec = spec
+        self._random = random.Random(seed)
+        kind, _, params = spec.partition(":")
+        values = [float(v) for v in params.split(",")] if params else []
+        if kind == "fixed":
+            self._sample = lambda: values[0]
+        elif kind == "uniform":
+            self._sample = lambda: self._random.uniform(values[0], values[1])
+        elif kind == "normal":
+            self._sample = lambda: max(self._random.gauss(values[0], values[1]), 0.0)
+        elif kind == "lognormal":
+            mu = math.log(values[0])
+            self._sample = lambda: self._random.lognormvariate(mu, values[1])
+        else:
+            raise ValueError(f"Unknown latency model: {spec}")
+
+    def sample(self):
+        return self._sample()
+
+
+def estimate_tokens(text):
+    """Rough token count used for the usage block"""
+    return len((text or "").encode("utf-8")) // 4 + 1
+
+
+def last_message(messages, roles):
+    for message in reversed(messages):
+        if message.get("role") in roles:
+            return message
+    return None
+
+
+def tool_call_name(messages, tool_call_id):
+    """Find the function name of a tool call by its ID"""
+    for message in reversed(messages):
+        for call in message.get("tool_calls") or []:
+            if call.get("id") == tool_call_id:
+                return call["function"]["name"]
+    return None
+
+
+def plan_calls(body, script):
+    """
+    Decide which calls the scripted model makes for a request
+
+    Returns:
+        tuple: (calls, content) where calls is a list of (name, arguments) and
+            content is plain text for requests without tools (e.g. summaries)
+    """
+    tools = body.get("tools")
+    functions = body.get("functions") or [t["function"] for t in tools or []]
+    forced = body.get("function_call") or body.get("tool_choice")
+
+    if not functions:
+        return [], "Tóm tắt mô phỏng: người dùng hỏi về onboarding."
+
+    format_call = ("format_user_response", FORMAT_ANSWER)
+    if isinstance(forced, dict):
+        name = forced.get("name") or forced.get("function", {}).get("name")
+        return [(name, FORMAT_ANSWER if name == "format_user_response" else {})], None
+
+    # After a tool result the model formats the answer, unless a rule chains another call
+    last = last_message(body["messages"], ("user", "function", "tool"))
+    if last is None or last["role"] != "user":
+        called = last.get("name") if last else None
+        if last is not None and last["role"] == "tool":
+            called = tool_call_name(body["messages"], last.get("tool_call_id"))
+        for rule in script:
+            if rule.get("function") == called and rule.get("then"):
+                chained = rule["then"]
+                return [(chained["function"], chained.get("arguments", {}))], None
+        return [format_call], None
+
+    text = (last.get("content") or "").lower()
+    matches = [r for r in script if any(k in text for k in r["match"])]
+    if not matches:
+        return [format_call], None
+    # The tools API may call several functions at once; legacy functions only one
+    if not tools:
+        matches = matches[:1]
+    return [(r["function"], r.get("arguments", {})) for r in matches], None
+
+
+def build_message(calls, content, use_tools):
+    message = {"role": "assistant", "content": content}
+    if not calls:
+        return message, "stop"
+    if use_tools:
+        message["tool_calls"] = [
+            {
+                "id": f"call_{uuid.uuid4().hex[:12]}",
+                "type": "function",
+                "function": {"name": name, "arguments": json.dumps(args, ensure_ascii=False)}
+            }
+            for name, args in calls
+        ]
+        return message, "tool_calls"
+    name, args = calls[0]
+    message["function_call"] = {"name": name, "arguments": json.dumps(args, ensure_ascii=False)}
+    return message, "function_call"
+
+
+def create_app(latency, script, chunk_chars=12, token_interval=0.01, error_rate=0.0, retry_after=1.0):
+    app = Quart(__name__)
+    app.config["stats"] = {"requests": 0, "streamed": 0, "throttled": 0}
+    failures = random.Random(0)
+
+    @app.route("/openai/deployments/<deployment>/chat/completions", methods=["POST"])
+    @app.route("/v1/chat/completions", methods=["POST"])
+    async def chat_completions(deployment=None):
+        body = await request.get_json()
+        app.config["stats"]["requests"] += 1
+        # Simulated throttling, to exercise the backend's retry policy
+        if error_rate and failures.random() < error_rate:
+            app.config["stats"]["throttled"] += 1
+            response = jsonify({"error": {"code": "429", "message": "Rate limit exceeded (fake)"}})
+            response.status_code = 429
+            response.headers["retry-after-ms"] = str(int(retry_after * 1000))
+            response.headers["Retry-After"] = str(math.ceil(retry_after))
+            return response
+        use_tools = bool(body.get("tools"))
+        calls, content = plan_calls(body, script)
+        message, finish_reason = build_message(calls, content, use_tools)
+
+        prompt_text = json.dumps(body.get("messages", []), ensure_ascii=False)
+        completion_text = json.dumps(message, ensure_ascii=False)
+        usage = {
+            "prompt_tokens": estimate_tokens(prompt_text),
+            "completion_tokens": estimate_tokens(completion_text),
+            "total_tokens": estimate_tokens(prompt_text) + estimate_tokens(completion_text)
+        }
+        completion_id = f"chatcmpl-fake-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        model = deployment or body.get("model", "fake")
+
+        await asyncio.sleep(latency.sample())
+
+        if not body.get("stream"):
+            return jsonify({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                "usage": usage
+            })
+
+        app.config["stats"]["streamed"] += 1
+
+        def chunk(delta, finish=None):
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]
+            }
+            return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+        async def generate():
+            yield chunk({"role": "assistant", "content": None})
+            if message.get("content"):
+                for i in range(0, len(message["content"]), chunk_chars):
+                    yield chunk({"content": message["content"][i:i + chunk_chars]})
+                    await asyncio.sleep(token_interval)
+            for index, call in enumerate(message.get("tool_calls", [])):
+                arguments = call["function"]["arguments"]
+                yield chunk({"tool_calls": [{
+                    "index": index, "id": call["id"], "type": "function",
+                    "function": {"name": call["function"]["name"], "arguments": ""}
+                }]})
+                for i in range(0, len(arguments), chunk_chars):
+                    yield chunk({"tool_calls": [{
+                        "index": index, "function": {"arguments": arguments[i:i + chunk_chars]}
+                    }]})
+                    await asyncio.sleep(token_interval)
+            if message.get("function_call"):
+                arguments = message["function_call"]["arguments"]
+                yield chunk({"function_call": {"name": message["function_call"]["name"], "arguments": ""}})
+                for i in range(0, len(arguments), chunk_chars):
+                    yield chunk({"function_call": {"arguments": arguments[i:i + chunk_chars]}})
+                    await asyncio.sleep(token_interval)
+            yield chunk({}, finish_reason)
+            if (body.get("stream_options") or {}).get("include_usage"):
+                payload = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [],
+                    "usage": usage
+                }
+                yield f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return Response(generate(), mimetype="text/event-stream")
+
+    @app.route("/stats", methods=["GET"])
+    async def stats():
+        return jsonify(app.config["stats"])
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline fake Azure OpenAI server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", default="fixed:0.5",
+                        help="fixed:S | uniform:A,B | normal:MEAN,STD | lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for reproducible latencies")
+    parser.add_argument("--script", help="JSON file with rules replacing the default script")
+    parser.add_argument("--chunk-chars", type=int, default=12, help="Characters per streamed chunk")
+    parser.add_argument("--token-interval", type=float, default=0.01,
+                        help="Delay between streamed chunks in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Fraction of requests answered with 429 + Retry-After")
+    parser.add_argument("--retry-after", type=float, default=1.0,
+                        help="Seconds sent in the Retry-After headers of throttled requests")
+    args = parser.parse_args()
+
+    script = DEFAULT_SCRIPT
+    if args.script:
+        with open(args.script, encoding="utf-8") as f:
+            script = json.load(f)
+
+    app = create_app(LatencyModel(args.latency, args.seed), script,
+                     args.chunk_chars, args.token_interval, args.error_rate, args.retry_after)
+    print(f"🧪 Fake OpenAI server on http://{args.host}:{args.port} (latency {args.latency})")
+    app.run(host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+Micro-benchmarks for the in-memory lookup indexes
+Builds synthetic data at production scale and reports build time and per-lookup latency
+
+Usage:
+    python benchmarks/index_benchmark.py --employees 100000 --tasks 1000000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from name_index import EmployeeNameIndex  # noqa: E402
+from task_index import TaskIndex  # noqa: E402
+from due_index import DueDateIndex  # noqa: E402
+from priority_index import TaskPriorityIndex  # noqa: E402
+
+
+FAMILY_NAMES = ["Nguyễn", "Trần", "Lê", "Phạm", "Hoàng", "Huỳnh", "Phan", "Vũ", "Võ", "Đặng",
+                "Bùi", "Đỗ", "Hồ", "Ngô", "Dương", "Lý"]
+MIDDLE_NAMES = ["Văn", "Thị", "Hữu", "Đức", "Minh", "Ngọc", "Thanh", "Quang", "Xuân", "Hoài",
+                "Phú", "Gia", "Bảo", "Anh"]
+GIVEN_NAMES = ["An", "Bình", "Cường", "Dũng", "Em", "Giang", "Hùng", "Lan", "Quý", "Tâm",
+               "Thảo", "Trang", "Tuấn", "Vy", "Khoa", "Long", "Nam", "Phúc", "Quân", "Sơn",
+               "Thắng", "Trung", "Việt", "Yến", "Hà", "Hạnh", "Hiếu", "Hoa", "Huy", "Kiên"]
+
+# Every name lookup must stay under this at 100k+ employees
+NAME_LOOKUP_TARGET_MS = 1.0
+
+
+def synthetic_employees(count, rng):
+    return [
+        {
+            "employee_id": f"E{i:06d}",
+            "name": f"{rng.choice(FAMILY_NAMES)} {rng.choice(MIDDLE_NAMES)} "
+                    f"{rng.choice(MIDDLE_NAMES)} {rng.choice(GIVEN_NAMES)}"
+        }
+        for i in range(count)
+    ]
+
+
+def time_per_call(func, repeat):
+    """Average wall time of func() in milliseconds"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def best_time_per_call(func, repeat, rounds=5):
+    """Best of several time_per_call() rounds - the figure least skewed by other load on the machine"""
+    return min(time_per_call(func, repeat) for _ in range(rounds))
+
+
+def bench_names(count, repeat, rng):
+    employees = synthetic_employees(count, rng)
+    started = time.perf_counter()
+    index = EmployeeNameIndex(employees)
+    print(f"👤 Name index: {count} employees built in {time.perf_counter() - started:.2f}s")
+
+    sample = employees[count // 2]["name"]
+    queries = [
+        ("exact (with diacritics)", sample),
+        ("exact (unaccented)", "Nguyen Van Minh An"),
+        ("single token", "An"),
+        ("two common tokens", "Nguyen Van"),
+        ("typo", "Dang Phu Gia Quyy"),
+        ("typo + partial", "Nguyen Vn Ngoc")
+    ]
+    slow = []
+    for label, query in queries:
+        ms = best_time_per_call(lambda: index.search(query), repeat)
+        print(f"   {label:<26}{ms:>8.3f} ms   {query!r}")
+        if ms >= NAME_LOOKUP_TARGET_MS:
+            slow.append(f"{label} ({ms:.3f} ms)")
+    assert not slow, f"name lookups over the {NAME_LOOKUP_TARGET_MS} ms target: {', '.join(slow)}"
+
+
+def synthetic_tasks(count, tasks_per_employee, rng):
+    """{employee_id: [task, ...]} with globally unique task IDs"""
+    tasks_by_employee = {}
+    for i in range(count):
+        employee_id = f"E{i // tasks_per_employee:06d}"
+        tasks_by_employee.setdefault(employee_id, []).append({
+            "task_id": f"T{i:07d}",
+            "task": f"Onboarding task {i}",
+            "status": rng.choice(["Pending", "Done"]),
+            "due_date": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "priority": rng.choice(["High", "Medium", "Low"])
+        })
+    return tasks_by_employee
+
+
+def scan_for_task(tasks_by_employee, task_id):
+    """The previous update_task_status_in_db lookup: walk every employee's tasks"""
+    for employee_id, tasks in tasks_by_employee.items():
+        for task in tasks:
+            if task["task_id"] == task_id:
+                return employee_id, task
+    return None
+
+
+def bench_tasks(count, tasks_per_employee, repeat, rng):
+    tasks_by_employee = synthetic_tasks(count, tasks_per_employee, rng)
+    started = time.perf_counter()
+    index = TaskIndex(tasks_by_employee)
+    print(f"📋 Task index: {count} tasks built in {time.perf_counter() - started:.2f}s")
+
+    task_ids = [f"T{rng.randrange(count):07d}" for _ in range(repeat)]
+    scans = task_ids[:max(repeat // 20, 5)]  # a full scan is slow - sample fewer
+
+    started = time.perf_counter()
+    for task_id in scans:
+        scan_for_task(tasks_by_employee, task_id)
+    scan_ms = (time.perf_counter() - started) / len(scans) * 1000
+
+    started = time.perf_counter()
+    for task_id in task_ids:
+        index.get(task_id)
+    index_ms = (time.perf_counter() - started) / len(task_ids) * 1000
+
+    started = time.perf_counter()
+    for i in range(repeat):
+        index.insert("E_BENCH", {"task_id": f"B{i}", "status": "Pending"})
+    for i in range(repeat):
+        index.delete(f"B{i}")
+    write_ms = (time.perf_counter() - started) / (2 * repeat) * 1000
+
+    print(f"   {'lookup (full scan)':<26}{scan_ms:>8.3f} ms")
+    print(f"   {'lookup (index)':<26}{index_ms:>8.4f} ms")
+    print(f"   {'insert / delete (index)':<26}{write_ms:>8.4f} ms")
+
+
+def scan_urgent_tasks(tasks, days_threshold=2):
+    """The previous get_urgent_tasks: parse every pending task's due date and copy matches"""
+    today = datetime.now()
+    threshold_date = today + timedelta(days=days_threshold)
+    urgent_tasks = []
+    for task in tasks:
+        if task["status"] == "Pending":
+            try:
+                due_date = datetime.strptime(task["due_date"], "%Y-%m-%d")
+                if today <= due_date <= threshold_date:
+                    task_with_urgency = task.copy()
+                    task_with_urgency["days_left"] = (due_date - today).days
+                    urgent_tasks.append(task_with_urgency)
+            except ValueError:
+                continue
+    return urgent_tasks
+
+
+def bench_due_dates(count, tasks_per_employee, repeat, rng):
+    tasks_by_employee = synthetic_tasks(count, tasks_per_employee, rng)
+    # Spread due dates around today so range queries return something
+    for tasks in tasks_by_employee.values():
+        for task in tasks:
+            task["due_date"] = (date.today() + timedelta(days=rng.randint(-30, 30))).isoformat()
+    started = time.perf_counter()
+    index = DueDateIndex(tasks_by_employee)
+    print(f"📅 Due-date index: {len(index)} pending tasks built in {time.perf_counter() - started:.2f}s")
+
+    all_tasks = [task for tasks in tasks_by_employee.values() for task in tasks]
+    employee_ids = list(tasks_by_employee)
+    today = date.today().toordinal()
+    employee_id = employee_ids[len(employee_ids) // 2]
+    results = [
+        ("employee (scan)", lambda: scan_urgent_tasks(tasks_by_employee[employee_id]), repeat),
+        ("employee (index)", lambda: index.due(employee_id, today + 1, today + 2), repeat),
+        ("company-wide (scan)", lambda: scan_urgent_tasks(all_tasks), 3),
+        ("company-wide (index)", lambda: index.due_all(today + 1, today + 2), max(repeat // 20, 5))
+    ]
+    for label, func, calls in results:
+        print(f"   {label:<26}{time_per_call(func, calls):>8.4f} ms")
+
+
+def sort_for_next_task(tasks):
+    """The previous get_next_task: filter pending tasks and sort them all to take the first"""
+    priority_order = {"High": 0, "Medium": 1, "Low": 2}
+    pending_tasks = [t for t in tasks if t["status"] == "Pending"]
+    return sorted(pending_tasks, key=lambda t: (priority_order.get(t["priority"], 3), t["due_date"]))[:1]
+
+
+def bench_next_tasks(count, tasks_per_employee, repeat, rng):
+    tasks_by_employee = synthetic_tasks(count, tasks_per_employee, rng)
+    started = time.perf_counter()
+    index = TaskPriorityIndex(tasks_by_employee)
+    print(f"🎯 Priority index: {len(index)} pending tasks built in {time.perf_counter() - started:.2f}s")
+
+    employee_id = next(iter(tasks_by_employee))
+    tasks = tasks_by_employee[employee_id]
+    task = tasks[0]
+    statuses = ["Done", "Pending"]
+
+    def update_then_next():
+        task["status"] = statuses[0] if task["status"] == statuses[1] else statuses[1]
+        index.update(employee_id, task)
+        return index.top(employee_id)
+
+    results = [
+        ("next task (filter + sort)", lambda: sort_for_next_task(tasks)),
+        ("next task (index)", lambda: index.top(employee_id)),
+        ("top 5 (index)", lambda: index.top(employee_id, 5)),
+        ("status update + next", update_then_next)
+    ]
+    for label, func in results:
+        print(f"   {label:<26}{time_per_call(func, repeat):>8.4f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the in-memory lookup indexes")
+    parser.add_argument("--employees", type=int, default=100000)
+    parser.add_argument("--tasks", type=int, default=1000000)
+    parser.add_argument("--tasks-per-employee", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=200, help="Lookups per query")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    bench_names(args.employees, args.repeat, rng)
+    bench_tasks(args.tasks, args.tasks_per_employee, args.repeat, rng)
+    bench_due_dates(args.tasks, args.tasks_per_employee, args.repeat, rng)
+    bench_next_tasks(args.tasks, args.tasks_per_employee, args.repeat, rng)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""
+Load-test harness for /api/chat and /api/greeting
+Reports p50/p95/p99 latency, requests per second and bytes per request
+
+Fully offline run (starts the fake LLM and the backend itself):
+    python benchmarks/load_test.py --spawn --concurrency 1,8,32 --requests 200
+
+Against an already running backend:
+    python benchmarks/load_test.py --base-url http://localhost:5000
+
+Regression gate (exit code 1 if p95 or throughput regress by more than 15%):
+    python benchmarks/load_test.py --spawn --output current.json --baseline baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHAT_PROMPTS = [
+    "Nhiệm vụ của tôi là gì?",
+    "Tôi còn bao nhiêu ngày phép?",
+    "Khi nào team tôi có meeting?",
+    "Có khóa học React nào không?",
+    "Buddy của tôi là ai?",
+    "Giờ làm việc của công ty là gì?"
+]
+
+EMPLOYEE_IDS = ["E123", "E456", "E789"]
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = max(int(round(pct / 100 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+class ChatUser:
+    """Virtual user holding one server-side session for a number of turns"""
+
+    def __init__(self, user_index, turns):
+        self.turn = 0
+        self.turns = turns
+        self.session_id = None
+        self.offset = user_index
+
+    def next_request(self):
+        if self.turn >= self.turns:
+            self.turn = 0
+            self.session_id = None
+        prompt = CHAT_PROMPTS[(self.offset + self.turn) % len(CHAT_PROMPTS)]
+        self.turn += 1
+        return "/api/chat", {"message": prompt, "session_id": self.session_id}
+
+    def on_response(self, data):
+        self.session_id = data.get("session_id", self.session_id)
+
+
+class GreetingUser:
+    def __init__(self, user_index, turns=None):
+        self.count = user_index
+
+    def next_request(self):
+        self.count += 1
+        return "/api/greeting", {"employee_id": EMPLOYEE_IDS[self.count % len(EMPLOYEE_IDS)]}
+
+    def on_response(self, data):
+        pass
+
+
+USER_TYPES = {"chat": ChatUser, "greeting": GreetingUser}
+
+
+async def run_level(base_url, endpoint, concurrency, total_requests, turns, timeout):
+    """
+    Drive one endpoint at a fixed concurrency
+
+    Returns:
+        dict: Latency percentiles (ms), throughput and byte counts
+    """
+    latencies = []
+    request_bytes = []
+    response_bytes = []
+    errors = 0
+    remaining = total_requests
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as http:
+
+        async def worker(user):
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                path, payload = user.next_request()
+                body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                started = time.perf_counter()
+                try:
+                    response = await http.post(
+                        path, content=body, headers={"Content-Type": "application/json"}
+                    )
+                    elapsed = time.perf_counter() - started
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                if response.status_code != 200:
+                    errors += 1
+                    continue
+                latencies.append(elapsed)
+                request_bytes.append(len(body))
+                response_bytes.append(len(response.content))
+                user.on_response(response.json())
+
+        users = [USER_TYPES[endpoint](i, turns) for i in range(concurrency)]
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(user) for user in users))
+        wall_time = time.perf_counter() - started
+
+    latencies.sort()
+    ok = len(latencies)
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": ok,
+        "errors": errors,
+        "wall_time_s": round(wall_time, 3),
+        "rps": round(ok / wall_time, 2) if wall_time else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "request_bytes_avg": round(sum(request_bytes) / ok, 1) if ok else 0.0,
+        "response_bytes_avg": round(sum(response_bytes) / ok, 1) if ok else 0.0
+    }
+
+
+def print_table(results):
+    header = f"{'endpoint':<10}{'conc':>6}{'ok':>7}{'err':>5}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req B':>9}{'resp B':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['endpoint']:<10}{r['concurrency']:>6}{r['requests']:>7}{r['errors']:>5}"
+              f"{r['rps']:>10}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}"
+              f"{r['request_bytes_avg']:>9}{r['response_bytes_avg']:>9}")
+
+
+def compare_to_baseline(results, baseline, max_regression):
+    """
+    Compare results against a previous run
+
+    Returns:
+        list: Human-readable regression descriptions (empty if none)
+    """
+    previous = {(r["endpoint"], r["concurrency"]): r for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        base = previous.get((r["endpoint"], r["concurrency"]))
+        if not base:
+            continue
+        key = f"{r['endpoint']}@{r['concurrency']}"
+        if base["p95_ms"] and r["p95_ms"] > base["p95_ms"] * (1 + max_regression):
+            regressions.append(f"{key}: p95 {base['p95_ms']}ms -> {r['p95_ms']}ms")
+        if base["rps"] and r["rps"] < base["rps"] * (1 - max_regression):
+            regressions.append(f"{key}: rps {base['rps']} -> {r['rps']}")
+        if r["errors"] > base["errors"]:
+            regressions.append(f"{key}: errors {base['errors']} -> {r['errors']}")
+    return regressions
+
+
+def wait_until_ready(url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Service at {url} did not become ready")
+
+
+def spawn_services(args):
+    """Start the fake LLM server and the backend as subprocesses"""
+    fake_url = f"http://127.0.0.1:{args.fake_port}"
+    fake = subprocess.Popen(
+        [sys.executable, os.path.join(BACKEND_DIR, "benchmarks", "fake_openai_server.py"),
+         "--port", str(args.fake_port), "--latency", args.latency, "--seed", "42"],
+        cwd=BACKEND_DIR
+    )
+    env = dict(
+        os.environ,
+        AZURE_OPENAI_ENDPOINT=fake_url,
+        AZURE_OPENAI_API_KEY="fake",
+        AZURE_OPENAI_DEPLOYMENT_NAME="fake"
+    )
+    backend = subprocess.Popen(
+        [sys.executable, "-m", "hypercorn", "app:app", "--bind", f"127.0.0.1:{args.backend_port}"],
+        cwd=BACKEND_DIR,
+        env=env
+    )
+    processes = [fake, backend]
+    try:
+        wait_until_ready(f"{fake_url}/stats")
+        wait_until_ready(f"http://127.0.0.1:{args.backend_port}/api/health")
+    except Exception:
+        for process in processes:
+            process.terminate()
+        raise
+    return processes
+
+
+async def run_all(args):
+    results = []
+    for endpoint in args.endpoints.split(","):
+        for concurrency in (int(c) for c in args.concurrency.split(",")):
+            result = await run_level(args.base_url, endpoint, concurrency,
+                                     args.requests, args.turns, args.timeout)
+            results.append(result)
+            print(f"  {endpoint} @ {concurrency}: {result['rps']} rps, p95 {result['p95_ms']} ms")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test /api/chat and /api/greeting")
+    parser.add_argument("--base-url", default="http://127.0.0.1:5050")
+    parser.add_argument("--endpoints", default="chat,greeting")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+    parser.add_argument("--turns", type=int, default=5, help="Chat turns per session before restarting")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--spawn", action="store_true", help="Start the fake LLM and backend locally")
+    parser.add_argument("--latency", default="lognormal:0.3,0.3", help="Fake LLM latency model (with --spawn)")
+    parser.add_argument("--fake-port", type=int, default=8001)
+    parser.add_argument("--backend-port", type=int, default=5050)
+    parser.add_argument("--output", help="Write results as JSON")
+    parser.add_argument("--baseline", help="Previous results JSON to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.15,
+                        help="Allowed relative regression of p95 / rps (default 0.15)")
+    args = parser.parse_args()
+
+    processes = []
+    if args.spawn:
+        args.base_url = f"http://127.0.0.1:{args.backend_port}"
+        processes = spawn_services(args)
+
+    try:
+        print(f"🏁 Load test against {args.base_url}")
+        results = asyncio.run(run_all(args))
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+    print()
+    print_table(results)
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "latency_model": args.latency if args.spawn else None,
+        "results": results
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.max_regression)
+        if regressions:
+            print("\n❌ Performance regressions:")
+            for line in regressions:
+                print(f"   - {line}")
+            sys.exit(1)
+        print("\n✅ No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Context window management for long conversations
+Keeps the prompt sent to the LLM within a token budget
+"""
+
+import asyncio
+import os
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken is optional
+    _ENCODING = None
+
+
+# Per-message overhead of the chat format (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Older function results are cut down to this many characters
+COLLAPSED_FUNCTION_CHARS = 200
+
+
+def estimate_tokens(text):
+    """
+    Estimate the number of tokens in a string
+
+    Uses tiktoken when installed, otherwise ~4 UTF-8 bytes per token
+    (Vietnamese diacritics take 2-3 bytes, which tracks the tokenizer reasonably).
+    """
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    return len(text.encode("utf-8")) // 4 + 1
+
+
+def message_tokens(message):
+    """Estimate the tokens used by one chat message"""
+    tokens = MESSAGE_OVERHEAD_TOKENS + estimate_tokens(message.get("content"))
+    function_calls = [call["function"] for call in message.get("tool_calls") or []]
+    if message.get("function_call"):
+        function_calls.append(message["function_call"])
+    for function_call in function_calls:
+        tokens += estimate_tokens(function_call.get("name"))
+        tokens += estimate_tokens(function_call.get("arguments"))
+    return tokens
+
+
+def split_turns(history):
+    """
+    Group a message history into turns
+
+    A turn starts at a user message and includes the tool calls, tool results
+    and assistant answer that follow it, so trimming never separates a tool
+    call from its result.
+    """
+    turns = []
+    for message in history:
+        if message.get("role") == "user" or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def collapse_function_message(message):
+    """Shorten an old tool/function result, keeping a short preview of its content"""
+    content = message.get("content") or ""
+    if message.get("role") not in ("tool", "function") or len(content) <= COLLAPSED_FUNCTION_CHARS:
+        return message
+    collapsed = dict(message)
+    collapsed["content"] = content[:COLLAPSED_FUNCTION_CHARS] + "... (đã rút gọn)"
+    return collapsed
+
+
+class ContextManager:
+    """
+    Builds the message window sent to the LLM
+
+    - The system prompt and the most recent turns are always kept verbatim
+    - Function results in older turns are collapsed to a short preview
+    - If the window is still over budget, the oldest turns are dropped and
+      folded into a running summary, computed in a background task after
+      the response has been sent
+    """
+
+    def __init__(self, token_budget=8000, keep_turns=3, summarizer=None, store=None):
+        """
+        Args:
+            token_budget: Maximum estimated prompt tokens per LLM call
+            keep_turns: Number of recent turns always kept verbatim
+            summarizer: Coroutine function (previous_summary, messages) -> summary text
+            store: Session store the background summaries are written to
+        """
+        self.token_budget = token_budget
+        self.keep_turns = keep_turns
+        self.summarizer = summarizer
+        self.store = store
+        self._pending = {}
+
+    def build(self, system_prompt, history, session=None, knowledge=None):
+        """
+        Build the LLM message list for a conversation
+
+        Args:
+            system_prompt: System prompt text
+            history: Conversation history without the system prompt
+            session: Session dict holding "summary" / "summary_upto" (optional)
+            knowledge: Retrieved knowledge base text for this turn (optional),
+                sent as a second system message so the system prompt stays a
+                stable prefix
+
+        Returns:
+            tuple: (messages, report) where report holds the token accounting
+        """
+        summary = session.get("summary") if session else None
+        summary_upto = session.get("summary_upto", 0) if session else 0
+
+        prefix = [{"role": "system", "content": system_prompt}]
+        if knowledge:
+            prefix.append({"role": "system", "content": knowledge})
+        full_tokens = sum(message_tokens(m) for m in prefix) + sum(message_tokens(m) for m in history)
+
+        if summary:
+            prefix.append({
+                "role": "system",
+                "content": f"Tóm tắt cuộc hội thoại trước đó:\n{summary}"
+            })
+
+        turns = split_turns(history[summary_upto:])
+        recent = turns[-self.keep_turns:] if self.keep_turns else []
+        older = turns[:len(turns) - len(recent)]
+        older = [[collapse_function_message(m) for m in turn] for turn in older]
+
+        used = sum(message_tokens(m) for m in prefix)
+        used += sum(message_tokens(m) for turn in recent for m in turn)
+
+        # Keep as many of the newest older turns as still fit the budget
+        kept = []
+        dropped_turns = 0
+        for index in range(len(older) - 1, -1, -1):
+            turn_tokens = sum(message_tokens(m) for m in older[index])
+            if used + turn_tokens > self.token_budget:
+                dropped_turns = index + 1
+                break
+            kept.insert(0, older[index])
+            used += turn_tokens
+
+        messages = prefix + [m for turn in kept + recent for m in turn]
+
+        return messages, {
+            "token_budget": self.token_budget,
+            "tokens_full_history": full_tokens,
+            "tokens_sent": used,
+            "tokens_saved": max(full_tokens - used, 0),
+            "turns_dropped": dropped_turns,
+            "summarized_messages": summary_upto,
+            "needs_summary": dropped_turns > 0
+        }
+
+    def schedule_summary(self, session_id):
+        """
+        Fold older turns of a session into its running summary, off the request path
+
+        Call from the event loop after the session has been saved. At most one
+        job per session runs at once.
+        """
+        if not self.summarizer or not self.store or session_id in self._pending:
+            return
+        # Keep a reference so the task is not garbage collected while running
+        self._pending[session_id] = asyncio.get_running_loop().create_task(
+            self._summarize(session_id)
+        )
+
+    async def _summarize(self, session_id):
+        try:
+            session = self.store.get(session_id)
+            if session is None:
+                return
+
+            summary_upto = session.get("summary_upto", 0)
+            turns = split_turns(session["messages"][summary_upto:])
+            older = turns[:-self.keep_turns] if self.keep_turns else turns
+            if not older:
+                return
+
+            to_fold = [collapse_function_message(m) for turn in older for m in turn]
+            summary = await self.summarizer(session.get("summary"), to_fold)
+
+            # Re-read so a turn saved while summarizing is not overwritten
+            latest = self.store.get(session_id)
+            if latest is None or latest.get("summary_upto", 0) != summary_upto:
+                return
+            latest["summary"] = summary
+            latest["summary_upto"] = summary_upto + len(to_fold)
+            self.store.save(latest)
+        except Exception as e:
+            print(f"Error summarizing session {session_id}: {str(e)}")
+        finally:
+            self._pending.pop(session_id, None)
+
+
+def create_context_manager(summarizer=None, store=None):
+    """
+    Build the context manager from environment variables
+
+    CONTEXT_TOKEN_BUDGET: Maximum estimated prompt tokens (default 8000)
+    CONTEXT_KEEP_TURNS: Recent turns always kept verbatim (default 3)
+    """
+    return ContextManager(
+        token_budget=int(os.getenv("CONTEXT_TOKEN_BUDGET", 8000)),
+        keep_turns=int(os.getenv("CONTEXT_KEEP_TURNS", 3)),
+        summarizer=summarizer,
+        store=store
+    )
@@ -0,0 +1,201 @@
+"""
+Inverted index over training courses
+Diacritic-insensitive keyword search with token prefix / infix matching and ranked results
+"""
+
+import heapq
+import math
+import threading
+from bisect import bisect_left
+
+from text_utils import normalize_text, tokenize
+
+
+# Searchable fields and how much a match in each counts towards the score
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "category": 2.0,
+    "platform": 1.0,
+    "level": 0.5
+}
+
+# A prefix hit ("reac" -> "react") scores less than the whole word,
+# an infix hit ("script" -> "javascript") less than a prefix hit
+PREFIX_MATCH_FACTOR = 0.5
+INFIX_MATCH_FACTOR = 0.25
+
+# Shorter query tokens only match whole words and prefixes
+# ("c" would otherwise hit nearly every course)
+MIN_INFIX_LENGTH = 3
+
+
+class CourseIndex:
+    """
+    Inverted index from folded tokens to course positions
+
+    - Every course field in FIELD_WEIGHTS is tokenized with diacritics folded,
+      so "dao tao" and "đào tạo" hit the same postings
+    - The vocabulary is kept sorted, so a query token matches all indexed
+      tokens it is a prefix of with two bisects
+    - The inner suffixes of every token are kept sorted too, so a query token
+      of MIN_INFIX_LENGTH or more also matches tokens that contain it, like
+      the plain substring search this index replaced ("script" -> JavaScript)
+    - Both sorted lists are brought up to date lazily, once before the next
+      search: add() / remove() only note new and dropped tokens, so building
+      or bulk-loading tens of thousands of courses is one sort, not one
+      list insertion per token and suffix
+    - Course types have their own posting sets; a type filter is a set
+      intersection instead of a scan
+    - Query tokens are ANDed; tokens that match nothing in the catalog
+      ("khóa học", "về") are ignored rather than emptying the result
+    """
+
+    def __init__(self, courses=()):
+        self._lock = threading.Lock()
+        self._courses = {}       # course id -> course dict
+        self._order = {}         # course id -> insertion order, for stable ranking
+        self._postings = {}      # token -> {course id: field weight}
+        self._types = {}         # folded type -> set of course ids
+        self._vocabulary = []    # sorted tokens
+        self._suffixes = []      # sorted (inner suffix, token), for infix matches
+        self._added = set()      # tokens not yet in the sorted lists
+        self._dropped = set()    # tokens still in the sorted lists but no longer indexed
+        for course in courses:
+            self.add(course)
+        with self._lock:
+            self._refresh()
+
+    def add(self, course):
+        """Index a course, replacing any previous version with the same id"""
+        with self._lock:
+            self._remove(course["id"])
+            self._courses[course["id"]] = course
+            self._order.setdefault(course["id"], len(self._order))
+
+            weights = {}
+            for field, weight in FIELD_WEIGHTS.items():
+                for token in tokenize(course.get(field)):
+                    weights[token] = max(weights.get(token, 0.0), weight)
+            for token, weight in weights.items():
+                postings = self._postings.get(token)
+                if postings is None:
+                    postings = self._postings[token] = {}
+                    if token in self._dropped:
+                        self._dropped.discard(token)
+                    else:
+                        self._added.add(token)
+                postings[course["id"]] = weight
+
+            self._types.setdefault(normalize_text(course.get("type")), set()).add(course["id"])
+
+    def remove(self, course_id):
+        """Drop a course from the index; returns True if it was indexed"""
+        with self._lock:
+            return self._remove(course_id)
+
+    def _remove(self, course_id):
+        course = self._courses.pop(course_id, None)
+        if course is None:
+            return False
+        for field in FIELD_WEIGHTS:
+            for token in tokenize(course.get(field)):
+                postings = self._postings.get(token)
+                if postings is None:
+                    continue
+                postings.pop(course_id, None)
+                if not postings:
+                    del self._postings[token]
+                    if token in self._added:
+                        self._added.discard(token)
+                    else:
+                        self._dropped.add(token)
+        type_ids = self._types.get(normalize_text(course.get("type")))
+        if type_ids is not None:
+            type_ids.discard(course_id)
+        return True
+
+    def _refresh(self):
+        """Apply the tokens added / dropped since the last search to the sorted lists"""
+        if self._dropped:
+            dropped = self._dropped
+            self._vocabulary = [token for token in self._vocabulary if token not in dropped]
+            self._suffixes = [entry for entry in self._suffixes if entry[1] not in dropped]
+            self._dropped = set()
+        if self._added:
+            # Sorted lists with an unsorted tail: Timsort sorts the tail and merges once
+            self._vocabulary.extend(self._added)
+            self._vocabulary.sort()
+            self._suffixes.extend(
+                (token[start:], token) for token in self._added for start in range(1, len(token))
+            )
+            self._suffixes.sort()
+            self._added = set()
+
+    def _matching_terms(self, query_token):
+        """Indexed tokens matching a query token -> score factor (whole word, prefix or infix)"""
+        start = bisect_left(self._vocabulary, query_token)
+        end = bisect_left(self._vocabulary, query_token + "\uffff")
+        terms = {
+            term: 1.0 if term == query_token else PREFIX_MATCH_FACTOR
+            for term in self._vocabulary[start:end]
+        }
+        if len(query_token) >= MIN_INFIX_LENGTH:
+            start = bisect_left(self._suffixes, (query_token,))
+            end = bisect_left(self._suffixes, (query_token + "\uffff",))
+            for _, term in self._suffixes[start:end]:
+                terms.setdefault(term, INFIX_MATCH_FACTOR)
+        return terms
+
+    def search(self, keyword=None, course_type=None, limit=None):
+        """
+        Find courses by keyword and/or type
+
+        Args:
+            keyword: Free-text query matched against name, category, platform, level
+            course_type: Exact course type filter ("Technical", "Soft Skill")
+            limit: Maximum number of results (all by default)
+
+        Returns:
+            list: Matching courses, best match first
+        """
+        with self._lock:
+            self._refresh()
+            candidates = None
+            if course_type:
+                candidates = set(self._types.get(normalize_text(course_type), ()))
+
+            scores = {}
+            query_tokens = tokenize(keyword)
+            matched_any = False
+            for query_token in query_tokens:
+                token_scores = {}
+                for term, factor in self._matching_terms(query_token).items():
+                    postings = self._postings[term]
+                    idf = math.log(1 + len(self._courses) / len(postings))
+                    for course_id, weight in postings.items():
+                        score = weight * idf * factor
+                        if score > token_scores.get(course_id, 0.0):
+                            token_scores[course_id] = score
+                if not token_scores:
+                    continue
+                matched_any = True
+                # Posting-list intersection: every known query token must match
+                ids = token_scores.keys() if candidates is None else candidates.intersection(token_scores)
+                candidates = set(ids)
+                for course_id in candidates:
+                    scores[course_id] = scores.get(course_id, 0.0) + token_scores[course_id]
+
+            if query_tokens and not matched_any:
+                return []
+            if candidates is None:
+                candidates = self._courses.keys()
+
+            rank_key = lambda cid: (-scores.get(cid, 0.0), self._order[cid])
+            if limit is None:
+                ranked = sorted(candidates, key=rank_key)
+            else:
+                ranked = heapq.nsmallest(limit, candidates, key=rank_key)
+            return [self._courses[cid] for cid in ranked]
+
+    def __len__(self):
+        return len(self._courses)
@@ -0,0 +1,137 @@
+"""
+Due-date index over pending tasks
+Keeps pending tasks sorted by due date (as date ordinals), per employee and company-wide,
+so "pending tasks due in the next N days" is two bisects instead of a scan
+"""
+
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import date
+
+
+def due_ordinal(task):
+    """Due date of a task as a date ordinal, or None if missing / not YYYY-MM-DD"""
+    try:
+        return date.fromisoformat(task["due_date"]).toordinal()
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class SortedTasks:
+    """
+    Tasks grouped by due date: {ordinal: {task id: entry}} plus the sorted
+    list of dates that have tasks
+
+    Adding or removing a task is a dict operation; only the first task of a
+    new date touches the (short) sorted date list. Within a day, tasks keep
+    their insertion order.
+    """
+
+    def __init__(self):
+        self.ordinals = []
+        self.buckets = {}
+        self._count = 0
+
+    def add(self, ordinal, task_id, entry):
+        bucket = self.buckets.get(ordinal)
+        if bucket is None:
+            bucket = self.buckets[ordinal] = {}
+            insort(self.ordinals, ordinal)
+        bucket[task_id] = entry
+        self._count += 1
+
+    def remove(self, ordinal, task_id):
+        bucket = self.buckets.get(ordinal)
+        if bucket is None or bucket.pop(task_id, None) is None:
+            return
+        self._count -= 1
+        if not bucket:
+            del self.buckets[ordinal]
+            del self.ordinals[bisect_left(self.ordinals, ordinal)]
+
+    def between(self, first, last):
+        """(ordinal, entry) pairs with first <= ordinal <= last, earliest first"""
+        start = bisect_left(self.ordinals, first)
+        end = bisect_right(self.ordinals, last)
+        return [
+            (ordinal, entry)
+            for ordinal in self.ordinals[start:end]
+            for entry in self.buckets[ordinal].values()
+        ]
+
+    def __len__(self):
+        return self._count
+
+
+class DueDateIndex:
+    """
+    Pending tasks with a due date, sorted by due date
+
+    Due dates are parsed once, when a task is indexed. Call update() whenever
+    a task is added or its status changes, and remove() when it is deleted;
+    only tasks with status "Pending" are kept.
+    """
+
+    def __init__(self, tasks_by_employee=None):
+        self._lock = threading.Lock()
+        self._by_employee = {}   # employee id -> SortedTasks of task
+        self._all = SortedTasks()  # SortedTasks of (employee id, task)
+        self._indexed = {}       # task id -> (employee id, ordinal)
+        for employee_id, tasks in (tasks_by_employee or {}).items():
+            for task in tasks:
+                self.update(employee_id, task)
+
+    def update(self, employee_id, task):
+        """(Re)index a task after it was added or changed"""
+        with self._lock:
+            self._remove(task["task_id"])
+            if task.get("status") != "Pending":
+                return
+            ordinal = due_ordinal(task)
+            if ordinal is None:
+                return
+            tasks = self._by_employee.get(employee_id)
+            if tasks is None:
+                tasks = self._by_employee[employee_id] = SortedTasks()
+            tasks.add(ordinal, task["task_id"], task)
+            self._all.add(ordinal, task["task_id"], (employee_id, task))
+            self._indexed[task["task_id"]] = (employee_id, ordinal)
+
+    def remove(self, task_id):
+        """Drop a task from the index"""
+        with self._lock:
+            self._remove(task_id)
+
+    def _remove(self, task_id):
+        entry = self._indexed.pop(task_id, None)
+        if entry is None:
+            return
+        employee_id, ordinal = entry
+        self._by_employee[employee_id].remove(ordinal, task_id)
+        self._all.remove(ordinal, task_id)
+
+    def due(self, employee_id, first, last):
+        """
+        An employee's pending tasks due between two date ordinals (inclusive)
+
+        Returns:
+            list: (due ordinal, task) pairs, earliest first
+        """
+        with self._lock:
+            tasks = self._by_employee.get(employee_id)
+            if tasks is None:
+                return []
+            return tasks.between(first, last)
+
+    def due_all(self, first, last):
+        """
+        Pending tasks of all employees due between two date ordinals (inclusive)
+
+        Returns:
+            list: (due ordinal, employee id, task) tuples, earliest first
+        """
+        with self._lock:
+            return [(ordinal, employee_id, task) for ordinal, (employee_id, task) in self._all.between(first, last)]
+
+    def __len__(self):
+        return len(self._indexed)
@@ -0,0 +1,120 @@
+"""
+Employee resolver shared by all tool functions
+Turns the identifier the LLM passes ("E123", "An", "Nguyen Van An") into an employee record,
+caching the result so one chat turn pays for each lookup only once
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+
+class EmployeeResolver:
+    """
+    LRU cache of identifier -> employee
+
+    An identifier is tried as an employee ID first, then as a name through the
+    repository's name index (an ambiguous or unknown name resolves to None).
+    Unknown identifiers are cached too, since the LLM tends to retry them.
+
+    Entries are tagged with the employee directory version (see
+    mock_data.get_directory_version()); when an employee record is added or
+    changed the whole cache is dropped, because a new employee can also change
+    which employee a name resolves to.
+    """
+
+    def __init__(self, repository, version_source, max_entries=1024, enabled=True):
+        """
+        Args:
+            repository: Storage backend (see repository.py)
+            version_source: Callable returning the employee directory version
+            max_entries: Least recently used identifiers are evicted beyond this
+            enabled: If False, every call goes to the repository
+        """
+        self._repository = repository
+        self._version_source = version_source
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._entries = OrderedDict()
+        self._version = version_source()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def resolve(self, identifier):
+        """
+        Find the employee an identifier refers to
+
+        Returns:
+            dict: Employee record, or None if the ID is unknown and the name
+                matches nobody (or several employees equally well)
+        """
+        if not self.enabled:
+            return self._lookup(identifier)
+
+        version = self._version_source()
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+                self.invalidations += 1
+            if identifier in self._entries:
+                self._entries.move_to_end(identifier)
+                self.hits += 1
+                return self._entries[identifier]
+            self.misses += 1
+
+        employee = self._lookup(identifier)
+
+        with self._lock:
+            # Skip if another call already moved the cache to a newer version
+            if version == self._version:
+                self._entries[identifier] = employee
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return employee
+
+    def _lookup(self, identifier):
+        if not identifier:
+            return None
+        employee = self._repository.get_employee(identifier)
+        if employee is None:
+            employee = self._repository.get_employee_by_name(identifier)
+        return employee
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return hit/miss counters for monitoring"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+
+def create_employee_resolver(repository, version_source):
+    """
+    Build the resolver from environment variables
+
+    EMPLOYEE_RESOLVER_ENABLED: "false" disables caching (default true)
+    EMPLOYEE_RESOLVER_MAX_ENTRIES: Maximum cached identifiers (default 1024)
+    """
+    return EmployeeResolver(
+        repository,
+        version_source,
+        max_entries=int(os.getenv("EMPLOYEE_RESOLVER_MAX_ENTRIES", 1024)),
+        enabled=os.getenv("EMPLOYEE_RESOLVER_ENABLED", "true").lower() != "false"
+    )
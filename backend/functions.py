@@ -3,18 +3,22 @@ Function implementations for Azure OpenAI function calling
 These functions are called when the LLM decides to retrieve dynamic data
 """
 
-import json
-from mock_data import (
-    mock_new_hires_db, 
-    mock_onboarding_tasks,
-    mock_team_db,
-    get_employee_by_name,
-    get_urgent_tasks,
-    update_task_status_in_db,
-    find_task_by_name,
-    get_leave_balance_from_db,
-    search_training_courses_in_db
-)
+from repository import create_repository
+from employee_resolver import create_employee_resolver
+from mock_data import get_directory_version
+from tool_registry import create_tool_registry
+
+# Storage backend for all HR data (see repository.py, STORAGE_BACKEND)
+repository = create_repository()
+
+# Identifier ("E123" or a name) -> employee, cached across tool calls
+employee_resolver = create_employee_resolver(repository, get_directory_version)
+
+# Best-ranked courses returned to the LLM per search
+MAX_COURSE_RESULTS = 20
+
+# Most upcoming tasks returned by get_next_task
+MAX_NEXT_TASKS = 20
 
 
 def get_employee_info(employee_identifier):
@@ -27,19 +31,24 @@ def get_employee_info(employee_identifier):
     Returns:
         dict: Employee information or error message
     """
-    # Try as employee ID first
-    if employee_identifier in mock_new_hires_db:
+    # Try as employee ID first, then as name
+    employee = employee_resolver.resolve(employee_identifier)
+    if employee:
         return {
             "success": True,
-            "data": mock_new_hires_db[employee_identifier]
+            "data": employee
         }
     
-    # Try as name
-    employee = get_employee_by_name(employee_identifier)
-    if employee:
+    # Several employees match equally well - let the user pick instead of guessing
+    candidates = repository.search_employees_by_name(employee_identifier)
+    if candidates:
         return {
-            "success": True,
-            "data": employee
+            "success": False,
+            "error": f"Có nhiều nhân viên khớp với tên: {employee_identifier}. Vui lòng chọn một người.",
+            "candidates": [
+                {"employee_id": c["employee_id"], "name": c["name"]}
+                for c in candidates
+            ]
         }
     
     return {
@@ -59,31 +68,23 @@ def get_onboarding_tasks(employee_identifier, status_filter=None):
     Returns:
         dict: List of tasks or error message
     """
-    # Get employee ID
-    employee_id = employee_identifier
-    if employee_identifier not in mock_new_hires_db:
-        employee = get_employee_by_name(employee_identifier)
-        if employee:
-            employee_id = employee["employee_id"]
-        else:
-            return {
-                "success": False,
-                "error": f"Không tìm thấy nhân viên với ID hoặc tên: {employee_identifier}"
-            }
+    # Resolve the employee (ID or name)
+    employee = employee_resolver.resolve(employee_identifier)
+    if employee is None:
+        return {
+            "success": False,
+            "error": f"Không tìm thấy nhân viên với ID hoặc tên: {employee_identifier}"
+        }
+    employee_id = employee["employee_id"]
     
-    # Get tasks
-    if employee_id not in mock_onboarding_tasks:
+    # Get tasks, filtered by status if requested
+    tasks = repository.get_tasks(employee_id, status_filter)
+    if tasks is None:
         return {
             "success": False,
             "error": f"Không tìm thấy nhiệm vụ cho nhân viên {employee_id}"
         }
     
-    tasks = mock_onboarding_tasks[employee_id]
-    
-    # Filter by status if requested
-    if status_filter:
-        tasks = [task for task in tasks if task["status"].lower() == status_filter.lower()]
-    
     return {
         "success": True,
         "employee_id": employee_id,
@@ -103,7 +104,7 @@ def update_task_status(task_id, new_status):
     Returns:
         dict: Update result with task information
     """
-    result = update_task_status_in_db(task_id, new_status)
+    result = repository.update_task_status(task_id, new_status)
     return result
 
 
@@ -118,16 +119,13 @@ def send_introduction_message(employee_identifier, recipient_type):
     Returns:
         dict: Mock result of sending introduction
     """
-    # Get employee info
-    if employee_identifier in mock_new_hires_db:
-        employee = mock_new_hires_db[employee_identifier]
-    else:
-        employee = get_employee_by_name(employee_identifier)
-        if not employee:
-            return {
-                "success": False,
-                "error": f"Không tìm thấy nhân viên: {employee_identifier}"
-            }
+    # Resolve the employee (ID or name)
+    employee = employee_resolver.resolve(employee_identifier)
+    if employee is None:
+        return {
+            "success": False,
+            "error": f"Không tìm thấy nhân viên: {employee_identifier}"
+        }
     
     if recipient_type.lower() == "buddy":
         recipient_name = employee["buddy"]
@@ -166,19 +164,16 @@ def check_urgent_tasks(employee_identifier):
     Returns:
         dict: List of urgent tasks with days left
     """
-    # Get employee ID
-    employee_id = employee_identifier
-    if employee_identifier not in mock_new_hires_db:
-        employee = get_employee_by_name(employee_identifier)
-        if employee:
-            employee_id = employee["employee_id"]
-        else:
-            return {
-                "success": False,
-                "error": f"Không tìm thấy nhân viên: {employee_identifier}"
-            }
+    # Resolve the employee (ID or name)
+    employee = employee_resolver.resolve(employee_identifier)
+    if employee is None:
+        return {
+            "success": False,
+            "error": f"Không tìm thấy nhân viên: {employee_identifier}"
+        }
+    employee_id = employee["employee_id"]
     
-    urgent_tasks = get_urgent_tasks(employee_id, days_threshold=2)
+    urgent_tasks = repository.get_urgent_tasks(employee_id, days_threshold=2)
     
     return {
         "success": True,
@@ -198,16 +193,13 @@ def get_team_meetings(employee_identifier):
     Returns:
         dict: Team information and meeting schedules
     """
-    # Get employee info
-    if employee_identifier in mock_new_hires_db:
-        employee = mock_new_hires_db[employee_identifier]
-    else:
-        employee = get_employee_by_name(employee_identifier)
-        if not employee:
-            return {
-                "success": False,
-                "error": f"Không tìm thấy nhân viên: {employee_identifier}"
-            }
+    # Resolve the employee (ID or name)
+    employee = employee_resolver.resolve(employee_identifier)
+    if employee is None:
+        return {
+            "success": False,
+            "error": f"Không tìm thấy nhân viên: {employee_identifier}"
+        }
     
     team_name = employee.get("team_name")
     if not team_name:
@@ -217,14 +209,13 @@ def get_team_meetings(employee_identifier):
         }
     
     # Get team info
-    if team_name not in mock_team_db:
+    team_info = repository.get_team(team_name)
+    if team_info is None:
         return {
             "success": False,
             "error": f"Không tìm thấy thông tin team: {team_name}"
         }
     
-    team_info = mock_team_db[team_name]
-    
     return {
         "success": True,
         "team_name": team_name,
@@ -236,59 +227,53 @@ def get_team_meetings(employee_identifier):
     }
 
 
-def get_next_task(employee_identifier):
+def get_next_task(employee_identifier, limit=1):
     """
     Get the next pending task for an employee
     Useful for suggesting what to do next after completing a task
     
     Args:
         employee_identifier: Employee ID or name
+        limit: With limit > 1, also return the next `limit` tasks as "next_tasks"
+            (the "what's next" list); clamped to 1..MAX_NEXT_TASKS
     
     Returns:
         dict: Next pending task or None
     """
-    # Get employee ID
-    employee_id = employee_identifier
-    if employee_identifier not in mock_new_hires_db:
-        employee = get_employee_by_name(employee_identifier)
-        if employee:
-            employee_id = employee["employee_id"]
-        else:
-            return {
-                "success": False,
-                "error": f"Không tìm thấy nhân viên: {employee_identifier}"
-            }
+    # Resolve the employee (ID or name)
+    employee = employee_resolver.resolve(employee_identifier)
+    if employee is None:
+        return {
+            "success": False,
+            "error": f"Không tìm thấy nhân viên: {employee_identifier}"
+        }
+    employee_id = employee["employee_id"]
+    limit = min(max(limit, 1), MAX_NEXT_TASKS)
     
-    # Get tasks
-    if employee_id not in mock_onboarding_tasks:
+    # Next pending tasks by priority (High > Medium > Low), then due date
+    next_tasks = repository.get_next_tasks(employee_id, limit)
+    if next_tasks is None:
         return {
             "success": False,
             "error": f"Không tìm thấy nhiệm vụ cho nhân viên {employee_id}"
         }
     
-    # Find first pending task (sorted by priority)
-    tasks = mock_onboarding_tasks[employee_id]
-    pending_tasks = [t for t in tasks if t["status"] == "Pending"]
-    
-    if not pending_tasks:
+    tasks, pending_count = next_tasks
+    if not tasks:
         return {
             "success": True,
             "next_task": None,
             "message": "Chúc mừng! Anh/chị đã hoàn thành tất cả nhiệm vụ onboarding."
         }
     
-    # Sort by priority (High > Medium > Low) and due date
-    priority_order = {"High": 0, "Medium": 1, "Low": 2}
-    next_task = sorted(
-        pending_tasks,
-        key=lambda t: (priority_order.get(t["priority"], 3), t["due_date"])
-    )[0]
-    
-    return {
+    result = {
         "success": True,
-        "next_task": next_task,
-        "remaining_count": len(pending_tasks)
+        "next_task": tasks[0],
+        "remaining_count": pending_count
     }
+    if limit > 1:
+        result["next_tasks"] = tasks
+    return result
 
 
 def get_leave_balance(employee_identifier):
@@ -302,20 +287,17 @@ def get_leave_balance(employee_identifier):
     Returns:
         dict: Leave balance information
     """
-    # Get employee ID
-    employee_id = employee_identifier
-    if employee_identifier not in mock_new_hires_db:
-        employee = get_employee_by_name(employee_identifier)
-        if employee:
-            employee_id = employee["employee_id"]
-        else:
-            return {
-                "success": False,
-                "error": f"Không tìm thấy nhân viên: {employee_identifier}"
-            }
+    # Resolve the employee (ID or name)
+    employee = employee_resolver.resolve(employee_identifier)
+    if employee is None:
+        return {
+            "success": False,
+            "error": f"Không tìm thấy nhân viên: {employee_identifier}"
+        }
+    employee_id = employee["employee_id"]
     
     # Get leave balance
-    leave_data = get_leave_balance_from_db(employee_id)
+    leave_data = repository.get_leave_balance(employee_id)
     
     if not leave_data:
         return {
@@ -341,7 +323,7 @@ def search_training_courses(keyword=None, course_type=None):
     Returns:
         dict: List of matching courses
     """
-    courses = search_training_courses_in_db(keyword, course_type)
+    courses = repository.search_courses(keyword, course_type, limit=MAX_COURSE_RESULTS)
     
     if not courses:
         return {
@@ -497,6 +479,12 @@ FUNCTION_DEFINITIONS = [
                 "employee_identifier": {
                     "type": "string",
                     "description": "Mã nhân viên hoặc tên nhân viên. Nếu người dùng nói 'tôi', hãy sử dụng 'E123'."
+                },
+                "limit": {
+                    "type": "integer",
+                    "minimum": 1,
+                    "maximum": MAX_NEXT_TASKS,
+                    "description": "Số nhiệm vụ tiếp theo cần lấy (mặc định 1). Dùng khi người dùng hỏi 'vài việc tiếp theo', ví dụ 3."
                 }
             },
             "required": ["employee_identifier"]
@@ -540,6 +528,19 @@ FUNCTION_DEFINITIONS = [
 # All tools including format tool
 ALL_TOOLS = [FORMAT_RESPONSE_TOOL] + FUNCTION_DEFINITIONS
 
+# Same definitions in the tools API format (allows parallel tool_calls)
+TOOLS = [{"type": "function", "function": definition} for definition in ALL_TOOLS]
+
+# tool_choice that forces the final structured answer
+FORMAT_TOOL_CHOICE = {"type": "function", "function": {"name": "format_user_response"}}
+
+
+# Dispatch, argument validation, timeouts and latency metrics for every tool above
+tool_registry = create_tool_registry(
+    FUNCTION_DEFINITIONS,
+    {definition["name"]: globals()[definition["name"]] for definition in FUNCTION_DEFINITIONS}
+)
+
 
 def execute_function(function_name, arguments):
     """
@@ -550,52 +551,7 @@ def execute_function(function_name, arguments):
         arguments: JSON string or dict of function arguments
     
     Returns:
-        dict: Function result
+        dict: Function result, or an error if the function is unknown or the
+            arguments do not match its schema
     """
-    # Parse arguments if string
-    if isinstance(arguments, str):
-        try:
-            arguments = json.loads(arguments)
-        except json.JSONDecodeError:
-            return {
-                "success": False,
-                "error": "Invalid arguments format"
-            }
-    
-    # Execute the appropriate function
-    if function_name == "get_employee_info":
-        return get_employee_info(arguments.get("employee_identifier"))
-    elif function_name == "get_onboarding_tasks":
-        return get_onboarding_tasks(
-            arguments.get("employee_identifier"),
-            arguments.get("status_filter")
-        )
-    elif function_name == "update_task_status":
-        return update_task_status(
-            arguments.get("task_id"),
-            arguments.get("new_status")
-        )
-    elif function_name == "send_introduction_message":
-        return send_introduction_message(
-            arguments.get("employee_identifier"),
-            arguments.get("recipient_type")
-        )
-    elif function_name == "check_urgent_tasks":
-        return check_urgent_tasks(arguments.get("employee_identifier"))
-    elif function_name == "get_team_meetings":
-        return get_team_meetings(arguments.get("employee_identifier"))
-    elif function_name == "get_next_task":
-        return get_next_task(arguments.get("employee_identifier"))
-    elif function_name == "get_leave_balance":
-        return get_leave_balance(arguments.get("employee_identifier"))
-    elif function_name == "search_training_courses":
-        return search_training_courses(
-            arguments.get("keyword"),
-            arguments.get("course_type")
-        )
-    else:
-        return {
-            "success": False,
-            "error": f"Unknown function: {function_name}"
-        }
-
+    return tool_registry.execute(function_name, arguments)
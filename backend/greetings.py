@@ -0,0 +1,250 @@
+"""
+Proactive greetings shown on the welcome screen
+Builds the personalized welcome message with deadline alerts, for one employee or in bulk
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+
+# Urgent tasks are those due within this many days (same as check_urgent_tasks)
+GREETING_DAYS_THRESHOLD = 2
+
+
+def build_greeting(employee, urgent_tasks):
+    """
+    Build the greeting payload for an employee
+
+    Args:
+        employee: Employee dict
+        urgent_tasks: The employee's urgent tasks (with "days_left")
+
+    Returns:
+        dict: {"success", "greeting", "employee", "urgent_tasks_count"}
+    """
+    name = employee["name"].split()[-1]  # Get first name
+    greeting = f"👋 Chào {name}! Em là Trợ lý Onboarding của FPT Software.\n\n"
+
+    if urgent_tasks:
+        if len(urgent_tasks) == 1:
+            task = urgent_tasks[0]
+            days_text = "hôm nay" if task["days_left"] == 0 else f"trong {task['days_left']} ngày tới"
+            greeting += f"⚠️ Em thấy có **{task['task']}** sắp đến hạn {days_text}. "
+            greeting += "Anh nhớ hoàn thành nhé!\n\n"
+        else:
+            greeting += f"⚠️ Em thấy anh có **{len(urgent_tasks)} nhiệm vụ** sắp đến hạn. "
+            greeting += "Anh có muốn xem chi tiết không?\n\n"
+
+    greeting += "Em có thể giúp gì cho anh hôm nay?"
+
+    return {
+        "success": True,
+        "greeting": greeting,
+        "employee": {
+            "id": employee["employee_id"],
+            "name": employee["name"]
+        },
+        "urgent_tasks_count": len(urgent_tasks)
+    }
+
+
+def batch_greetings(repository, employee_ids=None, department=None, team_name=None, today=None):
+    """
+    Greetings for many employees in one pass
+
+    Urgent tasks of the whole company are fetched once from the due-date index
+    and grouped by employee, and explicit IDs are fetched in chunks, instead of
+    one employee and one urgent task query per employee.
+
+    Args:
+        repository: Storage backend (see repository.py)
+        employee_ids: Explicit employee IDs, answered in this order (unknown or
+            filtered-out IDs yield an error line)
+        department / team_name: Filters, alone or combined with employee_ids
+        today: Day the urgent task window starts from (default: the server's local date)
+
+    Yields:
+        dict: One greeting payload per employee, with "employee_id"
+    """
+    urgent_by_employee = {}
+    for task in repository.get_all_urgent_tasks(GREETING_DAYS_THRESHOLD, today):
+        urgent_by_employee.setdefault(task["employee_id"], []).append(task)
+
+    employees = repository.find_employees(employee_ids, department, team_name)
+    if employee_ids is None:
+        for employee in employees:
+            employee_id = employee["employee_id"]
+            yield dict(build_greeting(employee, urgent_by_employee.get(employee_id, [])), employee_id=employee_id)
+        return
+
+    # find_employees() yields matches in request order, so walk both together to
+    # emit every line (found or not) in the order the IDs were requested
+    employee = next(employees, None)
+    for employee_id in employee_ids:
+        if employee is not None and employee["employee_id"] == employee_id:
+            yield dict(build_greeting(employee, urgent_by_employee.get(employee_id, [])), employee_id=employee_id)
+            employee = next(employees, None)
+        else:
+            yield {"employee_id": employee_id, "success": False, "error": "Employee not found"}
+
+
+def ndjson_lines(records, batch_size=500):
+    """Encode records as NDJSON, joined into chunks of batch_size lines"""
+    chunk = []
+    for record in records:
+        chunk.append(json.dumps(record, ensure_ascii=False))
+        if len(chunk) >= batch_size:
+            yield "\n".join(chunk) + "\n"
+            chunk = []
+    if chunk:
+        yield "\n".join(chunk) + "\n"
+
+
+class GreetingCache:
+    """
+    Greetings cached per employee for the current calendar day
+
+    A greeting only depends on the employee and their urgent tasks today, so
+    an entry stays valid until midnight in the configured timezone or until
+    the employee's data changes - each entry remembers the employee's data
+    version (see mock_data.get_employee_data_version()) and is dropped on read
+    once it moved on. Right after midnight, regenerate() rebuilds the cached
+    greetings in the background so the first page load of the day is a hit.
+    """
+
+    def __init__(self, version_source, timezone=None, max_entries=10000, enabled=True):
+        """
+        Args:
+            version_source: Callable returning an employee's data version
+            timezone: IANA timezone whose midnight starts a new greeting day
+                (default: the server's local time); urgent tasks are counted from
+                that day too, see today()
+            max_entries: Least recently used employees are evicted beyond this
+            enabled: If False, get() always misses and put() is a no-op
+        """
+        self._version_source = version_source
+        self.timezone = ZoneInfo(timezone) if timezone else None
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._entries = OrderedDict()  # employee id -> {"day", "version", "greeting"}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+        self.regenerations = 0
+        self.last_regenerated = None
+
+    def today(self):
+        """
+        Current calendar day in the configured timezone
+        Pass it to the urgent task queries so "days_left" matches the day the greeting is cached for
+        """
+        return datetime.now(self.timezone).date()
+
+    def seconds_until_midnight(self):
+        """Seconds until the next greeting day starts"""
+        now = datetime.now(self.timezone)
+        midnight = datetime.combine(now.date() + timedelta(days=1), time(), self.timezone)
+        return max((midnight - now).total_seconds(), 0.0)
+
+    def get(self, employee_id):
+        """Return today's greeting for an employee, or None"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(employee_id)
+            if entry is not None and entry["version"] != self._version_source(employee_id):
+                del self._entries[employee_id]
+                self.invalidations += 1
+                entry = None
+            if entry is None or entry["day"] != self.today():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(employee_id)
+            self.hits += 1
+            return entry["greeting"]
+
+    def put(self, employee_id, greeting, version, day=None):
+        """
+        Store an employee's greeting for today
+
+        Args:
+            version: The employee's data version read before the greeting was built,
+                so a change made while building it is not masked
+            day: Day the greeting was built for (default today()), so one built
+                just before midnight is not stored as the next day's
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[employee_id] = {"day": day or self.today(), "version": version, "greeting": greeting}
+            self._entries.move_to_end(employee_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def regenerate(self, repository):
+        """
+        Rebuild today's greetings for every cached employee in one batch pass
+
+        Returns:
+            int: Number of greetings rebuilt
+        """
+        with self._lock:
+            employee_ids = list(self._entries)
+        versions = {employee_id: self._version_source(employee_id) for employee_id in employee_ids}
+        day = self.today()
+        count = 0
+        for greeting in batch_greetings(repository, employee_ids, today=day):
+            employee_id = greeting.pop("employee_id")
+            if greeting["success"]:
+                self.put(employee_id, greeting, versions[employee_id], day)
+                count += 1
+        with self._lock:
+            self.regenerations += 1
+            self.last_regenerated = datetime.now(self.timezone).isoformat(timespec="seconds")
+        return count
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return hit/miss counters for monitoring"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "timezone": str(self.timezone) if self.timezone else "local",
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+                "regenerations": self.regenerations,
+                "last_regenerated": self.last_regenerated
+            }
+
+
+def create_greeting_cache(version_source):
+    """
+    Build the greeting cache from environment variables
+
+    GREETING_CACHE_ENABLED: "false" builds every greeting on request (default true)
+    GREETING_CACHE_MAX_ENTRIES: Maximum cached employees (default 10000)
+    GREETING_TIMEZONE: Timezone whose midnight starts a new day, e.g. Asia/Ho_Chi_Minh
+        (default: server local time)
+    """
+    return GreetingCache(
+        version_source,
+        timezone=os.getenv("GREETING_TIMEZONE") or None,
+        max_entries=int(os.getenv("GREETING_CACHE_MAX_ENTRIES", 10000)),
+        enabled=os.getenv("GREETING_CACHE_ENABLED", "true").lower() != "false"
+    )
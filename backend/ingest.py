@@ -0,0 +1,258 @@
+"""
+Bulk ingest of HR data files
+Streams CSV / JSONL files into the storage backend in validated batches, in constant memory
+
+Usage:
+    python ingest.py employees employees.csv
+    python ingest.py tasks tasks.jsonl --batch-size 5000
+
+Every batch is validated, then upserted in one transaction. The name, task and
+course indexes are updated per record, so nothing is rebuilt from scratch.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from datetime import date
+from itertools import islice
+
+
+# Errors listed in the report; the rest are only counted
+MAX_REPORTED_ERRORS = 20
+
+TASK_STATUSES = {"pending": "Pending", "done": "Done"}
+TASK_PRIORITIES = {"high": "High", "medium": "Medium", "low": "Low"}
+
+
+def clean_row(row):
+    """Strip string values and drop empty fields (CSV leaves missing values as "")"""
+    cleaned = {}
+    for key, value in row.items():
+        if key is None:
+            continue  # Extra CSV columns without a header
+        if isinstance(value, str):
+            value = value.strip()
+            if not value:
+                continue
+        elif value is None:
+            continue
+        cleaned[key.strip()] = value
+    return cleaned
+
+
+def require(row, *fields):
+    missing = [field for field in fields if field not in row]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+
+
+def require_text(row):
+    """Every field must be a string - CSV values always are, JSONL values may be anything"""
+    for key, value in row.items():
+        if not isinstance(value, str):
+            raise ValueError(f"{key} must be a string, not {type(value).__name__}")
+
+
+def to_number(value):
+    """Parse a number from CSV text; keeps ints as ints"""
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f"not a number: {value!r}")
+    if isinstance(value, (int, float)):
+        return value
+    number = float(value)
+    return int(number) if number.is_integer() and "." not in value else number
+
+
+def validate_employee(row):
+    require(row, "employee_id", "name")
+    require_text(row)
+    return row
+
+
+def validate_task(row):
+    """Returns (employee_id, task) - the employee is not stored on the task itself"""
+    require(row, "employee_id", "task_id", "task", "status")
+    require_text(row)
+    employee_id = row.pop("employee_id")
+    status = TASK_STATUSES.get(row["status"].lower())
+    if status is None:
+        raise ValueError(f"invalid status {row['status']!r}")
+    row["status"] = status
+    priority = TASK_PRIORITIES.get(row.get("priority", "Medium").lower())
+    if priority is None:
+        raise ValueError(f"invalid priority {row['priority']!r}")
+    row["priority"] = priority
+    if "due_date" in row:
+        # Parsed the same way as the due index, and stored normalized so string
+        # range queries in SQLite compare in date order
+        try:
+            row["due_date"] = date.fromisoformat(row["due_date"]).isoformat()
+        except ValueError:
+            raise ValueError(f"invalid due_date {row['due_date']!r}, expected YYYY-MM-DD") from None
+    return employee_id, row
+
+
+def validate_leave_balance(row):
+    require(row, "employee_id")
+    if not isinstance(row["employee_id"], str):
+        raise ValueError(f"employee_id must be a string, not {type(row['employee_id']).__name__}")
+    for key, value in row.items():
+        if key != "employee_id":
+            try:
+                row[key] = to_number(value)
+            except ValueError:
+                raise ValueError(f"{key} must be a number, not {value!r}") from None
+    if "annual_leave_remaining" not in row and "annual_leave_total" in row:
+        row["annual_leave_remaining"] = row["annual_leave_total"] - row.get("annual_leave_used", 0)
+    if "sick_leave_remaining" not in row and "sick_leave_total" in row:
+        row["sick_leave_remaining"] = row["sick_leave_total"] - row.get("sick_leave_used", 0)
+    return row
+
+
+def validate_course(row):
+    require(row, "id", "name", "type")
+    require_text(row)
+    return row
+
+
+# entity -> (row validator, repository bulk upsert method)
+ENTITIES = {
+    "employees": (validate_employee, "upsert_employees"),
+    "tasks": (validate_task, "upsert_tasks"),
+    "leave_balances": (validate_leave_balance, "upsert_leave_balances"),
+    "courses": (validate_course, "upsert_courses")
+}
+
+
+def detect_format(name):
+    """csv or jsonl, from a file name"""
+    extension = os.path.splitext(name or "")[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension in (".jsonl", ".ndjson"):
+        return "jsonl"
+    raise ValueError(f"Cannot detect format of {name!r}; use csv or jsonl")
+
+
+def read_rows(file, fmt):
+    """
+    Yield (line number, row) from an open text file, one row at a time
+
+    Rows that cannot be decoded are yielded as a ValueError, so they are
+    reported together with validation errors.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(file)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == "jsonl":
+        for line_number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_number, ValueError(f"invalid JSON: {e.msg}")
+    else:
+        raise ValueError(f"Unknown format: {fmt}")
+
+
+def validate_batch(validator, rows):
+    """
+    Validate a batch of (line number, row) pairs
+
+    Every row is checked completely (required fields and types) before the
+    batch is written, so a bad value is reported for its row instead of
+    failing the upsert halfway through.
+
+    Returns:
+        tuple: (valid records, [(line number, error message), ...])
+    """
+    records, errors = [], []
+    for line_number, row in rows:
+        if isinstance(row, Exception):
+            errors.append((line_number, str(row)))
+            continue
+        if not isinstance(row, dict):
+            errors.append((line_number, "row is not an object"))
+            continue
+        try:
+            records.append(validator(clean_row(row)))
+        except (ValueError, TypeError, AttributeError) as e:
+            errors.append((line_number, str(e)))
+    return records, errors
+
+
+def ingest(repository, entity, file, fmt, batch_size=1000):
+    """
+    Stream rows from a file into the repository
+
+    Args:
+        repository: Storage backend (see repository.py)
+        entity: One of ENTITIES
+        file: Open text file (CSV files opened with newline="")
+        fmt: "csv" or "jsonl"
+        batch_size: Rows validated and written per transaction
+
+    Returns:
+        dict: Report with row counts, the first errors and rows per second
+    """
+    if entity not in ENTITIES:
+        raise ValueError(f"Unknown entity: {entity}")
+    validator, method = ENTITIES[entity]
+    upsert = getattr(repository, method)
+
+    started = time.perf_counter()
+    rows = read_rows(file, fmt)
+    report = {"entity": entity, "rows": 0, "upserted": 0, "created": 0, "rejected": 0, "batches": 0, "errors": []}
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        records, errors = validate_batch(validator, batch)
+        if records:
+            report["created"] += upsert(records)
+        report["rows"] += len(batch)
+        report["upserted"] += len(records)
+        report["rejected"] += len(errors)
+        report["batches"] += 1
+        for line_number, message in errors[:MAX_REPORTED_ERRORS - len(report["errors"])]:
+            report["errors"].append({"line": line_number, "error": message})
+
+    seconds = time.perf_counter() - started
+    report["seconds"] = round(seconds, 3)
+    report["rows_per_sec"] = round(report["rows"] / seconds) if seconds > 0 else 0
+    return report
+
+
+def ingest_file(repository, entity, path, fmt=None, batch_size=1000):
+    """Open a CSV / JSONL file (format detected from its extension) and ingest it"""
+    fmt = fmt or detect_format(path)
+    with open(path, encoding="utf-8-sig", newline="") as file:
+        return ingest(repository, entity, file, fmt, batch_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load HR data files into the storage backend")
+    parser.add_argument("entity", choices=sorted(ENTITIES))
+    parser.add_argument("path", help="CSV or JSONL file")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="default: from the file extension")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    from repository import create_repository
+    repository = create_repository()
+    if repository.stats()["backend"] == "memory":
+        print("⚠️  STORAGE_BACKEND=memory: data is discarded when this command exits. "
+              "Use STORAGE_BACKEND=sqlite, or POST /api/ingest/<entity> on the running server.")
+
+    report = ingest_file(repository, args.entity, args.path, args.format, args.batch_size)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 1 if report["rejected"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
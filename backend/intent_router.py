@@ -0,0 +1,293 @@
+"""
+Local intent router
+Answers deterministic, read-only questions by calling the tool function directly
+and rendering a local template, skipping both LLM calls
+"""
+
+import os
+import re
+import threading
+
+from text_utils import normalize_text
+
+
+# Messages longer than this are left to the LLM - they usually carry extra intent
+MAX_ROUTED_TOKENS = 12
+
+# Markers of compound or conditional requests the router should not guess at
+_COMPOUND = re.compile(r"\b(va|voi|hoac|nhung|neu|khong phai|con nua)\b")
+
+_EMPLOYEE_ID = re.compile(r"\be\d{3,}\b")
+
+PRIORITY_LABELS = {
+    "High": "🔴 Ưu tiên cao",
+    "Medium": "🟡 Ưu tiên trung bình",
+    "Low": "🟢 Ưu tiên thấp"
+}
+
+
+def format_date(value):
+    """Format YYYY-MM-DD as DD/MM/YYYY"""
+    parts = (value or "").split("-")
+    return "/".join(reversed(parts)) if len(parts) == 3 else value
+
+
+def format_days(value):
+    """Format a day count without a trailing .0"""
+    return f"{value:g}" if isinstance(value, (int, float)) else str(value)
+
+
+def format_task(task):
+    if task["status"] == "Done":
+        return f"✅ [{task['task_id']}] {task['task']} (Hoàn thành)"
+    priority = PRIORITY_LABELS.get(task.get("priority"), task.get("priority", ""))
+    return f"⏳ [{task['task_id']}] {task['task']} (Hạn: {format_date(task['due_date'])}) - {priority}"
+
+
+# ============================================================================
+# TEMPLATES
+# ============================================================================
+
+def render_leave_balance(result):
+    leave = result["leave_balance"]
+    return (
+        "🏖️ **Số dư ngày phép của anh/chị:**\n\n"
+        f"- Phép năm: **{format_days(leave['annual_leave_remaining'])}**/{format_days(leave['annual_leave_total'])} ngày "
+        f"(đã dùng {format_days(leave['annual_leave_used'])})\n"
+        f"- Phép ốm: **{format_days(leave['sick_leave_remaining'])}**/{format_days(leave['sick_leave_total'])} ngày "
+        f"(đã dùng {format_days(leave['sick_leave_used'])})\n"
+        f"- Nghỉ không lương đã dùng: {format_days(leave['unpaid_leave_used'])} ngày\n"
+        f"- Nghỉ đặc biệt đã dùng: {format_days(leave['special_leave_used'])} ngày\n\n"
+        "📝 Đăng ký nghỉ phép trên [F-Leave](http://fleave.fpt.com)."
+    ), ["Cách đăng ký nghỉ phép?", "Chính sách nghỉ ốm thế nào?", "Nhiệm vụ của tôi là gì?"]
+
+
+def render_onboarding_tasks(result):
+    tasks = result["data"]
+    pending = sum(1 for t in tasks if t["status"] != "Done")
+    lines = "\n".join(format_task(t) for t in tasks)
+    return (
+        f"📋 **Nhiệm vụ onboarding của anh/chị** ({pending}/{len(tasks)} chưa hoàn thành):\n\n{lines}"
+    ), ["Task nào sắp hết hạn?", "Nhiệm vụ tiếp theo là gì?", "Đánh dấu task hoàn thành"]
+
+
+def render_urgent_tasks(result):
+    tasks = result["urgent_tasks"]
+    if not tasks:
+        return (
+            "🎉 Không có nhiệm vụ nào sắp đến hạn trong 2 ngày tới. Anh/chị đang làm rất tốt!"
+        ), ["Nhiệm vụ của tôi là gì?", "Nhiệm vụ tiếp theo là gì?", "Khi nào có meeting?"]
+    lines = []
+    for task in tasks:
+        days_text = "hôm nay" if task["days_left"] == 0 else f"còn {task['days_left']} ngày"
+        lines.append(f"⚠️ [{task['task_id']}] **{task['task']}** - Hạn {format_date(task['due_date'])} ({days_text})")
+    return (
+        f"⏰ **Có {len(tasks)} nhiệm vụ sắp đến hạn:**\n\n" + "\n".join(lines)
+    ), ["Đánh dấu task hoàn thành", "Nhiệm vụ tiếp theo là gì?", "Xem tất cả nhiệm vụ"]
+
+
+def render_next_task(result):
+    task = result.get("next_task")
+    if not task:
+        return (
+            f"🎉 {result.get('message', 'Anh/chị đã hoàn thành tất cả nhiệm vụ onboarding.')}"
+        ), ["Có khóa học nào nên học?", "Khi nào có meeting?", "Tôi còn bao nhiêu ngày phép?"]
+    return (
+        "👉 **Nhiệm vụ tiếp theo anh/chị nên làm:**\n\n"
+        f"{format_task(task)}\n\n"
+        f"📝 {task.get('description', '')}\n\n"
+        f"Còn lại {result.get('remaining_count', 1)} nhiệm vụ chưa hoàn thành."
+    ), ["Đánh dấu task hoàn thành", "Task nào sắp hết hạn?", "Xem tất cả nhiệm vụ"]
+
+
+def render_team_meetings(result):
+    lines = [
+        f"- **{m['name']}**: {m['schedule']} ({m['duration']}) - [Tham gia]({m['link']})"
+        for m in result["meetings"]
+    ]
+    return (
+        f"👥 **Team {result['team_name']}** ({result['members_count']} thành viên)\n"
+        f"Team lead: {result['team_lead']} ({result['team_lead_email']})\n\n"
+        "📅 **Lịch họp cố định:**\n" + "\n".join(lines)
+    ), ["Ai là buddy của tôi?", "Nhiệm vụ của tôi là gì?", "Quản lý của tôi là ai?"]
+
+
+def render_contact(role_label, name, email, phone, teams):
+    return (
+        f"🤝 **{role_label} của anh/chị là {name}**\n\n"
+        f"📧 Email: {email}\n"
+        f"📞 Phone: {phone}\n"
+        f"💬 [Chat trên Teams]({teams})"
+    )
+
+
+def render_buddy(result):
+    employee = result["data"]
+    return render_contact(
+        "Buddy", employee["buddy"], employee["buddy_email"],
+        employee["buddy_phone"], employee["buddy_teams"]
+    ), ["Gửi lời giới thiệu đến buddy", "Quản lý của tôi là ai?", "Khi nào có meeting?"]
+
+
+def render_manager(result):
+    employee = result["data"]
+    return render_contact(
+        "Quản lý", employee["manager"], employee["manager_email"],
+        employee["manager_phone"], employee["manager_teams"]
+    ), ["Gửi lời giới thiệu đến quản lý", "Ai là buddy của tôi?", "Nhiệm vụ của tôi là gì?"]
+
+
+# ============================================================================
+# INTENTS
+# ============================================================================
+
+# Patterns match the normalized (lowercase, diacritic-folded) message.
+# Only read-only functions are routed: task updates need the confirmation flow.
+INTENTS = [
+    {
+        "name": "leave_balance",
+        "function": "get_leave_balance",
+        "patterns": [r"bao nhieu (ngay )?phep", r"so du (ngay )?phep", r"ngay phep (cua (toi|e\d+)|con lai)", r"con (may|bao nhieu) ngay phep"],
+        "render": render_leave_balance
+    },
+    {
+        "name": "next_task",
+        "function": "get_next_task",
+        "patterns": [r"(nhiem vu|task|viec) (tiep theo|ke tiep)", r"(toi )?nen lam gi tiep"],
+        "render": render_next_task
+    },
+    {
+        "name": "urgent_tasks",
+        "function": "check_urgent_tasks",
+        "patterns": [r"sap (den|het) han", r"(nhiem vu|task) (gap|khan cap)", r"deadline gan"],
+        "render": render_urgent_tasks
+    },
+    {
+        "name": "onboarding_tasks",
+        "function": "get_onboarding_tasks",
+        "patterns": [r"^(cac |danh sach )?(nhiem vu|task|cong viec) (onboarding )?cua toi( la gi)?$", r"^toi (can|phai) lam (nhung )?(gi|viec gi)$", r"^xem (tat ca )?(nhiem vu|task)$"],
+        "render": render_onboarding_tasks
+    },
+    {
+        "name": "team_meetings",
+        "function": "get_team_meetings",
+        "patterns": [r"lich hop", r"(khi nao|bao gio) (team )?(toi )?(co )?(hop|meeting)", r"meeting cua team"],
+        "render": render_team_meetings
+    },
+    {
+        "name": "buddy_info",
+        "function": "get_employee_info",
+        "patterns": [r"^(ai la )?buddy cua toi( la ai)?$"],
+        "render": render_buddy
+    },
+    {
+        "name": "manager_info",
+        "function": "get_employee_info",
+        "patterns": [r"^(ai la )?(quan ly|manager) cua toi( la ai)?$"],
+        "render": render_manager
+    }
+]
+
+for _intent in INTENTS:
+    _intent["compiled"] = [re.compile(p) for p in _intent["patterns"]]
+
+
+class IntentRouter:
+    """
+    Rule-based router in front of the LLM
+
+    A message is routed only when exactly one intent matches, the message is
+    short, and it contains no compound/conditional markers. Everything else
+    (and any tool error) falls back to the LLM.
+    """
+
+    def __init__(self, enabled=True, default_employee_id="E123"):
+        self.enabled = enabled
+        self.default_employee_id = default_employee_id
+        self._lock = threading.Lock()
+        self.routed = 0
+        self.fallbacks = 0
+        self.by_intent = {}
+
+    def match(self, message, employee_id=None):
+        """
+        Find a confident intent for a user message
+
+        Args:
+            message: Raw user message
+            employee_id: Employee the conversation is about (defaults to E123)
+
+        Returns:
+            dict: {"intent", "function", "arguments", "render"} or None
+        """
+        if not self.enabled:
+            return None
+
+        text = normalize_text(message)
+        if not text or len(text.split()) > MAX_ROUTED_TOKENS or _COMPOUND.search(text):
+            self._count(None)
+            return None
+
+        matches = [i for i in INTENTS if any(p.search(text) for p in i["compiled"])]
+        if len(matches) != 1:
+            self._count(None)
+            return None
+
+        # An explicit employee ID in the message overrides the conversation's employee
+        explicit = _EMPLOYEE_ID.search(text)
+        intent = matches[0]
+        return {
+            "intent": intent["name"],
+            "function": intent["function"],
+            "arguments": {
+                "employee_identifier": explicit.group(0).upper() if explicit
+                else employee_id or self.default_employee_id
+            },
+            "render": intent["render"]
+        }
+
+    def render(self, route, result):
+        """
+        Render a tool result with the intent's template
+
+        Returns:
+            tuple: (main_answer, suggested_prompts), or None if the tool failed
+        """
+        if not result.get("success"):
+            self._count(None)
+            return None
+        try:
+            rendered = route["render"](result)
+        except (KeyError, TypeError):
+            self._count(None)
+            return None
+        self._count(route["intent"])
+        return rendered
+
+    def _count(self, intent):
+        with self._lock:
+            if intent is None:
+                self.fallbacks += 1
+            else:
+                self.routed += 1
+                self.by_intent[intent] = self.by_intent.get(intent, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            total = self.routed + self.fallbacks
+            return {
+                "enabled": self.enabled,
+                "routed": self.routed,
+                "fallbacks": self.fallbacks,
+                "routed_ratio": round(self.routed / total, 4) if total else 0.0,
+                "by_intent": dict(self.by_intent)
+            }
+
+
+def create_intent_router():
+    """
+    Build the router from environment variables
+
+    ROUTER_ENABLED: "false" disables local routing (default true)
+    """
+    return IntentRouter(enabled=os.getenv("ROUTER_ENABLED", "true").lower() != "false")
@@ -0,0 +1,258 @@
+"""
+Retrieval over the IT/HR knowledge base
+Splits the knowledge base into chunks and ranks them against the user's message with BM25,
+so only the relevant parts are sent to the LLM
+"""
+
+import math
+import os
+import threading
+import time
+from collections import Counter
+
+from context_manager import estimate_tokens
+from text_utils import tokenize
+
+
+# Frequent function words (diacritics folded) that carry no topic information
+STOPWORDS = {
+    "a", "ai", "anh", "ban", "bao", "bi", "cac", "cai", "chi", "cho", "co", "cua",
+    "da", "de", "den", "duoc", "em", "gi", "hay", "khi", "khong", "la", "lam",
+    "mot", "nao", "nay", "nhe", "nhu", "nhung", "o", "oi", "ra", "roi", "sao",
+    "se", "the", "thi", "toi", "trong", "tu", "va", "vao", "ve", "voi", "vay"
+}
+
+# Section headings used when the knowledge base was inlined in the system prompt
+HR_POLICY_SECTIONS = [
+    ("compensation", "HR Policy - Lương & Phúc lợi (Compensation & Benefits)"),
+    ("benefits", "HR Policy - Phúc lợi (Benefits)"),
+    ("leave_policy", "HR Policy - Nghỉ phép & Chấm công (Leave & Time-Off)"),
+    ("career", "HR Policy - Đào tạo & Phát triển (Training & Career)"),
+    ("internal_systems", "HR Policy - Hệ thống Nội bộ (Internal Systems)"),
+    ("expense_policy", "HR Policy - Chính sách Chi phí (Expense Policy)")
+]
+
+KNOWLEDGE_HEADER = "## Knowledge Base (các mục liên quan đến câu hỏi hiện tại)\n"
+
+
+def index_terms(text):
+    """
+    Turn text into BM25 terms
+
+    Syllables are diacritic-folded and stopwords dropped. Most Vietnamese words
+    span two syllables ("nghỉ phép", "phiếu lương"), so adjacent syllable pairs
+    are added as extra terms to reward phrase matches.
+    """
+    words = tokenize(text.replace("_", " "))
+    terms = [w for w in words if w not in STOPWORDS]
+    terms += [
+        f"{first}_{second}" for first, second in zip(words, words[1:])
+        if first not in STOPWORDS or second not in STOPWORDS
+    ]
+    return terms
+
+
+def build_knowledge_chunks(knowledge_base, hr_policy):
+    """
+    Split the knowledge base into self-contained chunks
+
+    Each IT support topic, HR system, office and HR policy entry becomes one
+    chunk, rendered the same way it used to appear in the system prompt.
+
+    Returns:
+        list: Chunks as {"id", "section", "text"}
+    """
+    chunks = []
+
+    for item in knowledge_base["it_support"]:
+        if "topic" not in item:
+            continue
+        lines = [f"**{item['topic']}:**"]
+        lines += [f"- {key.capitalize()}: {value}" for key, value in item.items() if key != "topic"]
+        chunks.append({"id": f"it:{item['topic']}", "section": "Knowledge Base - IT Support", "text": "\n".join(lines)})
+
+    for item in knowledge_base["hr_systems"]:
+        lines = [f"**{item['name']}** ({item['system']}):", f"- Link: {item['link']}", f"- Mô tả: {item['description']}"]
+        if "approval" in item:
+            lines.append(f"- Phê duyệt: {item['approval']}")
+        if "deadline" in item:
+            lines.append(f"- Deadline: {item['deadline']}")
+        if "availability" in item:
+            lines.append(f"- Thời gian: {item['availability']}")
+        chunks.append({"id": f"hr_system:{item['system']}", "section": "Knowledge Base - HR Systems", "text": "\n".join(lines)})
+
+    for office in knowledge_base["office_info"]:
+        lines = [
+            f"**{office['location']}:**",
+            f"- Địa chỉ: {office['address']}",
+            f"- Giờ làm việc: {office['working_hours']}",
+            f"- Parking: {office['parking']}",
+            f"- Canteen: {office['canteen']}"
+        ]
+        chunks.append({"id": f"office:{office['location']}", "section": "Office Information", "text": "\n".join(lines)})
+
+    for section_key, title in HR_POLICY_SECTIONS:
+        for key, value in hr_policy.get(section_key, {}).items():
+            chunks.append({"id": f"{section_key}:{key}", "section": title, "text": f"- **{key}**: {value}"})
+
+    return chunks
+
+
+def render_chunks(chunks):
+    """Render chunks grouped under their section headings"""
+    parts = [KNOWLEDGE_HEADER]
+    section = None
+    for chunk in chunks:
+        if chunk["section"] != section:
+            section = chunk["section"]
+            parts.append(f"\n### {section}\n")
+        parts.append(chunk["text"] + "\n")
+    return "".join(parts)
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of chunks"""
+
+    def __init__(self, chunks, k1=1.5, b=0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        # Section titles are indexed with the chunk so "chính sách nghỉ phép" finds leave_policy entries
+        docs = [Counter(index_terms(f"{c['section']} {c['id']} {c['text']}")) for c in chunks]
+        self._term_freqs = docs
+        self._lengths = [sum(doc.values()) for doc in docs]
+        self._avg_length = sum(self._lengths) / len(docs) if docs else 0.0
+        document_freq = Counter(term for doc in docs for term in doc)
+        n = len(docs)
+        self._idf = {
+            term: math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for term, df in document_freq.items()
+        }
+
+    @property
+    def vocabulary_size(self):
+        return len(self._idf)
+
+    def search(self, query, k=4):
+        """
+        Rank chunks for a query
+
+        Returns:
+            list: Up to k (chunk, score) pairs with a positive score, best first
+        """
+        terms = [t for t in set(index_terms(query)) if t in self._idf]
+        if not terms:
+            return []
+        scored = []
+        for index, doc in enumerate(self._term_freqs):
+            norm = self.k1 * (1 - self.b + self.b * self._lengths[index] / self._avg_length)
+            score = 0.0
+            for term in terms:
+                tf = doc.get(term)
+                if tf:
+                    score += self._idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            if score > 0:
+                scored.append((score, index))
+        scored.sort(reverse=True)
+        return [(self.chunks[index], round(score, 4)) for score, index in scored[:k]]
+
+
+class KnowledgeRetriever:
+    """
+    Selects the knowledge base chunks sent with each LLM request
+
+    The index is built once at startup (and again on rebuild(), e.g. after a
+    knowledge base reload). Each retrieval reports how many prompt tokens were
+    saved compared with sending the whole knowledge base.
+    """
+
+    def __init__(self, chunk_source, top_k=4, min_score_ratio=0.3, enabled=True):
+        """
+        Args:
+            chunk_source: Callable returning the chunk list (see build_knowledge_chunks)
+            top_k: Maximum chunks injected per request
+            min_score_ratio: Drop chunks scoring below this fraction of the best match
+            enabled: If False, every request gets the whole knowledge base
+        """
+        self._chunk_source = chunk_source
+        self.top_k = top_k
+        self.min_score_ratio = min_score_ratio
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.retrievals = 0
+        self.tokens_saved_total = 0
+        self.rebuild()
+
+    def rebuild(self):
+        """(Re)build the index from the current knowledge base data"""
+        started = time.perf_counter()
+        chunks = self._chunk_source()
+        index = BM25Index(chunks)
+        full_text = render_chunks(chunks)
+        with self._lock:
+            self._index = index
+            self._full_text = full_text
+            self._full_tokens = estimate_tokens(full_text)
+            self.build_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    def retrieve(self, query):
+        """
+        Pick the knowledge base text for a user message
+
+        Returns:
+            tuple: (text to inject or None, report dict)
+        """
+        with self._lock:
+            index, full_text, full_tokens = self._index, self._full_text, self._full_tokens
+
+        if not self.enabled:
+            text, chunk_ids = full_text, [c["id"] for c in index.chunks]
+        else:
+            results = index.search(query or "", self.top_k)
+            if results:
+                threshold = results[0][1] * self.min_score_ratio
+                results = [(chunk, score) for chunk, score in results if score >= threshold]
+            chunk_ids = [chunk["id"] for chunk, _ in results]
+            text = render_chunks([chunk for chunk, _ in results]) if results else None
+
+        injected = estimate_tokens(text)
+        with self._lock:
+            self.retrievals += 1
+            self.tokens_saved_total += full_tokens - injected
+
+        return text, {
+            "chunks": chunk_ids,
+            "tokens_injected": injected,
+            "tokens_full_kb": full_tokens,
+            "tokens_saved": full_tokens - injected
+        }
+
+    def stats(self):
+        """Return index size and average savings for monitoring"""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "chunks": len(self._index.chunks),
+                "vocabulary": self._index.vocabulary_size,
+                "build_ms": self.build_ms,
+                "top_k": self.top_k,
+                "tokens_full_kb": self._full_tokens,
+                "retrievals": self.retrievals,
+                "avg_tokens_saved": round(self.tokens_saved_total / self.retrievals, 1) if self.retrievals else 0.0
+            }
+
+
+def create_knowledge_retriever(chunk_source):
+    """
+    Build the retriever from environment variables
+
+    KB_RETRIEVAL_ENABLED: "false" sends the whole knowledge base every time (default true)
+    KB_TOP_K: Maximum chunks injected per request (default 4)
+    KB_MIN_SCORE_RATIO: Minimum score relative to the best chunk (default 0.3)
+    """
+    return KnowledgeRetriever(
+        chunk_source,
+        top_k=int(os.getenv("KB_TOP_K", 4)),
+        min_score_ratio=float(os.getenv("KB_MIN_SCORE_RATIO", 0.3)),
+        enabled=os.getenv("KB_RETRIEVAL_ENABLED", "true").lower() != "false"
+    )
@@ -0,0 +1,267 @@
+"""
+HTTP transport for the Azure OpenAI client
+Pooled keep-alive connections (HTTP/2 when the h2 package is installed), bounded
+timeouts, exponential-backoff retries that honour Retry-After, and optional hedged
+requests that race a second attempt once the first one is slower than the recent p95
+"""
+
+import asyncio
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+import httpx
+
+try:
+    import h2  # noqa: F401  (enables httpx's HTTP/2 support)
+    HTTP2_AVAILABLE = True
+except ImportError:  # h2 is optional
+    HTTP2_AVAILABLE = False
+
+
+# Responses worth retrying: timeouts, conflicts, rate limits and server errors
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+# Streamed calls return headers at the first token, long before a full completion,
+# so their latencies are tracked separately
+STREAM_BODY = re.compile(rb'"stream":\s*true')
+
+
+def retry_after_seconds(response):
+    """
+    Delay requested by the server, from retry-after-ms (Azure) or Retry-After
+
+    Returns:
+        float: Seconds to wait, or None if the response does not say
+    """
+    value = response.headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class ResilientTransport(httpx.AsyncBaseTransport):
+    """
+    Wraps an httpx transport with retries and optional hedging
+
+    Retries: connection errors and RETRYABLE_STATUS_CODES are retried up to
+    max_retries times with full-jitter exponential backoff (backoff_base * 2^n,
+    capped at backoff_max). A Retry-After longer than the computed backoff is
+    honoured; one longer than backoff_max is not waited out - the response is
+    returned so the caller fails fast instead of stalling a request.
+
+    Hedging: once hedge_min_samples latencies have been seen (separately for
+    streamed and complete calls), an attempt still waiting for response
+    headers after the recent p95 gets a second, identical
+    attempt; whichever answers first is used and the other is cancelled. At
+    most ~5% of requests are hedged, which cuts the latency tail of a slow
+    region at the price of that many duplicate prompts. Streamed responses are
+    raced up to their headers only; once the body is being read, nothing is
+    retried or hedged.
+    """
+
+    def __init__(self, transport, max_retries=3, backoff_base=0.5, backoff_max=20.0,
+                 hedge=False, hedge_min_samples=20, latency_window=200, http2=False):
+        """
+        Args:
+            transport: Inner transport doing the actual I/O (httpx.AsyncHTTPTransport)
+            max_retries: Retries after the first attempt
+            backoff_base / backoff_max: Backoff schedule in seconds
+            hedge: Race a second attempt after the recent p95 latency
+            hedge_min_samples: Latencies needed before the p95 is trusted
+            latency_window: Number of recent latencies the p95 is computed from
+            http2: Whether the inner transport negotiates HTTP/2 (reported in stats)
+        """
+        self._transport = transport
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self.http2 = http2
+        self._latencies = {
+            "stream": deque(maxlen=latency_window),
+            "complete": deque(maxlen=latency_window)
+        }
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.failures = 0
+
+    def p95_seconds(self, kind="complete"):
+        """p95 of recent time-to-headers of "stream" or "complete" calls, or None until hedge_min_samples were seen"""
+        with self._lock:
+            if len(self._latencies[kind]) < self.hedge_min_samples:
+                return None
+            ordered = sorted(self._latencies[kind])
+        return ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)]
+
+    def backoff(self, attempt, response=None):
+        """Seconds to wait before retry number `attempt` (1-based), or None to give up"""
+        delay = random.uniform(0, min(self.backoff_base * 2 ** (attempt - 1), self.backoff_max))
+        requested = retry_after_seconds(response) if response is not None else None
+        if requested is not None:
+            if requested > self.backoff_max:
+                return None
+            delay = max(delay, requested)
+        return delay
+
+    async def handle_async_request(self, request):
+        with self._lock:
+            self.requests += 1
+        attempt = 0
+        while True:
+            try:
+                response = await self._send(request)
+            except httpx.TransportError:
+                attempt += 1
+                if attempt > self.max_retries:
+                    with self._lock:
+                        self.failures += 1
+                    raise
+                delay = self.backoff(attempt)
+            else:
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    return response
+                attempt += 1
+                delay = self.backoff(attempt, response) if attempt <= self.max_retries else None
+                if delay is None:
+                    with self._lock:
+                        self.failures += 1
+                    return response
+                await response.aclose()
+            with self._lock:
+                self.retries += 1
+            await asyncio.sleep(delay)
+
+    async def _attempt(self, request, kind):
+        started = time.perf_counter()
+        response = await self._transport.handle_async_request(request)
+        if response.status_code < 400:
+            with self._lock:
+                self._latencies[kind].append(time.perf_counter() - started)
+        return response
+
+    async def _send(self, request):
+        try:
+            kind = "stream" if STREAM_BODY.search(request.content) else "complete"
+        except httpx.RequestNotRead:  # streamed upload - the SDK never sends one
+            kind = "complete"
+        hedge_after = self.p95_seconds(kind) if self.hedge else None
+        if hedge_after is None:
+            return await self._attempt(request, kind)
+
+        primary = asyncio.ensure_future(self._attempt(request, kind))
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=hedge_after)
+            if done:
+                return primary.result()
+
+            with self._lock:
+                self.hedged += 1
+            backup = asyncio.ensure_future(self._attempt(request, kind))
+            pending = {primary, backup}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((task for task in done if task.exception() is None), None)
+                if winner is not None:
+                    for task in done - {winner}:
+                        close_abandoned(task)
+                    if winner is backup:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return winner.result()
+            # Both attempts failed - surface the primary's error
+            return primary.result()
+        finally:
+            for task in pending:
+                task.cancel()
+                task.add_done_callback(close_abandoned)
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+    def stats(self):
+        """Return retry / hedging counters for monitoring"""
+        p95 = {kind: self.p95_seconds(kind) for kind in self._latencies}
+        with self._lock:
+            return {
+                "http2": self.http2,
+                "requests": self.requests,
+                "retries": self.retries,
+                "failures": self.failures,
+                "hedging": self.hedge,
+                "hedged": self.hedged,
+                "hedge_wins": self.hedge_wins,
+                "p95_ms": {kind: round(value * 1000, 1) if value is not None else None for kind, value in p95.items()}
+            }
+
+
+def close_abandoned(task):
+    """Release the connection of a losing hedge attempt that still produced a response"""
+    if task.cancelled() or task.exception() is not None:
+        return
+    asyncio.ensure_future(task.result().aclose())
+
+
+def create_http_client():
+    """
+    Build the httpx client used by the Azure OpenAI SDK from environment variables
+
+    LLM_MAX_CONNECTIONS: Connection pool size (default 100)
+    LLM_MAX_KEEPALIVE: Idle connections kept open (default 20)
+    LLM_KEEPALIVE_EXPIRY: Seconds an idle connection is kept (default 30)
+    LLM_HTTP2: "auto" (HTTP/2 if h2 is installed), "true" or "false" (default auto)
+    LLM_CONNECT_TIMEOUT: Seconds to establish a connection (default 5)
+    LLM_READ_TIMEOUT: Seconds without data before a call fails (default 60)
+    LLM_MAX_RETRIES: Retries of failed or throttled calls (default 3)
+    LLM_BACKOFF_BASE / LLM_BACKOFF_MAX: Backoff schedule in seconds (default 0.5 / 20)
+    LLM_HEDGE: "true" races a second attempt after the recent p95 (default false)
+    LLM_HEDGE_MIN_SAMPLES: Calls measured before hedging starts (default 20)
+
+    Returns:
+        tuple: (httpx.AsyncClient, ResilientTransport)
+    """
+    http2 = os.getenv("LLM_HTTP2", "auto").lower()
+    http2 = HTTP2_AVAILABLE if http2 == "auto" else http2 == "true"
+    transport = ResilientTransport(
+        httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(
+                max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", 100)),
+                max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE", 20)),
+                keepalive_expiry=float(os.getenv("LLM_KEEPALIVE_EXPIRY", 30))
+            ),
+            http2=http2
+        ),
+        max_retries=int(os.getenv("LLM_MAX_RETRIES", 3)),
+        backoff_base=float(os.getenv("LLM_BACKOFF_BASE", 0.5)),
+        backoff_max=float(os.getenv("LLM_BACKOFF_MAX", 20)),
+        hedge=os.getenv("LLM_HEDGE", "false").lower() == "true",
+        hedge_min_samples=int(os.getenv("LLM_HEDGE_MIN_SAMPLES", 20)),
+        http2=http2
+    )
+    timeout = httpx.Timeout(
+        float(os.getenv("LLM_READ_TIMEOUT", 60)),
+        connect=float(os.getenv("LLM_CONNECT_TIMEOUT", 5))
+    )
+    return httpx.AsyncClient(transport=transport, timeout=timeout), transport
@@ -0,0 +1,109 @@
+"""
+Latency histograms and Prometheus text exposition
+Shared by the tool registry (per-tool latency) and the tracer (per-request and per-span latency)
+"""
+
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is +Inf
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class LatencyHistogram:
+    """
+    Latency histogram with fixed buckets, Prometheus style
+
+    Not thread-safe on its own - callers update it under their own lock.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms):
+        for i, bound in enumerate(self.buckets):
+            if ms <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        self.counts[i] += 1
+        self.count += 1
+        self.sum_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def quantile(self, q):
+        """Upper bound of the bucket containing the q-th quantile (None if empty)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max_ms
+
+    def cumulative(self):
+        """(upper bound in ms, observations <= bound) pairs, ending with +Inf"""
+        pairs = []
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            pairs.append((bound, seen))
+        pairs.append(("+Inf", self.count))
+        return pairs
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "sum_ms": round(self.sum_ms, 3),
+            "avg_ms": round(self.sum_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "buckets": {str(bound): count for bound, count in self.cumulative()}
+        }
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{escape_label(value)}"' for key, value in labels.items()) + "}"
+
+
+def histogram_lines(name, description, series):
+    """
+    Prometheus text lines for a histogram family, in seconds
+
+    Args:
+        series: List of (labels dict, LatencyHistogram)
+    """
+    lines = [f"# HELP {name} {description}", f"# TYPE {name} histogram"]
+    for labels, histogram in series:
+        for bound, count in histogram.cumulative():
+            le = bound if bound == "+Inf" else f"{bound / 1000:g}"
+            lines.append(f"{name}_bucket{format_labels(dict(labels, le=le))} {count}")
+        lines.append(f"{name}_sum{format_labels(labels)} {histogram.sum_ms / 1000:.6f}")
+        lines.append(f"{name}_count{format_labels(labels)} {histogram.count}")
+    return lines
+
+
+def counter_lines(name, description, series):
+    """
+    Prometheus text lines for a counter family
+
+    Args:
+        series: List of (labels dict, value)
+    """
+    lines = [f"# HELP {name} {description}", f"# TYPE {name} counter"]
+    for labels, value in series:
+        lines.append(f"{name}{format_labels(labels)} {value}")
+    return lines
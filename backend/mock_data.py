@@ -3,6 +3,15 @@ Mock data for Employee Onboarding Chatbot
 Contains FAQs, employee information, onboarding tasks, and HR policies
 """
 
+import threading
+from datetime import date
+
+from course_index import CourseIndex
+from name_index import EmployeeNameIndex
+from task_index import TaskIndex
+from due_index import DueDateIndex
+from priority_index import TaskPriorityIndex
+
 # ============================================================================
 # SECTION 1: FAQ DATA
 # ============================================================================
@@ -575,47 +584,158 @@ mock_training_db = [
 # SECTION 9: HELPER FUNCTIONS
 # ============================================================================
 
+# Name index over employees (diacritic-insensitive, partial and fuzzy matching)
+_employee_name_index = EmployeeNameIndex(mock_new_hires_db.values())
+
+# task_id -> (employee_id, task) over all employees; also enforces unique task IDs
+_task_index = TaskIndex(mock_onboarding_tasks)
+
+# Pending tasks sorted by due date, per employee and company-wide (urgent task queries)
+_due_index = DueDateIndex(mock_onboarding_tasks)
+
+# Pending tasks per employee in (priority, due date) order (next task queries)
+_priority_index = TaskPriorityIndex(mock_onboarding_tasks)
+
+# Keyword index over the course catalog (diacritic-insensitive, prefix matching)
+_course_index = CourseIndex(mock_training_db)
+
+# course id -> position in mock_training_db, for replacing courses on upsert
+_course_positions = {course["id"]: i for i, course in enumerate(mock_training_db)}
+
+# Data version stamp - bumped whenever task, leave or knowledge base data
+# changes, so caches of answers derived from the data can detect staleness.
+# Each employee also remembers the version of the last change to their own data.
+_data_version = 0
+_employee_data_versions = {}
+_data_version_lock = threading.Lock()
+
+# Employee directory version - bumped only when employee records change, so
+# identifier -> employee lookups can be cached across task updates
+_directory_version = 0
+
+# Knowledge version - bumped when data shared by every employee changes (knowledge
+# base / HR policy reload, course catalog), so answers that only use it survive
+# other employees' task updates
+_knowledge_version = 0
+
+
+def get_data_version():
+    """Get the current data version stamp"""
+    return _data_version
+
+
+def get_employee_data_version(employee_id):
+    """Get the version stamp of the last change to an employee's data (0 if never changed)"""
+    return _employee_data_versions.get(employee_id, 0)
+
+
+def get_directory_version():
+    """Get the employee directory version stamp"""
+    return _directory_version
+
+
+def get_knowledge_version():
+    """Get the shared knowledge version stamp"""
+    return _knowledge_version
+
+
+def bump_knowledge_version():
+    """Mark shared data (knowledge base, policies, courses) as changed; returns the new knowledge version"""
+    global _knowledge_version
+    with _data_version_lock:
+        _knowledge_version += 1
+        return _knowledge_version
+
+
+def bump_directory_version():
+    """Mark employee records as changed; returns the new directory version"""
+    global _directory_version
+    with _data_version_lock:
+        _directory_version += 1
+        return _directory_version
+
+
+def bump_data_version(employee_ids=()):
+    """Mark the mock data (of the given employees) as changed; returns the new version"""
+    global _data_version
+    with _data_version_lock:
+        _data_version += 1
+        for employee_id in employee_ids:
+            _employee_data_versions[employee_id] = _data_version
+        return _data_version
+
+
+def _index_task(employee_id, task):
+    """Refresh the pending task indexes after a task was added or changed"""
+    _due_index.update(employee_id, task)
+    _priority_index.update(employee_id, task)
+
+
+def _unindex_task(task_id):
+    _due_index.remove(task_id)
+    _priority_index.remove(task_id)
+
+
 def get_all_employee_ids():
     """Get list of all employee IDs in the system"""
     return list(mock_new_hires_db.keys())
 
 
+def search_employees_by_name(name, limit=5):
+    """
+    Find employees by full or partial name, tolerating missing diacritics and typos
+    Returns ranked candidates with employee_id, name, score and match kind
+    """
+    candidates = _employee_name_index.search(name, limit)
+    for candidate in candidates:
+        candidate["name"] = mock_new_hires_db[candidate["employee_id"]]["name"]
+    return candidates
+
+
 def get_employee_by_name(name):
-    """Find employee by name (case-insensitive partial match)"""
-    name_lower = name.lower()
-    for emp_id, emp_data in mock_new_hires_db.items():
-        if name_lower in emp_data["name"].lower():
-            return emp_data
-    return None
+    """
+    Find the employee best matching a name
+    Returns None if nobody matches or several employees match equally well
+    """
+    candidates = _employee_name_index.search(name, limit=2)
+    if not candidates:
+        return None
+    if len(candidates) > 1 and candidates[0]["score"] == candidates[1]["score"]:
+        return None
+    return mock_new_hires_db.get(candidates[0]["employee_id"])
 
 
-def get_urgent_tasks(employee_id, days_threshold=2):
+def get_urgent_tasks(employee_id, days_threshold=2, today=None):
     """
     Get tasks that are due soon (within threshold days)
-    Used for proactive reminders
+    Used for proactive reminders; `today` (a date) defaults to the server's local date
     """
-    from datetime import datetime, timedelta
-    
-    if employee_id not in mock_onboarding_tasks:
-        return []
-    
-    today = datetime.now()
-    threshold_date = today + timedelta(days=days_threshold)
-    
-    urgent_tasks = []
-    for task in mock_onboarding_tasks[employee_id]:
-        if task["status"] == "Pending":
-            try:
-                due_date = datetime.strptime(task["due_date"], "%Y-%m-%d")
-                if today <= due_date <= threshold_date:
-                    days_left = (due_date - today).days
-                    task_with_urgency = task.copy()
-                    task_with_urgency["days_left"] = days_left
-                    urgent_tasks.append(task_with_urgency)
-            except ValueError:
-                continue
-    
-    return urgent_tasks
+    # Tasks due from tomorrow until today + threshold; days_left counts whole days from now
+    today = (today or date.today()).toordinal()
+    return [
+        dict(task, days_left=ordinal - today - 1)
+        for ordinal, task in _due_index.due(employee_id, today + 1, today + days_threshold)
+    ]
+
+
+def get_all_urgent_tasks(days_threshold=2, today=None):
+    """
+    Get pending tasks of all employees that are due soon, earliest first
+    Each task is returned with its employee_id and days_left
+    """
+    today = (today or date.today()).toordinal()
+    return [
+        dict(task, employee_id=employee_id, days_left=ordinal - today - 1)
+        for ordinal, employee_id, task in _due_index.due_all(today + 1, today + days_threshold)
+    ]
+
+
+def get_next_tasks(employee_id, limit=1):
+    """
+    Get an employee's next pending tasks, by priority (High > Medium > Low) then due date
+    Returns (tasks, total pending count)
+    """
+    return _priority_index.top(employee_id, limit)
 
 
 def update_task_status_in_db(task_id, new_status):
@@ -623,24 +743,56 @@ def update_task_status_in_db(task_id, new_status):
     Update task status in mock database
     Returns success status and updated task info
     """
-    for employee_id, tasks in mock_onboarding_tasks.items():
-        for task in tasks:
-            if task["task_id"] == task_id:
-                old_status = task["status"]
-                task["status"] = new_status
-                return {
-                    "success": True,
-                    "employee_id": employee_id,
-                    "task": task,
-                    "old_status": old_status
-                }
+    entry = _task_index.get(task_id)
+    if entry is None:
+        return {
+            "success": False,
+            "error": f"Không tìm thấy nhiệm vụ với ID: {task_id}"
+        }
     
+    employee_id, task = entry
+    old_status = task["status"]
+    task["status"] = new_status
+    _index_task(employee_id, task)
+    bump_data_version([employee_id])
     return {
-        "success": False,
-        "error": f"Không tìm thấy nhiệm vụ với ID: {task_id}"
+        "success": True,
+        "employee_id": employee_id,
+        "task": task,
+        "old_status": old_status
     }
 
 
+def get_task_by_id(task_id):
+    """
+    Find a task by ID across all employees
+    Returns (employee_id, task) or None if not found
+    """
+    return _task_index.get(task_id)
+
+
+def add_task_to_db(employee_id, task):
+    """
+    Add an onboarding task for an employee
+    Raises DuplicateTaskIdError if the task ID is already used
+    """
+    _task_index.insert(employee_id, task)
+    _index_task(employee_id, task)
+    bump_data_version([employee_id])
+
+
+def delete_task_from_db(task_id):
+    """
+    Delete an onboarding task
+    Returns the removed (employee_id, task) or None if not found
+    """
+    entry = _task_index.delete(task_id)
+    if entry is not None:
+        _unindex_task(task_id)
+        bump_data_version([entry[0]])
+    return entry
+
+
 def find_task_by_name(employee_id, task_name_keyword):
     """
     Find task by partial name match for confirmation
@@ -665,34 +817,81 @@ def get_leave_balance_from_db(employee_id):
     return mock_leave_db.get(employee_id)
 
 
-def search_training_courses_in_db(keyword=None, course_type=None):
+def search_training_courses_in_db(keyword=None, course_type=None, limit=None):
     """
     Search training courses by keyword or type
-    Returns list of matching courses
+    Returns list of matching courses, best match first
     """
-    results = []
-    
     if not keyword and not course_type:
         # Return all courses if no filter
-        return mock_training_db
-    
-    keyword_lower = keyword.lower() if keyword else ""
-    
-    for course in mock_training_db:
-        match = False
-        
-        # Search by keyword in name, category
-        if keyword:
-            if (keyword_lower in course["name"].lower() or 
-                keyword_lower in course["category"].lower()):
-                match = True
-        
-        # Filter by type
-        if course_type:
-            if course["type"].lower() == course_type.lower():
-                match = True if not keyword else (match and True)
-        
-        if match or (not keyword and not course_type):
-            results.append(course)
+        return mock_training_db[:limit]
     
-    return results
+    return _course_index.search(keyword, course_type, limit)
+
+
+def upsert_employees_in_db(employees):
+    """
+    Insert or replace employees (matched by employee_id)
+    Keeps the name index in sync; returns the number of new employees
+    """
+    created, employee_ids = 0, []
+    for employee in employees:
+        created += employee["employee_id"] not in mock_new_hires_db
+        mock_new_hires_db[employee["employee_id"]] = employee
+        _employee_name_index.add(employee)
+        employee_ids.append(employee["employee_id"])
+    bump_directory_version()
+    bump_data_version(employee_ids)
+    return created
+
+
+def upsert_tasks_in_db(tasks):
+    """
+    Insert or replace onboarding tasks given as (employee_id, task) pairs
+    Returns the number of new tasks
+    """
+    created, employee_ids = 0, []
+    for employee_id, task in tasks:
+        # A reassigned task also changes its previous owner's data
+        previous = _task_index.get(task["task_id"])
+        if previous is not None and previous[0] != employee_id:
+            employee_ids.append(previous[0])
+        created += _task_index.upsert(employee_id, task)
+        _index_task(employee_id, task)
+        employee_ids.append(employee_id)
+    bump_data_version(employee_ids)
+    return created
+
+
+def upsert_leave_balances_in_db(balances):
+    """
+    Insert or replace leave balances (matched by employee_id)
+    Returns the number of new balances
+    """
+    created, employee_ids = 0, []
+    for balance in balances:
+        created += balance["employee_id"] not in mock_leave_db
+        mock_leave_db[balance["employee_id"]] = balance
+        employee_ids.append(balance["employee_id"])
+    bump_data_version(employee_ids)
+    return created
+
+
+def upsert_courses_in_db(courses):
+    """
+    Insert or replace training courses (matched by id)
+    Keeps the course index in sync; returns the number of new courses
+    """
+    created = 0
+    for course in courses:
+        position = _course_positions.get(course["id"])
+        if position is None:
+            _course_positions[course["id"]] = len(mock_training_db)
+            mock_training_db.append(course)
+            created += 1
+        else:
+            mock_training_db[position] = course
+        _course_index.add(course)
+    bump_knowledge_version()
+    bump_data_version()
+    return created
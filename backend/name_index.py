@@ -0,0 +1,407 @@
+"""
+Employee name index
+Resolves (partial, unaccented or misspelled) names to ranked employee candidates
+"""
+
+import heapq
+import threading
+from itertools import islice
+
+from text_utils import normalize_text
+
+
+# Scores by match kind; fuzzy matches are scaled down further by edit distance
+EXACT_SCORE = 1.0
+TOKEN_SCORE = 0.9
+FUZZY_SCORE = 0.8
+
+# Token matches are ranked by distance and name length, and only this many of
+# the best are scored; past it the query is too vague to rank meaningfully
+MAX_TOKEN_CANDIDATES = 64
+
+# Employees read off the front of a query token's ranked list (first block size,
+# then sized by the hit rate) before falling back to whole posting set intersections
+RANKED_WALK_LIMIT = 4096
+RANKED_WALK_BLOCK = 256
+
+# Closest vocabulary tokens tried for each misspelled query token
+MAX_TOKEN_CORRECTIONS = 5
+
+
+def max_edit_distance(token):
+    """Typos tolerated in a name token of this length"""
+    return 1 if len(token) <= 6 else 2
+
+
+def edit_distance(a, b, limit=None):
+    """
+    Levenshtein distance between a and b
+
+    With a limit, returns limit + 1 as soon as the distance is known to exceed it.
+    """
+    if limit is not None and abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            ))
+        if limit is not None and min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over name tokens for typo-tolerant lookup
+
+    Each child edge is labelled with its edit distance to the parent, so a
+    search within distance d only descends into edges [dist - d, dist + d].
+    Names are built from a small vocabulary of family, middle and given
+    names, so the tree stays tiny even for 100k+ employees.
+    """
+
+    def __init__(self):
+        self._root = None
+
+    def add(self, word):
+        if self._root is None:
+            self._root = (word, {})
+            return
+        node = self._root
+        while True:
+            distance = edit_distance(word, node[0])
+            if distance == 0:
+                return
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = (word, {})
+                return
+            node = child
+
+    def search(self, word, max_distance):
+        """
+        Returns:
+            list: (distance, token) pairs within max_distance, closest first
+        """
+        if self._root is None:
+            return []
+        found = []
+        stack = [self._root]
+        while stack:
+            token, children = stack.pop()
+            distance = edit_distance(word, token)
+            if distance <= max_distance:
+                found.append((distance, token))
+            for edge in range(distance - max_distance, distance + max_distance + 1):
+                child = children.get(edge)
+                if child is not None:
+                    stack.append(child)
+        found.sort()
+        return found
+
+
+class EmployeeNameIndex:
+    """
+    Name lookup in three stages, each only run if the previous found nothing:
+
+    1. Exact match on the normalized full name ("nguyen van an")
+    2. Whole-token match: every query token is a token of the name, so
+       "An" or "Van An" find "Nguyễn Văn An"; ranked by how much of the name
+       the query covers
+    3. Fuzzy match for typos: each unknown query token is corrected to the
+       closest name tokens in a BK-tree ("Nguyn" -> "nguyen"), then matched
+       like stage 2 and ranked down by the total edit distance
+
+    All names are diacritic-folded, so "Nguyen Van An" matches "Nguyễn Văn An".
+
+    Every token's posting set also has a ranked copy (fewest name tokens, then
+    employee id), so the best matches of a common token ("An", "Nguyen") are
+    read off the front of a list instead of ranking every employee who has it.
+    Ranked copies are re-sorted lazily, on the first search after their token
+    changed.
+    """
+
+    def __init__(self, employees=()):
+        self._lock = threading.Lock()
+        self._names = {}       # employee id -> normalized name
+        self._exact = {}       # normalized name -> set of employee ids
+        self._tokens = {}      # token -> set of employee ids
+        self._token_counts = {}  # employee id -> number of name tokens
+        self._ranked = {}      # token -> employee ids of its posting set, best ranked first
+        self._stale = set()    # tokens whose ranked list is out of date
+        self._vocabulary = BKTree()
+        for employee in employees:
+            self.add(employee)
+        with self._lock:
+            self._refresh()
+
+    def add(self, employee):
+        """Index an employee ({"employee_id", "name", ...}), replacing an older entry"""
+        with self._lock:
+            employee_id = employee["employee_id"]
+            self._remove(employee_id)
+            name = normalize_text(employee.get("name"))
+            self._names[employee_id] = name
+            self._exact.setdefault(name, set()).add(employee_id)
+            self._token_counts[employee_id] = len(name.split())
+            for token in set(name.split()):
+                if token not in self._tokens:
+                    self._tokens[token] = set()
+                    self._vocabulary.add(token)
+                self._tokens[token].add(employee_id)
+                self._stale.add(token)
+
+    def remove(self, employee_id):
+        """Drop an employee from the index; returns True if it was indexed"""
+        with self._lock:
+            return self._remove(employee_id)
+
+    def _remove(self, employee_id):
+        name = self._names.pop(employee_id, None)
+        if name is None:
+            return False
+        del self._token_counts[employee_id]
+        _discard(self._exact, name, employee_id)
+        # Tokens stay in the BK-tree (it has no deletion); lookups skip unused ones
+        for token in set(name.split()):
+            _discard(self._tokens, token, employee_id)
+            self._stale.add(token)
+        return True
+
+    def _rank_key(self, employee_id):
+        return self._token_counts[employee_id], employee_id
+
+    def _refresh(self):
+        """Re-sort the ranked lists of tokens that changed since the last search"""
+        for token in self._stale:
+            posting = self._tokens.get(token)
+            if posting is None:
+                self._ranked.pop(token, None)
+            else:
+                self._ranked[token] = sorted(posting, key=self._rank_key)
+        self._stale.clear()
+
+    def search(self, query, limit=5):
+        """
+        Find employees whose name matches a query
+
+        Args:
+            query: Full or partial name, with or without diacritics
+            limit: Maximum number of candidates
+
+        Returns:
+            list: Candidates {"employee_id", "score", "match", "distance"},
+                best first
+        """
+        text = normalize_text(query)
+        if not text:
+            return []
+
+        with self._lock:
+            self._refresh()
+            exact = self._exact.get(text)
+            if exact:
+                candidates = [(EXACT_SCORE, employee_id, "exact", 0) for employee_id in exact]
+            else:
+                candidates = self._token_matches(text) or self._fuzzy_matches(text)
+
+        candidates.sort(key=lambda c: (-c[0], c[1]))
+        return [
+            {"employee_id": employee_id, "score": round(score, 4), "match": match, "distance": distance}
+            for score, employee_id, match, distance in candidates[:limit]
+        ]
+
+    def _token_matches(self, text):
+        query_tokens = set(text.split())
+        if not all(token in self._tokens for token in query_tokens):
+            return []
+        return [
+            (TOKEN_SCORE * len(query_tokens) / self._token_counts[employee_id], employee_id, "token", 0)
+            for employee_id, _ in self._intersect([[(0, token)] for token in query_tokens])
+        ]
+
+    def _fuzzy_matches(self, text):
+        # Each query token becomes a list of (distance, name token) alternatives
+        groups = []
+        for token in set(text.split()):
+            if token in self._tokens:
+                groups.append([(0, token)])
+                continue
+            corrections = [
+                (distance, match)
+                for distance, match in self._vocabulary.search(token, max_edit_distance(token))
+                if match in self._tokens
+            ][:MAX_TOKEN_CORRECTIONS]
+            if not corrections:
+                return []
+            groups.append(corrections)
+
+        matches = []
+        for employee_id, distance in self._intersect(groups):
+            coverage = len(groups) / self._token_counts[employee_id]
+            matches.append((FUZZY_SCORE * coverage * (1 - distance / len(text)), employee_id, "fuzzy", distance))
+        return matches
+
+    def _intersect(self, groups):
+        """
+        Employees present in every group (a group matches if any of its
+        alternative tokens is in the employee's name)
+
+        Candidates are ranked by summed distance, then fewest name tokens -
+        the order the scores follow - so a common token never drops an exact
+        match in favour of a fuzzy one. Vague queries are answered from the
+        front of one query token's ranked list (see _walk()). Otherwise
+        groups are applied smallest first, so the candidate set shrinks fast,
+        and every step is a C-level set intersection/union; candidates are then
+        split by summed distance - set operations again - and taken from the
+        closest split on until MAX_TOKEN_CANDIDATES are found (see _best()).
+
+        Returns:
+            list: Up to MAX_TOKEN_CANDIDATES (employee id, summed distance of
+                the closest alternatives), best first
+        """
+        groups = sorted(groups, key=lambda group: sum(len(self._tokens[token]) for _, token in group))
+        walked = self._walk(groups)
+        if walked is not None:
+            return walked
+
+        candidates = None
+        for group in groups:
+            postings = [self._tokens[token] for _, token in group]
+            if len(postings) == 1:
+                candidates = postings[0] if candidates is None else candidates & postings[0]
+            elif candidates is None:
+                candidates = set().union(*postings)
+            else:
+                candidates = set().union(*(candidates & posting for posting in postings))
+            if not candidates:
+                return []
+
+        # Exact token groups all have distance 0, so only fuzzy groups split candidates
+        by_distance = {0: candidates}
+        for group in groups:
+            distances = {distance for distance, _ in group}
+            if len(distances) == 1:  # every candidate is this far off
+                distance = distances.pop()
+                by_distance = {total + distance: ids for total, ids in by_distance.items()}
+                continue
+            split = {}
+            for total, ids in by_distance.items():
+                for distance, token in sorted(group):
+                    hits = ids & self._tokens[token]
+                    if hits:
+                        ids = ids - hits
+                        split.setdefault(total + distance, set()).update(hits)
+            by_distance = split
+
+        # Every candidate has one of the smallest group's tokens, so their ranked lists cover them
+        cover = [token for _, token in groups[0]]
+        matches = []
+        for total in sorted(by_distance):
+            best = self._best(by_distance[total], cover, MAX_TOKEN_CANDIDATES - len(matches))
+            matches.extend((employee_id, total) for employee_id in best)
+            if len(matches) == MAX_TOKEN_CANDIDATES:
+                break
+        return matches
+
+    def _walk(self, groups):
+        """
+        Rank candidates from the front of the ranked list of the rarest query
+        token that has no alternatives (exact, or a single correction)
+
+        Up to RANKED_WALK_LIMIT employees of that list (fewest name tokens
+        first) are filtered by the other groups block by block with set
+        operations; once MAX_TOKEN_CANDIDATES of them have the lowest
+        possible summed distance, they are the best ones. If the list holds no
+        more than that, every candidate has been seen and is ranked directly.
+
+        Returns:
+            list: Like _intersect(), or None if the walk was inconclusive
+        """
+        driver = next((group for group in groups if len(group) == 1), None)
+        if driver is None:
+            return None
+        ranked = self._ranked[driver[0][1]]
+        complete = len(ranked) <= RANKED_WALK_LIMIT
+        walked = ranked[:RANKED_WALK_LIMIT]
+
+        # Every walked employee has the driver token; other exact token groups
+        # are plain membership filters, fuzzy groups also set the distance
+        postings = [
+            self._tokens[group[0][1]] for group in groups
+            if group is not driver and len(group) == 1 and not group[0][0]
+        ]
+        fuzzy_groups = [
+            [(distance, self._tokens[token]) for distance, token in sorted(group, reverse=True)]
+            for group in groups if len(group) > 1 or group[0][0]
+        ]
+        lowest = sum(group[-1][0] for group in fuzzy_groups)
+
+        matches, others = [], []
+        start, size = 0, RANKED_WALK_BLOCK
+        while start < len(walked):
+            block = walked[start:start + size]
+            start += size
+            hits = postings[0].intersection(block) if postings else set(block)
+            for posting in postings[1:]:
+                hits &= posting
+            totals = dict.fromkeys(hits, 0)
+            for group in fuzzy_groups:
+                distances = {}
+                for distance, posting in group:  # farthest first, so closer ones overwrite
+                    distances.update(dict.fromkeys(posting.intersection(totals), distance))
+                totals = {employee_id: total + distances[employee_id]
+                          for employee_id, total in totals.items() if employee_id in distances}
+            # The block is in rank order; only filtered-out blocks need their survivors put back in it
+            for employee_id in block if len(totals) == len(block) else sorted(totals, key=self._rank_key):
+                (matches if totals[employee_id] == lowest else others).append((employee_id, totals[employee_id]))
+            if len(matches) >= MAX_TOKEN_CANDIDATES:
+                return matches[:MAX_TOKEN_CANDIDATES]
+            # Size the next block by the hit rate so far (with a margin), or double it without hits
+            if matches:
+                size = max(RANKED_WALK_BLOCK, (MAX_TOKEN_CANDIDATES - len(matches)) * start // len(matches) * 5 // 4)
+            else:
+                size *= 2
+
+        if not complete:
+            return None
+        return matches + [
+            (employee_id, total)
+            for total, _, employee_id in heapq.nsmallest(MAX_TOKEN_CANDIDATES - len(matches), (
+                (total, self._token_counts[employee_id], employee_id) for employee_id, total in others
+            ))
+        ]
+
+    def _best(self, ids, cover, count):
+        """
+        The `count` best ranked of ids, each of which is in the posting set of
+        one of the cover tokens
+
+        A few ids are just sorted. Many ids are mostly found near the front of
+        the cover tokens' ranked lists, so those are walked until `count` hits
+        each; either way the work stays around sqrt(count * posting size).
+        """
+        if len(ids) * len(ids) <= count * sum(len(self._ranked[token]) for token in cover):
+            return heapq.nsmallest(count, ids, key=self._rank_key)
+        found = set()
+        for token in cover:
+            found.update(islice((employee_id for employee_id in self._ranked[token] if employee_id in ids), count))
+        return heapq.nsmallest(count, found, key=self._rank_key)
+
+    def __len__(self):
+        return len(self._names)
+
+
+def _discard(index, key, employee_id):
+    ids = index.get(key)
+    if ids is None:
+        return
+    ids.discard(employee_id)
+    if not ids:
+        del index[key]
@@ -0,0 +1,92 @@
+"""
+Priority index over pending tasks
+Keeps each employee's pending tasks in "what to do next" order, so the next task
+(or the next k) is read off the front instead of filtering and sorting every call
+"""
+
+import itertools
+import threading
+from bisect import bisect_left, insort
+
+
+# Same order get_next_task always used: High > Medium > Low > anything else
+PRIORITY_ORDER = {"High": 0, "Medium": 1, "Low": 2}
+
+# Tasks without a due date go after all dated tasks of the same priority
+NO_DUE_DATE = "9999-12-31"
+
+
+class TaskPriorityIndex:
+    """
+    Per-employee pending tasks ordered by (priority, due date)
+
+    Each employee has a sorted list of keys (priority rank, due date, sequence,
+    task id); the sequence number preserves the original list order between
+    tasks with the same priority and due date. Employees have tens of tasks,
+    so a sorted list beats a heap: insert/remove are a bisect plus a short
+    memmove, and the top k is a slice (a heap would need O(k log n) pops and
+    lazy deletion for status changes).
+
+    Call update() whenever a task is added or its status changes, and remove()
+    when it is deleted; only tasks with status "Pending" are kept.
+    """
+
+    def __init__(self, tasks_by_employee=None):
+        self._lock = threading.Lock()
+        self._queues = {}   # employee id -> sorted list of keys
+        self._tasks = {}    # task id -> task dict
+        self._keys = {}     # task id -> (employee id, key)
+        self._sequence = {}  # task id -> insertion sequence, kept across status changes
+        self._counter = itertools.count()  # never reuses a number, even after remove()
+        for employee_id, tasks in (tasks_by_employee or {}).items():
+            for task in tasks:
+                self.update(employee_id, task)
+
+    def update(self, employee_id, task):
+        """(Re)index a task after it was added or changed"""
+        with self._lock:
+            task_id = task["task_id"]
+            self._remove(task_id)
+            sequence = self._sequence.get(task_id)
+            if sequence is None:
+                sequence = self._sequence[task_id] = next(self._counter)
+            if task.get("status") != "Pending":
+                return
+            key = (
+                PRIORITY_ORDER.get(task.get("priority"), 3),
+                task.get("due_date") or NO_DUE_DATE,
+                sequence,
+                task_id
+            )
+            insort(self._queues.setdefault(employee_id, []), key)
+            self._tasks[task_id] = task
+            self._keys[task_id] = (employee_id, key)
+
+    def remove(self, task_id):
+        """Drop a task from the index"""
+        with self._lock:
+            self._remove(task_id)
+            self._sequence.pop(task_id, None)
+
+    def _remove(self, task_id):
+        entry = self._keys.pop(task_id, None)
+        if entry is None:
+            return
+        employee_id, key = entry
+        queue = self._queues[employee_id]
+        del queue[bisect_left(queue, key)]
+        del self._tasks[task_id]
+
+    def top(self, employee_id, k=1):
+        """
+        An employee's next k pending tasks, most urgent first
+
+        Returns:
+            tuple: (list of up to k tasks, total pending tasks)
+        """
+        with self._lock:
+            queue = self._queues.get(employee_id, [])
+            return [self._tasks[key[-1]] for key in queue[:k]], len(queue)
+
+    def __len__(self):
+        return len(self._keys)
@@ -0,0 +1,81 @@
+"""
+System prompt cache
+Builds the system prompt once and reuses it until its source data changes
+"""
+
+import hashlib
+import json
+import threading
+
+
+def content_hash(data):
+    """
+    Compute a stable hash of JSON-serializable data
+
+    Args:
+        data: Any JSON-serializable value (dicts are hashed with sorted keys)
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    payload = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class PromptCache:
+    """
+    Cache for a built prompt, keyed on a content hash of its source data
+
+    The source data is only re-hashed after invalidate() is called (e.g. when the
+    knowledge base or HR policy is reloaded), so a cache hit is a single flag check.
+    The prompt itself is only rebuilt when the hash actually changed.
+    """
+
+    def __init__(self, builder, sources):
+        """
+        Args:
+            builder: Callable returning the prompt string
+            sources: Callable returning the data the prompt is built from
+        """
+        self._builder = builder
+        self._sources = sources
+        self._lock = threading.Lock()
+        self._key = None
+        self._prompt = None
+        self._stale = True
+        self.hits = 0
+        self.misses = 0
+
+    def get(self):
+        """Return the cached prompt, rebuilding it if the source data changed"""
+        with self._lock:
+            if not self._stale:
+                self.hits += 1
+                return self._prompt
+
+            key = content_hash(self._sources())
+            if key == self._key:
+                self.hits += 1
+            else:
+                self._prompt = self._builder()
+                self._key = key
+                self.misses += 1
+            self._stale = False
+            return self._prompt
+
+    def invalidate(self):
+        """Mark the source data as possibly changed; the next get() re-hashes it"""
+        with self._lock:
+            self._stale = True
+
+    def stats(self):
+        """Return hit/miss counters for monitoring"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+                "content_hash": self._key,
+                "size_chars": len(self._prompt) if self._prompt else 0
+            }
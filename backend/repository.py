@@ -0,0 +1,720 @@
+"""
+Storage layer for HR data
+functions.py reads and writes employees, tasks, teams, leave balances and courses
+through a repository, so the data can live in process memory or in SQLite
+"""
+
+import json
+import os
+import queue
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+import mock_data
+from course_index import CourseIndex
+from due_index import due_ordinal
+from priority_index import NO_DUE_DATE
+from name_index import EmployeeNameIndex
+from task_index import DuplicateTaskIdError
+
+
+class Repository(ABC):
+    """
+    Interface for HR data backends
+
+    Records are plain dicts shaped like the entries of mock_data.py. Lookups
+    return None when a record does not exist.
+    """
+
+    @abstractmethod
+    def get_employee(self, employee_id):
+        """Return an employee dict by ID"""
+
+    @abstractmethod
+    def find_employees(self, employee_ids=None, department=None, team_name=None):
+        """
+        Iterate over employees, optionally restricted to a list of IDs (yielded
+        in that order, unknown IDs skipped), a department and/or a team
+        """
+
+    @abstractmethod
+    def search_employees_by_name(self, name, limit=5):
+        """Return ranked name candidates {"employee_id", "name", "score", "match", "distance"}"""
+
+    @abstractmethod
+    def get_tasks(self, employee_id, status=None):
+        """Return an employee's tasks (optionally only one status), or None if they have none"""
+
+    @abstractmethod
+    def get_task(self, task_id):
+        """Return (employee_id, task) for a task ID"""
+
+    @abstractmethod
+    def add_task(self, employee_id, task):
+        """Insert a task; raises DuplicateTaskIdError if the ID is taken"""
+
+    @abstractmethod
+    def delete_task(self, task_id):
+        """Delete a task; returns the removed (employee_id, task)"""
+
+    @abstractmethod
+    def update_task_status(self, task_id, new_status):
+        """Change a task's status; returns a result dict like update_task_status_in_db()"""
+
+    @abstractmethod
+    def get_urgent_tasks(self, employee_id, days_threshold=2, today=None):
+        """
+        Return pending tasks due within days_threshold days of `today`
+        (a date, default the server's local date), with "days_left" added
+        """
+
+    @abstractmethod
+    def get_next_tasks(self, employee_id, limit=1):
+        """
+        Return (next pending tasks by priority then due date, total pending count),
+        or None if the employee has no tasks
+        """
+
+    @abstractmethod
+    def get_all_urgent_tasks(self, days_threshold=2, today=None):
+        """Return pending tasks of all employees due within days_threshold days of `today`, earliest first"""
+
+    @abstractmethod
+    def find_task_by_name(self, employee_id, task_name_keyword):
+        """Return the first task of an employee whose name contains the keyword"""
+
+    @abstractmethod
+    def get_team(self, team_name):
+        """Return a team dict (lead, meetings, ...) by name"""
+
+    @abstractmethod
+    def get_leave_balance(self, employee_id):
+        """Return an employee's leave balance dict"""
+
+    @abstractmethod
+    def search_courses(self, keyword=None, course_type=None, limit=None):
+        """Return courses matching a keyword and/or type, best match first"""
+
+    @abstractmethod
+    def upsert_employees(self, employees):
+        """Insert or replace employees by employee_id; returns the number created"""
+
+    @abstractmethod
+    def upsert_tasks(self, tasks):
+        """Insert or replace (employee_id, task) pairs by task_id; returns the number created"""
+
+    @abstractmethod
+    def upsert_leave_balances(self, balances):
+        """Insert or replace leave balances by employee_id; returns the number created"""
+
+    @abstractmethod
+    def upsert_courses(self, courses):
+        """Insert or replace courses by id; returns the number created"""
+
+    @abstractmethod
+    def stats(self):
+        """Return backend statistics for monitoring"""
+
+    def get_employee_by_name(self, name):
+        """
+        Return the employee best matching a name
+
+        None if nobody matches or several employees match equally well.
+        """
+        candidates = self.search_employees_by_name(name, limit=2)
+        if not candidates:
+            return None
+        if len(candidates) > 1 and candidates[0]["score"] == candidates[1]["score"]:
+            return None
+        return self.get_employee(candidates[0]["employee_id"])
+
+
+class InMemoryRepository(Repository):
+    """Repository over the module-level dicts and indexes in mock_data.py"""
+
+    def get_employee(self, employee_id):
+        return mock_data.mock_new_hires_db.get(employee_id)
+
+    def find_employees(self, employee_ids=None, department=None, team_name=None):
+        employees = mock_data.mock_new_hires_db
+        if employee_ids is not None:
+            candidates = (employees[eid] for eid in employee_ids if eid in employees)
+        else:
+            candidates = list(employees.values())
+        for employee in candidates:
+            if department and employee.get("department") != department:
+                continue
+            if team_name and employee.get("team_name") != team_name:
+                continue
+            yield employee
+
+    def search_employees_by_name(self, name, limit=5):
+        return mock_data.search_employees_by_name(name, limit)
+
+    def get_employee_by_name(self, name):
+        return mock_data.get_employee_by_name(name)
+
+    def get_tasks(self, employee_id, status=None):
+        tasks = mock_data.mock_onboarding_tasks.get(employee_id)
+        if tasks is None or not status:
+            return tasks
+        return [task for task in tasks if task["status"].lower() == status.lower()]
+
+    def get_task(self, task_id):
+        return mock_data.get_task_by_id(task_id)
+
+    def add_task(self, employee_id, task):
+        mock_data.add_task_to_db(employee_id, task)
+
+    def delete_task(self, task_id):
+        return mock_data.delete_task_from_db(task_id)
+
+    def update_task_status(self, task_id, new_status):
+        return mock_data.update_task_status_in_db(task_id, new_status)
+
+    def get_urgent_tasks(self, employee_id, days_threshold=2, today=None):
+        return mock_data.get_urgent_tasks(employee_id, days_threshold, today)
+
+    def get_all_urgent_tasks(self, days_threshold=2, today=None):
+        return mock_data.get_all_urgent_tasks(days_threshold, today)
+
+    def get_next_tasks(self, employee_id, limit=1):
+        if not mock_data.mock_onboarding_tasks.get(employee_id):
+            return None
+        return mock_data.get_next_tasks(employee_id, limit)
+
+    def find_task_by_name(self, employee_id, task_name_keyword):
+        return mock_data.find_task_by_name(employee_id, task_name_keyword)
+
+    def get_team(self, team_name):
+        return mock_data.mock_team_db.get(team_name)
+
+    def get_leave_balance(self, employee_id):
+        return mock_data.get_leave_balance_from_db(employee_id)
+
+    def search_courses(self, keyword=None, course_type=None, limit=None):
+        return mock_data.search_training_courses_in_db(keyword, course_type, limit)
+
+    def upsert_employees(self, employees):
+        return mock_data.upsert_employees_in_db(employees)
+
+    def upsert_tasks(self, tasks):
+        return mock_data.upsert_tasks_in_db(tasks)
+
+    def upsert_leave_balances(self, balances):
+        return mock_data.upsert_leave_balances_in_db(balances)
+
+    def upsert_courses(self, courses):
+        return mock_data.upsert_courses_in_db(courses)
+
+    def stats(self):
+        return {
+            "backend": "memory",
+            "employees": len(mock_data.mock_new_hires_db),
+            "tasks": sum(len(tasks) for tasks in mock_data.mock_onboarding_tasks.values()),
+            "courses": len(mock_data.mock_training_db)
+        }
+
+
+# ============================================================================
+# SQLITE BACKEND
+# ============================================================================
+
+# Next-task order as in priority_index.py: priority rank (High > Medium > Low > other),
+# then due date with undated tasks last. get_next_tasks orders by these exact
+# expressions so SQLite can walk idx_tasks_next instead of sorting
+PRIORITY_RANK = (
+    "(CASE json_extract(data, '$.priority') "
+    "WHEN 'High' THEN 0 WHEN 'Medium' THEN 1 WHEN 'Low' THEN 2 ELSE 3 END)"
+)
+DUE_DATE_OR_LAST = f"IFNULL(due_date, '{NO_DUE_DATE}')"
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS employees ("
+    " employee_id TEXT PRIMARY KEY,"
+    " name TEXT NOT NULL,"
+    " team_name TEXT,"
+    " data TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS idx_employees_team_name ON employees (team_name)",
+    "CREATE INDEX IF NOT EXISTS idx_employees_department ON employees (json_extract(data, '$.department'))",
+
+    # position keeps each employee's tasks in their original order
+    "CREATE TABLE IF NOT EXISTS tasks ("
+    " task_id TEXT PRIMARY KEY,"
+    " employee_id TEXT NOT NULL,"
+    " position INTEGER NOT NULL,"
+    " status TEXT NOT NULL COLLATE NOCASE,"
+    " due_date TEXT,"
+    " data TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS idx_tasks_employee_id ON tasks (employee_id, position)",
+    "CREATE INDEX IF NOT EXISTS idx_tasks_employee_status_due ON tasks (employee_id, status, due_date)",
+    "CREATE INDEX IF NOT EXISTS idx_tasks_status_due ON tasks (status, due_date)",
+    f"CREATE INDEX IF NOT EXISTS idx_tasks_next ON tasks (employee_id, status, {PRIORITY_RANK}, {DUE_DATE_OR_LAST}, position)",
+
+    "CREATE TABLE IF NOT EXISTS teams ("
+    " team_name TEXT PRIMARY KEY,"
+    " data TEXT NOT NULL)",
+
+    "CREATE TABLE IF NOT EXISTS leave_balances ("
+    " employee_id TEXT PRIMARY KEY,"
+    " data TEXT NOT NULL)",
+
+    "CREATE TABLE IF NOT EXISTS courses ("
+    " course_id TEXT PRIMARY KEY,"
+    " type TEXT,"
+    " data TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS idx_courses_type ON courses (type)"
+]
+
+# Queries are constant strings with ? parameters: each pooled connection
+# compiles them once and reuses the prepared statement from its cache
+SQL_GET_EMPLOYEE = "SELECT data FROM employees WHERE employee_id = ?"
+SQL_GET_EMPLOYEES = "SELECT employee_id, data FROM employees WHERE employee_id IN (SELECT value FROM json_each(?))"
+# IDs per SQL_GET_EMPLOYEES query when find_employees() is given an explicit list
+FIND_EMPLOYEES_CHUNK = 500
+# Keyed by (filter by team, filter by department), so each variant can use its index
+SQL_FIND_EMPLOYEES = {
+    (False, False): "SELECT data FROM employees ORDER BY rowid",
+    (True, False): "SELECT data FROM employees WHERE team_name = ? ORDER BY rowid",
+    (False, True): "SELECT data FROM employees WHERE json_extract(data, '$.department') = ? ORDER BY rowid",
+    (True, True): (
+        "SELECT data FROM employees WHERE team_name = ? "
+        "AND json_extract(data, '$.department') = ? ORDER BY rowid"
+    )
+}
+SQL_ALL_EMPLOYEE_NAMES = "SELECT employee_id, name FROM employees"
+SQL_GET_TASKS = "SELECT data FROM tasks WHERE employee_id = ? ORDER BY position"
+SQL_GET_TASKS_BY_STATUS = "SELECT data FROM tasks WHERE employee_id = ? AND status = ? ORDER BY position"
+SQL_HAS_TASKS = "SELECT 1 FROM tasks WHERE employee_id = ? LIMIT 1"
+SQL_GET_TASK = "SELECT employee_id, data FROM tasks WHERE task_id = ?"
+SQL_NEXT_POSITION = "SELECT COALESCE(MAX(position) + 1, 0) FROM tasks WHERE employee_id = ?"
+SQL_INSERT_TASK = (
+    "INSERT INTO tasks (task_id, employee_id, position, status, due_date, data) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+SQL_UPSERT_TASK = (
+    "INSERT INTO tasks (task_id, employee_id, position, status, due_date, data) "
+    "VALUES (?, ?, (SELECT COALESCE(MAX(position) + 1, 0) FROM tasks WHERE employee_id = ?), ?, ?, ?) "
+    "ON CONFLICT (task_id) DO UPDATE SET employee_id = excluded.employee_id, "
+    "status = excluded.status, due_date = excluded.due_date, data = excluded.data"
+)
+SQL_TASK_OWNERS = "SELECT task_id, employee_id FROM tasks WHERE task_id IN (SELECT value FROM json_each(?))"
+SQL_UPSERT_EMPLOYEE = (
+    "INSERT INTO employees (employee_id, name, team_name, data) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT (employee_id) DO UPDATE SET name = excluded.name, "
+    "team_name = excluded.team_name, data = excluded.data"
+)
+SQL_UPSERT_LEAVE = (
+    "INSERT INTO leave_balances (employee_id, data) VALUES (?, ?) "
+    "ON CONFLICT (employee_id) DO UPDATE SET data = excluded.data"
+)
+SQL_UPSERT_COURSE = (
+    "INSERT INTO courses (course_id, type, data) VALUES (?, ?, ?) "
+    "ON CONFLICT (course_id) DO UPDATE SET type = excluded.type, data = excluded.data"
+)
+SQL_DELETE_TASK = "DELETE FROM tasks WHERE task_id = ?"
+SQL_UPDATE_TASK_STATUS = "UPDATE tasks SET status = ?, data = ? WHERE task_id = ?"
+SQL_DUE_TASKS = (
+    "SELECT data FROM tasks WHERE employee_id = ? AND status = 'Pending' "
+    "AND due_date >= ? AND due_date <= ? ORDER BY due_date, position"
+)
+SQL_DUE_TASKS_ALL = (
+    "SELECT employee_id, data FROM tasks WHERE status = 'Pending' "
+    "AND due_date >= ? AND due_date <= ? ORDER BY due_date"
+)
+SQL_NEXT_TASKS = (
+    "SELECT data FROM tasks WHERE employee_id = ? AND status = 'Pending' "
+    f"ORDER BY {PRIORITY_RANK}, {DUE_DATE_OR_LAST}, position LIMIT ?"
+)
+SQL_COUNT_PENDING = "SELECT COUNT(*) FROM tasks WHERE employee_id = ? AND status = 'Pending'"
+SQL_GET_TEAM = "SELECT data FROM teams WHERE team_name = ?"
+SQL_GET_LEAVE = "SELECT data FROM leave_balances WHERE employee_id = ?"
+SQL_ALL_COURSES = "SELECT data FROM courses ORDER BY rowid"
+
+
+class ConnectionPool:
+    """
+    Fixed-size pool of SQLite connections shared by the tool threads
+
+    Connections run in autocommit mode with WAL journaling, so readers never
+    block on a writer; writes open explicit transactions.
+    """
+
+    def __init__(self, path, size=4):
+        self.path = path
+        self.size = size
+        self._idle = queue.Queue()
+        for _ in range(size):
+            conn = sqlite3.connect(
+                path,
+                check_same_thread=False,
+                isolation_level=None,
+                cached_statements=256
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; blocks while all of them are in use"""
+        conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    @contextmanager
+    def transaction(self):
+        """Borrow a connection inside BEGIN IMMEDIATE ... COMMIT/ROLLBACK"""
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+
+class SQLiteRepository(Repository):
+    """
+    Persistent repository backed by SQLite
+
+    Tasks are filtered by employee, status and due date in SQL through the
+    indexes in SCHEMA. Name and course search keep their in-memory indexes
+    (names and the course catalog are small even for large companies); the
+    indexes are loaded from the database at startup.
+    """
+
+    def __init__(self, path="hr.db", pool_size=4):
+        self.path = path
+        self._pool = ConnectionPool(path, pool_size)
+        with self._pool.connection() as conn:
+            for statement in SCHEMA:
+                conn.execute(statement)
+        self._lock = threading.Lock()
+        self._load_indexes()
+
+    def _load_indexes(self):
+        with self._pool.connection() as conn:
+            names = conn.execute(SQL_ALL_EMPLOYEE_NAMES).fetchall()
+            courses = [json.loads(row[0]) for row in conn.execute(SQL_ALL_COURSES)]
+        self._name_index = EmployeeNameIndex(
+            {"employee_id": employee_id, "name": name} for employee_id, name in names
+        )
+        self._course_index = CourseIndex(courses)
+        self._courses = courses
+        self._course_positions = {course["id"]: i for i, course in enumerate(courses)}
+
+    @staticmethod
+    def _write_employees(conn, employees):
+        conn.executemany(SQL_UPSERT_EMPLOYEE, [
+            (e["employee_id"], e["name"], e.get("team_name"), json.dumps(e, ensure_ascii=False))
+            for e in employees
+        ])
+
+    @staticmethod
+    def _write_tasks(conn, tasks):
+        """Returns the previous owners of tasks reassigned to another employee"""
+        task_ids = json.dumps([task["task_id"] for _, task in tasks])
+        owners = dict(conn.execute(SQL_TASK_OWNERS, (task_ids,)).fetchall())
+        conn.executemany(SQL_UPSERT_TASK, [
+            (task["task_id"], employee_id, employee_id, task["status"], task.get("due_date"),
+             json.dumps(task, ensure_ascii=False))
+            for employee_id, task in tasks
+        ])
+        return {
+            owners[task["task_id"]] for employee_id, task in tasks
+            if owners.get(task["task_id"], employee_id) != employee_id
+        }
+
+    @staticmethod
+    def _write_leave_balances(conn, balances):
+        conn.executemany(SQL_UPSERT_LEAVE, [
+            (b["employee_id"], json.dumps(b, ensure_ascii=False)) for b in balances
+        ])
+
+    @staticmethod
+    def _write_courses(conn, courses):
+        conn.executemany(SQL_UPSERT_COURSE, [
+            (c["id"], c.get("type"), json.dumps(c, ensure_ascii=False)) for c in courses
+        ])
+
+    def _upsert(self, table, write, records, employee_ids=()):
+        """
+        Write a batch in one transaction; returns how many rows are new
+        `write` may return more employee IDs whose data changed (e.g. previous task owners)
+        """
+        with self._pool.transaction() as conn:
+            before = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            changed = write(conn, records)
+            after = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        mock_data.bump_data_version(list(employee_ids) + list(changed or ()))
+        return after - before
+
+    def _fetch_one(self, sql, params):
+        with self._pool.connection() as conn:
+            row = conn.execute(sql, params).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _fetch_all(self, sql, params):
+        with self._pool.connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def seed(self, employees, tasks_by_employee, teams, leave_balances, courses):
+        """
+        Load a full dataset (shaped like mock_data.py) into empty tables
+
+        Returns:
+            bool: True if data was loaded, False if the database already had employees
+        """
+        with self._pool.transaction() as conn:
+            if conn.execute("SELECT 1 FROM employees LIMIT 1").fetchone():
+                return False
+            self._write_employees(conn, employees)
+            self._write_tasks(conn, [
+                (employee_id, task)
+                for employee_id, tasks in tasks_by_employee.items()
+                for task in tasks
+            ])
+            conn.executemany(
+                "INSERT INTO teams (team_name, data) VALUES (?, ?)",
+                [(name, json.dumps(team, ensure_ascii=False)) for name, team in teams.items()]
+            )
+            self._write_leave_balances(conn, leave_balances.values())
+            self._write_courses(conn, courses)
+        self._load_indexes()
+        return True
+
+    def get_employee(self, employee_id):
+        return self._fetch_one(SQL_GET_EMPLOYEE, (employee_id,))
+
+    def find_employees(self, employee_ids=None, department=None, team_name=None):
+        if employee_ids is not None:
+            # One primary key lookup per chunk of IDs, yielded in the requested order
+            employee_ids = list(employee_ids)
+            for start in range(0, len(employee_ids), FIND_EMPLOYEES_CHUNK):
+                chunk = employee_ids[start:start + FIND_EMPLOYEES_CHUNK]
+                with self._pool.connection() as conn:
+                    rows = dict(conn.execute(SQL_GET_EMPLOYEES, (json.dumps(chunk),)).fetchall())
+                for employee_id in chunk:
+                    if employee_id not in rows:
+                        continue
+                    employee = json.loads(rows[employee_id])
+                    if department and employee.get("department") != department:
+                        continue
+                    if team_name and employee.get("team_name") != team_name:
+                        continue
+                    yield employee
+            return
+        sql = SQL_FIND_EMPLOYEES[(bool(team_name), bool(department))]
+        params = [value for value in (team_name, department) if value]
+        with self._pool.connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        for row in rows:
+            yield json.loads(row[0])
+
+    def search_employees_by_name(self, name, limit=5):
+        candidates = self._name_index.search(name, limit)
+        for candidate in candidates:
+            employee = self.get_employee(candidate["employee_id"])
+            candidate["name"] = employee["name"] if employee else None
+        return candidates
+
+    def get_tasks(self, employee_id, status=None):
+        if status:
+            tasks = self._fetch_all(SQL_GET_TASKS_BY_STATUS, (employee_id, status))
+            if not tasks and self._fetch_one(SQL_HAS_TASKS, (employee_id,)) is None:
+                return None
+            return tasks
+        tasks = self._fetch_all(SQL_GET_TASKS, (employee_id,))
+        return tasks or None
+
+    def get_task(self, task_id):
+        with self._pool.connection() as conn:
+            row = conn.execute(SQL_GET_TASK, (task_id,)).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def add_task(self, employee_id, task):
+        try:
+            with self._pool.transaction() as conn:
+                position = conn.execute(SQL_NEXT_POSITION, (employee_id,)).fetchone()[0]
+                conn.execute(SQL_INSERT_TASK, (
+                    task["task_id"], employee_id, position, task["status"],
+                    task.get("due_date"), json.dumps(task, ensure_ascii=False)
+                ))
+        except sqlite3.IntegrityError:
+            existing = self.get_task(task["task_id"])
+            raise DuplicateTaskIdError(task["task_id"], existing[0] if existing else None)
+        mock_data.bump_data_version([employee_id])
+
+    def delete_task(self, task_id):
+        with self._pool.transaction() as conn:
+            row = conn.execute(SQL_GET_TASK, (task_id,)).fetchone()
+            if row is None:
+                return None
+            conn.execute(SQL_DELETE_TASK, (task_id,))
+        mock_data.bump_data_version([row[0]])
+        return row[0], json.loads(row[1])
+
+    def update_task_status(self, task_id, new_status):
+        with self._pool.transaction() as conn:
+            row = conn.execute(SQL_GET_TASK, (task_id,)).fetchone()
+            if row is None:
+                return {
+                    "success": False,
+                    "error": f"Không tìm thấy nhiệm vụ với ID: {task_id}"
+                }
+            employee_id, task = row[0], json.loads(row[1])
+            old_status = task["status"]
+            task["status"] = new_status
+            conn.execute(SQL_UPDATE_TASK_STATUS, (
+                new_status, json.dumps(task, ensure_ascii=False), task_id
+            ))
+        mock_data.bump_data_version([employee_id])
+        return {
+            "success": True,
+            "employee_id": employee_id,
+            "task": task,
+            "old_status": old_status
+        }
+
+    def get_urgent_tasks(self, employee_id, days_threshold=2, today=None):
+        # Same window as mock_data.get_urgent_tasks(); ISO dates compare in date order,
+        # so this is a range seek on idx_tasks_employee_status_due
+        first, last, today = self._due_window(days_threshold, today)
+        urgent_tasks = []
+        for task in self._fetch_all(SQL_DUE_TASKS, (employee_id, first, last)):
+            ordinal = due_ordinal(task)
+            if ordinal is not None:
+                urgent_tasks.append(dict(task, days_left=ordinal - today - 1))
+        return urgent_tasks
+
+    def get_all_urgent_tasks(self, days_threshold=2, today=None):
+        first, last, today = self._due_window(days_threshold, today)
+        with self._pool.connection() as conn:
+            rows = conn.execute(SQL_DUE_TASKS_ALL, (first, last)).fetchall()
+        urgent_tasks = []
+        for employee_id, data in rows:
+            task = json.loads(data)
+            ordinal = due_ordinal(task)
+            if ordinal is not None:
+                urgent_tasks.append(dict(task, employee_id=employee_id, days_left=ordinal - today - 1))
+        return urgent_tasks
+
+    def get_next_tasks(self, employee_id, limit=1):
+        with self._pool.connection() as conn:
+            if conn.execute(SQL_HAS_TASKS, (employee_id,)).fetchone() is None:
+                return None
+            rows = conn.execute(SQL_NEXT_TASKS, (employee_id, limit)).fetchall()
+            pending = conn.execute(SQL_COUNT_PENDING, (employee_id,)).fetchone()[0]
+        return [json.loads(row[0]) for row in rows], pending
+
+    @staticmethod
+    def _due_window(days_threshold, today=None):
+        """(first due date, last due date, today's ordinal) of an urgent task query"""
+        today = today or date.today()
+        first = today + timedelta(days=1)
+        last = today + timedelta(days=days_threshold)
+        return first.isoformat(), last.isoformat(), today.toordinal()
+
+    def find_task_by_name(self, employee_id, task_name_keyword):
+        task_name_lower = task_name_keyword.lower()
+        for task in self.get_tasks(employee_id) or []:
+            if task_name_lower in task["task"].lower():
+                return task
+        return None
+
+    def get_team(self, team_name):
+        return self._fetch_one(SQL_GET_TEAM, (team_name,))
+
+    def get_leave_balance(self, employee_id):
+        return self._fetch_one(SQL_GET_LEAVE, (employee_id,))
+
+    def search_courses(self, keyword=None, course_type=None, limit=None):
+        if not keyword and not course_type:
+            return self._courses[:limit]
+        return self._course_index.search(keyword, course_type, limit)
+
+    def upsert_employees(self, employees):
+        employees = list(employees)
+        created = self._upsert("employees", self._write_employees, employees,
+                               [employee["employee_id"] for employee in employees])
+        for employee in employees:
+            self._name_index.add(employee)
+        mock_data.bump_directory_version()
+        return created
+
+    def upsert_tasks(self, tasks):
+        tasks = list(tasks)
+        return self._upsert("tasks", self._write_tasks, tasks, [employee_id for employee_id, _ in tasks])
+
+    def upsert_leave_balances(self, balances):
+        balances = list(balances)
+        return self._upsert("leave_balances", self._write_leave_balances, balances,
+                            [balance["employee_id"] for balance in balances])
+
+    def upsert_courses(self, courses):
+        courses = list(courses)
+        created = self._upsert("courses", self._write_courses, courses)
+        with self._lock:
+            for course in courses:
+                position = self._course_positions.get(course["id"])
+                if position is None:
+                    self._course_positions[course["id"]] = len(self._courses)
+                    self._courses.append(course)
+                else:
+                    self._courses[position] = course
+                self._course_index.add(course)
+        mock_data.bump_knowledge_version()
+        return created
+
+    def stats(self):
+        with self._pool.connection() as conn:
+            employees = conn.execute("SELECT COUNT(*) FROM employees").fetchone()[0]
+            tasks = conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "pool_size": self._pool.size,
+            "employees": employees,
+            "tasks": tasks,
+            "courses": len(self._course_index)
+        }
+
+
+def create_repository():
+    """
+    Build the repository selected by environment variables
+
+    STORAGE_BACKEND: "memory" (default) or "sqlite"
+    STORAGE_DB_PATH: SQLite file for the sqlite backend (default hr.db)
+    STORAGE_POOL_SIZE: Pooled SQLite connections (default 4)
+    STORAGE_SEED: "false" skips loading the mock data into an empty database (default true)
+    """
+    backend = os.getenv("STORAGE_BACKEND", "memory").lower()
+
+    if backend == "sqlite":
+        repository = SQLiteRepository(
+            path=os.getenv("STORAGE_DB_PATH", "hr.db"),
+            pool_size=int(os.getenv("STORAGE_POOL_SIZE", 4))
+        )
+        if os.getenv("STORAGE_SEED", "true").lower() != "false":
+            repository.seed(
+                mock_data.mock_new_hires_db.values(),
+                mock_data.mock_onboarding_tasks,
+                mock_data.mock_team_db,
+                mock_data.mock_leave_db,
+                mock_data.mock_training_db
+            )
+        return repository
+    if backend != "memory":
+        raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+    return InMemoryRepository()
@@ -0,0 +1,141 @@
+"""
+Response cache for /api/chat
+Reuses answers to repeated self-contained questions until the data they depend on changes
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from prompt_cache import content_hash
+from text_utils import normalize_text
+
+
+# Tools that change data or send messages - turns calling them are never cached
+MUTATING_TOOLS = {"update_task_status", "send_introduction_message"}
+
+
+class ResponseCache:
+    """
+    TTL + LRU cache of assistant responses
+
+    Keys combine the normalized user message, the employee, the version stamps
+    the answer depends on (the employee's own data version and the shared
+    knowledge and directory versions, see app.data_versions()) and the
+    conversation context the message may refer to. A change to the employee's
+    tasks or a knowledge base reload moves a stamp on, so entries computed
+    before it are never served again and age out through LRU eviction; other
+    employees' task updates leave them alone.
+
+    Longer follow-ups ("tóm tắt lại cuộc trò chuyện", "còn cái thứ hai thì sao")
+    depend on the conversation too, so the context - the running summary and
+    the last assistant answer - is part of the key: a first-turn question is
+    shared across sessions, a follow-up only with conversations in the same
+    state. Short messages ("có", "ok", "T01") are not cached at all; only
+    messages with at least min_tokens words are.
+    """
+
+    def __init__(self, max_entries=1000, ttl_seconds=600, min_tokens=3, enabled=True):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.min_tokens = min_tokens
+        self.enabled = enabled
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def key(self, message, employee_id, data_version, context=None):
+        """
+        Build the cache key for a message
+
+        Args:
+            message: Raw user message
+            employee_id: Employee the conversation is about
+            data_version: JSON-serializable version stamp(s) the answer depends on
+            context: JSON-serializable conversation context (see app.conversation_context())
+
+        Returns:
+            str: Cache key, or None if the message should not be cached
+        """
+        if not self.enabled:
+            return None
+        normalized = normalize_text(message)
+        if len(normalized.split()) < self.min_tokens:
+            return None
+        return content_hash([normalized, employee_id, data_version, context])
+
+    def get(self, key):
+        """Return the cached response for a key, or None"""
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry["stored_at"] > self.ttl_seconds:
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry["response"]
+
+    def put(self, key, response, tools_called=()):
+        """
+        Store a response unless the turn changed data
+
+        Args:
+            key: Key from key() (None is ignored)
+            response: Assistant response dict
+            tools_called: Names of the tools the turn executed
+        """
+        if key is None or MUTATING_TOOLS.intersection(tools_called):
+            return
+        with self._lock:
+            self._entries[key] = {"response": response, "stored_at": time.time()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return hit/miss counters for monitoring"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
+
+
+def create_response_cache():
+    """
+    Build the response cache from environment variables
+
+    RESPONSE_CACHE_ENABLED: "false" disables caching (default true)
+    RESPONSE_CACHE_MAX_ENTRIES: Maximum cached responses (default 1000)
+    RESPONSE_CACHE_TTL_SECONDS: Lifetime of a cached response (default 600)
+    RESPONSE_CACHE_MIN_TOKENS: Shortest cacheable message in words (default 3)
+    """
+    return ResponseCache(
+        max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 1000)),
+        ttl_seconds=int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", 600)),
+        min_tokens=int(os.getenv("RESPONSE_CACHE_MIN_TOKENS", 3)),
+        enabled=os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() != "false"
+    )
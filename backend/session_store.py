@@ -0,0 +1,240 @@
+"""
+Server-side conversation sessions
+Keeps chat history on the backend so clients only send the new user message per turn
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+
+def new_session(session_id=None):
+    """
+    Create an empty session record
+
+    Args:
+        session_id: Optional ID to use (a random one is generated otherwise)
+
+    Returns:
+        dict: Session with id, employee, message history and timestamps
+    """
+    now = time.time()
+    return {
+        "session_id": session_id or uuid.uuid4().hex,
+        # Employee the conversation is about, fixed on the first turn (see app.session_employee)
+        "employee_id": None,
+        "messages": [],
+        "created_at": now,
+        "updated_at": now
+    }
+
+
+class SessionStore(ABC):
+    """
+    Interface for session backends
+
+    Sessions are plain JSON-serializable dicts (see new_session()). The system
+    prompt is never stored - it is injected from the prompt cache on each turn.
+    """
+
+    @abstractmethod
+    def get(self, session_id):
+        """Return the session dict, or None if it does not exist or has expired"""
+
+    @abstractmethod
+    def save(self, session):
+        """Insert or replace a session"""
+
+    @abstractmethod
+    def delete(self, session_id):
+        """Remove a session; returns True if it existed"""
+
+    @abstractmethod
+    def stats(self):
+        """Return backend statistics for monitoring"""
+
+    def get_or_create(self, session_id=None):
+        """
+        Load an existing session or start a new one
+
+        Args:
+            session_id: Session ID sent by the client (may be None)
+
+        Returns:
+            dict: Existing session, or a fresh one if the ID is missing/expired
+        """
+        if session_id:
+            session = self.get(session_id)
+            if session is not None:
+                return session
+        return new_session()
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    Process-local session store with TTL expiry and LRU eviction
+
+    Sessions idle for longer than ttl_seconds are dropped, and once max_sessions
+    is reached the least recently used session is evicted.
+    """
+
+    def __init__(self, max_sessions=10000, ttl_seconds=3600):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def _expired(self, session, now):
+        return self.ttl_seconds and now - session["updated_at"] > self.ttl_seconds
+
+    def get(self, session_id):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            if self._expired(session, time.time()):
+                del self._sessions[session_id]
+                self.expirations += 1
+                return None
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def save(self, session):
+        session["updated_at"] = time.time()
+        with self._lock:
+            self._sessions[session["session_id"]] = session
+            self._sessions.move_to_end(session["session_id"])
+            self._purge(session["updated_at"])
+
+    def _purge(self, now):
+        # Oldest entries sit at the front, so expired sessions are found first
+        while self._sessions:
+            oldest_id, oldest = next(iter(self._sessions.items()))
+            if self._expired(oldest, now):
+                self.expirations += 1
+            elif len(self._sessions) > self.max_sessions:
+                self.evictions += 1
+            else:
+                break
+            del self._sessions[oldest_id]
+
+    def delete(self, session_id):
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": "memory",
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "ttl_seconds": self.ttl_seconds,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Persistent session store backed by SQLite
+
+    Sessions survive restarts and can be shared by several worker processes on
+    the same host. Expired rows are purged opportunistically on write.
+    """
+
+    def __init__(self, path="sessions.db", ttl_seconds=3600, purge_interval=60):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.purge_interval = purge_interval
+        self._last_purge = 0.0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " session_id TEXT PRIMARY KEY,"
+            " data TEXT NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_sessions_updated_at ON sessions (updated_at)"
+        )
+
+    def get(self, session_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, updated_at FROM sessions WHERE session_id = ?",
+                (session_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        if self.ttl_seconds and time.time() - row[1] > self.ttl_seconds:
+            self.delete(session_id)
+            return None
+        return json.loads(row[0])
+
+    def save(self, session):
+        now = time.time()
+        session["updated_at"] = now
+        data = json.dumps(session, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, data, updated_at) VALUES (?, ?, ?)",
+                (session["session_id"], data, now)
+            )
+            if self.ttl_seconds and now - self._last_purge > self.purge_interval:
+                self._conn.execute(
+                    "DELETE FROM sessions WHERE updated_at < ?",
+                    (now - self.ttl_seconds,)
+                )
+                self._last_purge = now
+
+    def delete(self, session_id):
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM sessions WHERE session_id = ?", (session_id,)
+            )
+            return cursor.rowcount > 0
+
+    def stats(self):
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "sessions": count,
+            "ttl_seconds": self.ttl_seconds
+        }
+
+
+def create_session_store():
+    """
+    Build the session store selected by environment variables
+
+    SESSION_BACKEND: "memory" (default) or "sqlite"
+    SESSION_TTL_SECONDS: Idle timeout (default 3600)
+    SESSION_MAX_COUNT: LRU capacity of the memory backend (default 10000)
+    SESSION_DB_PATH: SQLite file for the sqlite backend (default sessions.db)
+    """
+    backend = os.getenv("SESSION_BACKEND", "memory").lower()
+    ttl_seconds = int(os.getenv("SESSION_TTL_SECONDS", 3600))
+
+    if backend == "sqlite":
+        return SQLiteSessionStore(
+            path=os.getenv("SESSION_DB_PATH", "sessions.db"),
+            ttl_seconds=ttl_seconds
+        )
+    if backend != "memory":
+        raise ValueError(f"Unknown SESSION_BACKEND: {backend}")
+
+    return InMemorySessionStore(
+        max_sessions=int(os.getenv("SESSION_MAX_COUNT", 10000)),
+        ttl_seconds=ttl_seconds
+    )
@@ -0,0 +1,119 @@
+"""
+Helpers for streaming chat responses over Server-Sent Events (SSE)
+"""
+
+import json
+
+
+def sse_event(event, data):
+    """
+    Encode one Server-Sent Event
+
+    Args:
+        event: Event name (e.g. "token", "tool_started")
+        data: JSON-serializable payload
+
+    Returns:
+        str: Wire-format SSE frame
+    """
+    payload = json.dumps(data, ensure_ascii=False)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+_ESCAPES = {
+    '"': '"',
+    "\\": "\\",
+    "/": "/",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t"
+}
+
+
+class JSONStringFieldStreamer:
+    """
+    Incrementally extracts one string field from a JSON object being streamed
+
+    The format_user_response arguments arrive as JSON fragments, e.g.
+    '{"main_', 'answer": "Xin ', 'chào\\n', '..."'. feed() returns the newly
+    decoded characters of the field value so they can be forwarded as soon
+    as the model produces them.
+    """
+
+    def __init__(self, field):
+        self._key = f'"{field}"'
+        self._buffer = ""
+        self._pos = None  # index of the next undecoded value character
+        self._pending_high = None  # high surrogate waiting for its pair
+        self.done = False
+
+    def feed(self, chunk):
+        """
+        Add a fragment of the JSON document
+
+        Args:
+            chunk: Next piece of the streamed arguments string
+
+        Returns:
+            str: Newly decoded text of the field (may be empty)
+        """
+        self._buffer += chunk
+        if self.done:
+            return ""
+
+        if self._pos is None and not self._find_value_start():
+            return ""
+
+        out = []
+        buffer = self._buffer
+        pos = self._pos
+        while pos < len(buffer):
+            char = buffer[pos]
+            if char == '"':
+                self.done = True
+                pos += 1
+                break
+            if char != "\\":
+                out.append(char)
+                pos += 1
+                continue
+
+            # Escape sequence - wait until it is complete
+            if pos + 1 >= len(buffer):
+                break
+            code = buffer[pos + 1]
+            if code != "u":
+                out.append(_ESCAPES.get(code, code))
+                pos += 2
+                continue
+            if pos + 6 > len(buffer):
+                break
+            out.append(self._decode_unicode(int(buffer[pos + 2:pos + 6], 16)))
+            pos += 6
+
+        self._pos = pos
+        return "".join(out)
+
+    def _find_value_start(self):
+        key_index = self._buffer.find(self._key)
+        if key_index == -1:
+            return False
+        index = key_index + len(self._key)
+        # Skip whitespace and the colon up to the opening quote
+        while index < len(self._buffer) and self._buffer[index] in " \t\r\n:":
+            index += 1
+        if index >= len(self._buffer) or self._buffer[index] != '"':
+            return False
+        self._pos = index + 1
+        return True
+
+    def _decode_unicode(self, code_point):
+        if 0xD800 <= code_point <= 0xDBFF:
+            self._pending_high = code_point
+            return ""
+        if 0xDC00 <= code_point <= 0xDFFF and self._pending_high is not None:
+            high, self._pending_high = self._pending_high, None
+            return chr(0x10000 + ((high - 0xD800) << 10) + (code_point - 0xDC00))
+        return chr(code_point)
@@ -0,0 +1,119 @@
+"""
+Global task index
+Maps task_id -> (employee_id, task) for O(1) task lookups across all employees
+"""
+
+import threading
+
+
+class DuplicateTaskIdError(ValueError):
+    """Raised when a task ID is already used by another task"""
+
+    def __init__(self, task_id, employee_id):
+        super().__init__(f"Task ID {task_id} đã tồn tại (nhân viên {employee_id})")
+        self.task_id = task_id
+        self.employee_id = employee_id
+
+
+class TaskIndex:
+    """
+    Index over a {employee_id: [task, ...]} mapping
+
+    Owns all structural changes to the mapping (insert/delete go through the
+    index, so the two never diverge) and enforces that task IDs are unique
+    across employees. The index holds references to the task dicts, so field
+    updates made on a task returned by get() are visible in both.
+    """
+
+    def __init__(self, tasks_by_employee):
+        """
+        Args:
+            tasks_by_employee: Dict of employee_id -> list of task dicts,
+                updated in place by insert() and delete()
+
+        Raises:
+            DuplicateTaskIdError: If two existing tasks share an ID
+        """
+        self._tasks_by_employee = tasks_by_employee
+        self._lock = threading.Lock()
+        self._by_id = {}
+        for employee_id, tasks in tasks_by_employee.items():
+            for task in tasks:
+                self._check_unique(task["task_id"])
+                self._by_id[task["task_id"]] = (employee_id, task)
+
+    def _check_unique(self, task_id):
+        existing = self._by_id.get(task_id)
+        if existing is not None:
+            raise DuplicateTaskIdError(task_id, existing[0])
+
+    def get(self, task_id):
+        """
+        Look up a task by ID
+
+        Returns:
+            tuple: (employee_id, task dict), or None if the ID is unknown
+        """
+        return self._by_id.get(task_id)
+
+    def insert(self, employee_id, task):
+        """
+        Add a task to an employee's list
+
+        Raises:
+            DuplicateTaskIdError: If the task ID is already in use
+        """
+        with self._lock:
+            self._check_unique(task["task_id"])
+            self._tasks_by_employee.setdefault(employee_id, []).append(task)
+            self._by_id[task["task_id"]] = (employee_id, task)
+
+    def upsert(self, employee_id, task):
+        """
+        Insert a task, or replace the task with the same ID
+
+        A replaced task keeps its place in the list; if it now belongs to
+        another employee it is moved to the end of that employee's list.
+
+        Returns:
+            bool: True if the task was new
+        """
+        with self._lock:
+            entry = self._by_id.get(task["task_id"])
+            if entry is not None:
+                old_employee_id, old_task = entry
+                tasks = self._tasks_by_employee.get(old_employee_id, [])
+                position = next(i for i, candidate in enumerate(tasks) if candidate is old_task)
+                if old_employee_id == employee_id:
+                    tasks[position] = task
+                    self._by_id[task["task_id"]] = (employee_id, task)
+                    return False
+                del tasks[position]
+            self._tasks_by_employee.setdefault(employee_id, []).append(task)
+            self._by_id[task["task_id"]] = (employee_id, task)
+            return entry is None
+
+    def delete(self, task_id):
+        """
+        Remove a task from its employee's list
+
+        Returns:
+            tuple: (employee_id, removed task), or None if the ID is unknown
+        """
+        with self._lock:
+            entry = self._by_id.pop(task_id, None)
+            if entry is None:
+                return None
+            employee_id, task = entry
+            tasks = self._tasks_by_employee.get(employee_id, [])
+            for position, candidate in enumerate(tasks):
+                if candidate is task:
+                    del tasks[position]
+                    break
+            return entry
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __contains__(self, task_id):
+        return task_id in self._by_id
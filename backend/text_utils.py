@@ -0,0 +1,37 @@
+"""
+Text normalization helpers for Vietnamese input
+Diacritic folding so "dao tao", "Đào tạo" and "đào tạo" compare equal
+"""
+
+import re
+import unicodedata
+
+_NON_WORD = re.compile(r"[^\w]+", re.UNICODE)
+
+
+def fold_diacritics(text):
+    """
+    Remove Vietnamese diacritics
+
+    Args:
+        text: Input string (e.g. "Nguyễn Văn An")
+
+    Returns:
+        str: Folded string (e.g. "Nguyen Van An")
+    """
+    # đ/Đ are separate letters, not a base letter + combining mark
+    text = text.replace("đ", "d").replace("Đ", "D")
+    decomposed = unicodedata.normalize("NFD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def normalize_text(text):
+    """Lowercase, fold diacritics, and collapse punctuation/whitespace to single spaces"""
+    folded = fold_diacritics((text or "").lower())
+    return _NON_WORD.sub(" ", folded).strip()
+
+
+def tokenize(text):
+    """Split text into normalized word tokens"""
+    normalized = normalize_text(text)
+    return normalized.split() if normalized else []
@@ -0,0 +1,209 @@
+"""
+LLM token usage accounting
+Aggregates prompt / completion / cached tokens of every completion call per day,
+employee and tool path, flushes the totals to a JSONL file periodically and
+enforces optional per-employee daily token budgets
+"""
+
+import json
+import os
+import threading
+from datetime import date, datetime, timedelta
+
+
+COUNTERS = ("calls", "prompt_tokens", "completion_tokens", "cached_tokens", "total_tokens")
+
+# Budget states, from cheapest to most restricted
+BUDGET_OK = "ok"
+BUDGET_SOFT = "soft"  # over the soft budget: shorter agent loop, shorter answers
+BUDGET_HARD = "hard"  # over the hard budget: cache and intent router only, no LLM calls
+
+
+def empty_counts():
+    return dict.fromkeys(COUNTERS, 0)
+
+
+def usage_counts(usage):
+    """
+    Token counts of one completion call
+
+    Args:
+        usage: The `usage` object of a chat completion (or None)
+
+    Returns:
+        dict: One call's counters (tokens are 0 if the response had no usage)
+    """
+    counts = empty_counts()
+    counts["calls"] = 1
+    if usage is None:
+        return counts
+    counts["prompt_tokens"] = usage.prompt_tokens or 0
+    counts["completion_tokens"] = usage.completion_tokens or 0
+    counts["total_tokens"] = usage.total_tokens or counts["prompt_tokens"] + counts["completion_tokens"]
+    details = getattr(usage, "prompt_tokens_details", None)
+    counts["cached_tokens"] = getattr(details, "cached_tokens", None) or 0
+    return counts
+
+
+def add_counts(totals, counts):
+    for counter in COUNTERS:
+        totals[counter] = totals.get(counter, 0) + counts.get(counter, 0)
+    return totals
+
+
+class UsageLedger:
+    """
+    In-memory token totals keyed by (day, employee id, tool path)
+
+    The tool path names the tools a turn went through, e.g.
+    "update_task_status+get_next_task", or "direct" when the model answered
+    without tools, so expensive multi-step workflows stand out.
+
+    New usage is also kept as pending deltas that flush() appends to a JSONL
+    file; on startup the file is read back, so daily budgets survive restarts.
+    """
+
+    def __init__(self, path=None, soft_budget=0, hard_budget=0):
+        """
+        Args:
+            path: JSONL file for flushed totals (None keeps usage in memory only)
+            soft_budget: Tokens per employee per day before answers get cheaper (0 = off)
+            hard_budget: Tokens per employee per day before LLM calls stop (0 = off)
+        """
+        self.path = path
+        self.soft_budget = soft_budget
+        self.hard_budget = hard_budget
+        self._lock = threading.Lock()
+        self._totals = {}    # (day, employee id, path) -> counters
+        self._pending = {}   # same keys, not yet flushed
+        self._employee_day = {}  # (day, employee id) -> total tokens, for budget checks
+        self.flushes = 0
+        self.last_flush = None
+        if path and os.path.exists(path):
+            self._load()
+
+    def _load(self):
+        with open(self.path, encoding="utf-8") as file:
+            for line_number, line in enumerate(file, 1):
+                try:
+                    record = json.loads(line)
+                    key = (record["day"], record["employee_id"], record["path"])
+                except (ValueError, KeyError):
+                    print(f"⚠️  Skipping malformed token usage line {line_number} in {self.path}")
+                    continue
+                self._add(key, record)
+
+    def _add(self, key, counts):
+        add_counts(self._totals.setdefault(key, empty_counts()), counts)
+        day_key = key[:2]
+        self._employee_day[day_key] = self._employee_day.get(day_key, 0) + counts.get("total_tokens", 0)
+
+    def record(self, employee_id, path, counts):
+        """Book the token counts of one turn (or one call); empty counts are ignored"""
+        if not counts or not counts.get("calls"):
+            return
+        key = (date.today().isoformat(), employee_id or "unknown", path)
+        with self._lock:
+            self._add(key, counts)
+            add_counts(self._pending.setdefault(key, empty_counts()), counts)
+
+    def tokens_today(self, employee_id):
+        with self._lock:
+            return self._employee_day.get((date.today().isoformat(), employee_id), 0)
+
+    def budget_state(self, employee_id):
+        """BUDGET_OK, BUDGET_SOFT or BUDGET_HARD for an employee's usage today"""
+        if not self.soft_budget and not self.hard_budget:
+            return BUDGET_OK
+        used = self.tokens_today(employee_id)
+        if self.hard_budget and used >= self.hard_budget:
+            return BUDGET_HARD
+        if self.soft_budget and used >= self.soft_budget:
+            return BUDGET_SOFT
+        return BUDGET_OK
+
+    def flush(self):
+        """
+        Append pending totals to the usage file
+
+        Returns:
+            int: Number of records written
+        """
+        if not self.path:
+            return 0
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        flushed_at = datetime.now().isoformat(timespec="seconds")
+        try:
+            with open(self.path, "a", encoding="utf-8") as file:
+                for (day, employee_id, path), counts in pending.items():
+                    record = dict(counts, day=day, employee_id=employee_id, path=path, flushed_at=flushed_at)
+                    file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError:
+            # Keep the deltas for the next attempt
+            with self._lock:
+                for key, counts in pending.items():
+                    add_counts(self._pending.setdefault(key, empty_counts()), counts)
+            raise
+        with self._lock:
+            self.flushes += 1
+            self.last_flush = flushed_at
+        return len(pending)
+
+    def report(self, days=1, employee_id=None):
+        """
+        Token totals of the last `days` days, overall and grouped by day, employee and tool path
+
+        Args:
+            days: Number of days including today
+            employee_id: Only this employee's usage
+        """
+        first_day = (date.today() - timedelta(days=max(days, 1) - 1)).isoformat()
+        totals = empty_counts()
+        by_day, by_employee, by_path = {}, {}, {}
+        with self._lock:
+            for (day, employee, path), counts in self._totals.items():
+                if day < first_day or (employee_id and employee != employee_id):
+                    continue
+                add_counts(totals, counts)
+                add_counts(by_day.setdefault(day, empty_counts()), counts)
+                add_counts(by_employee.setdefault(employee, empty_counts()), counts)
+                add_counts(by_path.setdefault(path, empty_counts()), counts)
+        return {
+            "since": first_day,
+            "totals": totals,
+            "by_day": dict(sorted(by_day.items())),
+            "by_employee": dict(sorted(by_employee.items(), key=lambda item: -item[1]["total_tokens"])),
+            "by_path": dict(sorted(by_path.items(), key=lambda item: -item[1]["total_tokens"]))
+        }
+
+    def stats(self):
+        """Return ledger configuration and flush state for monitoring"""
+        with self._lock:
+            today = date.today().isoformat()
+            return {
+                "file": self.path,
+                "soft_budget": self.soft_budget,
+                "hard_budget": self.hard_budget,
+                "tokens_today": sum(tokens for (day, _), tokens in self._employee_day.items() if day == today),
+                "pending_records": len(self._pending),
+                "flushes": self.flushes,
+                "last_flush": self.last_flush
+            }
+
+
+def create_usage_ledger():
+    """
+    Build the usage ledger from environment variables
+
+    TOKEN_USAGE_FILE: JSONL file the totals are flushed to (default: memory only)
+    TOKEN_BUDGET_SOFT: Daily tokens per employee before answers get cheaper (default 0 = off)
+    TOKEN_BUDGET_HARD: Daily tokens per employee before LLM calls stop (default 0 = off)
+    """
+    return UsageLedger(
+        path=os.getenv("TOKEN_USAGE_FILE") or None,
+        soft_budget=int(os.getenv("TOKEN_BUDGET_SOFT", 0)),
+        hard_budget=int(os.getenv("TOKEN_BUDGET_HARD", 0))
+    )
@@ -0,0 +1,265 @@
+"""
+Tool registry for LLM function calling
+Dispatches tool calls by name, validates their arguments against the JSON schemas in
+FUNCTION_DEFINITIONS and records per-tool call counts, timeouts and latency histograms
+"""
+
+import asyncio
+import inspect
+import json
+import os
+import threading
+import time
+
+from metrics import LatencyHistogram, counter_lines, histogram_lines
+
+
+# JSON schema type -> accepted Python types (bool is an int subclass, so it is excluded explicitly)
+SCHEMA_TYPES = {
+    "string": (str,),
+    "integer": (int,),
+    "number": (int, float),
+    "boolean": (bool,),
+    "array": (list,),
+    "object": (dict,)
+}
+
+
+def compile_validator(parameters):
+    """
+    Turn a tool's JSON parameter schema into an argument validator
+
+    Only the subset of JSON schema used by FUNCTION_DEFINITIONS is supported:
+    top-level properties with "type", "enum", "minimum", "maximum" and
+    "required". Enum values are matched case-insensitively and returned in their
+    canonical spelling, and integers sent as numeric strings are converted, since
+    models do both.
+    Unknown arguments and nulls for optional arguments are dropped, so the
+    function's own defaults apply.
+
+    Returns:
+        callable: validate(arguments) -> (keyword arguments, error message or None)
+    """
+    properties = parameters.get("properties", {})
+    required = set(parameters.get("required", []))
+    checks = {}
+    for name, schema in properties.items():
+        types = SCHEMA_TYPES.get(schema.get("type"))
+        enum = {str(value).lower(): value for value in schema.get("enum", [])}
+        checks[name] = (schema.get("type"), types, enum, schema.get("minimum"), schema.get("maximum"))
+
+    def validate(arguments):
+        if not isinstance(arguments, dict):
+            return None, "arguments must be a JSON object"
+        kwargs = {}
+        for name, (type_name, types, enum, minimum, maximum) in checks.items():
+            value = arguments.get(name)
+            if value is None:
+                if name in required:
+                    return None, f"missing required argument '{name}'"
+                continue
+            if type_name == "integer" and isinstance(value, str) and value.strip().lstrip("-").isdigit():
+                value = int(value)
+            if types and (not isinstance(value, types) or (isinstance(value, bool) and bool not in types)):
+                return None, f"'{name}' must be of type {type_name}"
+            if minimum is not None and value < minimum:
+                return None, f"'{name}' must be >= {minimum}"
+            if maximum is not None and value > maximum:
+                return None, f"'{name}' must be <= {maximum}"
+            if enum:
+                canonical = enum.get(str(value).lower())
+                if canonical is None:
+                    return None, f"'{name}' must be one of: {', '.join(map(str, enum.values()))}"
+                value = canonical
+            kwargs[name] = value
+        return kwargs, None
+
+    return validate
+
+
+class Tool:
+    """A registered tool: implementation, compiled validator, timeout and metrics"""
+
+    def __init__(self, name, func, validate, timeout):
+        self.name = name
+        self.func = func
+        self.validate = validate
+        self.timeout = timeout
+        self.calls = 0
+        self.errors = 0
+        self.invalid_arguments = 0
+        self.timeouts = 0
+        self.latency = LatencyHistogram()
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "invalid_arguments": self.invalid_arguments,
+            "timeouts": self.timeouts,
+            "timeout_seconds": self.timeout,
+            "latency": self.latency.snapshot()
+        }
+
+
+class ToolRegistry:
+    """
+    Name -> tool dispatch built once from the function definitions
+
+    Every definition must have an implementation whose parameters cover the
+    schema's properties; this is checked at startup so a renamed argument
+    fails loudly instead of being silently dropped on every call.
+
+    execute() is synchronous (it runs inside the tool thread pool);
+    execute_async() additionally enforces the tool's timeout. A timed-out
+    call keeps running in its worker thread - Python threads cannot be
+    killed - but the caller gets an error result right away.
+    """
+
+    def __init__(self, definitions, implementations, default_timeout=10.0, timeouts=None):
+        """
+        Args:
+            definitions: Function definitions (name, parameters JSON schema)
+            implementations: Dict of name -> callable
+            default_timeout: Seconds before a tool call is abandoned
+            timeouts: Optional dict of name -> seconds overriding default_timeout
+        """
+        timeouts = timeouts or {}
+        self._lock = threading.Lock()
+        self.tools = {}
+        for definition in definitions:
+            name = definition["name"]
+            func = implementations.get(name)
+            if func is None:
+                raise ValueError(f"No implementation for tool '{name}'")
+            parameters = definition.get("parameters", {})
+            accepted = inspect.signature(func).parameters
+            missing = set(parameters.get("properties", {})) - set(accepted)
+            if missing:
+                raise ValueError(f"Tool '{name}' does not accept arguments: {', '.join(sorted(missing))}")
+            self.tools[name] = Tool(name, func, compile_validator(parameters), timeouts.get(name, default_timeout))
+        unknown = set(timeouts) - set(self.tools)
+        if unknown:
+            print(f"⚠️  TOOL_TIMEOUTS names unknown tools: {', '.join(sorted(unknown))}")
+
+    def prepare(self, name, arguments):
+        """
+        Look up a tool and validate its arguments
+
+        Args:
+            arguments: JSON string or dict
+
+        Returns:
+            tuple: (tool, keyword arguments, error result or None)
+        """
+        tool = self.tools.get(name)
+        if tool is None:
+            return None, None, {"success": False, "error": f"Unknown function: {name}"}
+        if isinstance(arguments, str):
+            try:
+                arguments = json.loads(arguments) if arguments.strip() else {}
+            except json.JSONDecodeError:
+                arguments = None
+            if arguments is None:
+                with self._lock:
+                    tool.invalid_arguments += 1
+                return tool, None, {"success": False, "error": "Invalid arguments format"}
+        kwargs, error = tool.validate(arguments)
+        if error:
+            with self._lock:
+                tool.invalid_arguments += 1
+            return tool, None, {"success": False, "error": f"Invalid arguments: {error}"}
+        return tool, kwargs, None
+
+    def invoke(self, tool, kwargs):
+        """Call a validated tool and record its latency"""
+        started = time.perf_counter()
+        failed = False
+        try:
+            result = tool.func(**kwargs)
+            failed = isinstance(result, dict) and result.get("success") is False
+            return result
+        except Exception as e:
+            failed = True
+            print(f"Error in tool {tool.name}: {e}")
+            return {"success": False, "error": f"Lỗi khi thực hiện {tool.name}"}
+        finally:
+            ms = (time.perf_counter() - started) * 1000
+            with self._lock:
+                tool.calls += 1
+                tool.errors += failed
+                tool.latency.observe(ms)
+
+    def execute(self, name, arguments):
+        """Validate and run a tool call (no timeout)"""
+        tool, kwargs, error = self.prepare(name, arguments)
+        if error:
+            return error
+        return self.invoke(tool, kwargs)
+
+    async def execute_async(self, name, arguments, run):
+        """
+        Validate and run a tool call with the tool's timeout
+
+        Args:
+            run: Coroutine function running a sync callable off the event loop
+                (app.run_tool)
+        """
+        tool, kwargs, error = self.prepare(name, arguments)
+        if error:
+            return error
+        try:
+            return await asyncio.wait_for(run(self.invoke, tool, kwargs), tool.timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                tool.timeouts += 1
+            print(f"Tool {name} timed out after {tool.timeout}s")
+            return {"success": False, "error": f"{name} không phản hồi kịp, vui lòng thử lại sau"}
+
+    def stats(self):
+        """Return per-tool call counts and latency histograms for monitoring"""
+        with self._lock:
+            return {name: tool.stats() for name, tool in self.tools.items()}
+
+    def prometheus_lines(self):
+        """Per-tool counters and latency histograms in Prometheus text format"""
+        with self._lock:
+            tools = [({"tool": name}, tool) for name, tool in self.tools.items()]
+            lines = []
+            for metric, attribute, description in (
+                ("hr_tool_calls_total", "calls", "Tool calls executed"),
+                ("hr_tool_errors_total", "errors", "Tool calls that failed or returned success=false"),
+                ("hr_tool_timeouts_total", "timeouts", "Tool calls abandoned after their timeout"),
+                ("hr_tool_invalid_arguments_total", "invalid_arguments", "Tool calls rejected by argument validation")
+            ):
+                lines += counter_lines(metric, description, [(labels, getattr(tool, attribute)) for labels, tool in tools])
+            lines += histogram_lines(
+                "hr_tool_duration_seconds", "Tool execution time",
+                [(labels, tool.latency) for labels, tool in tools]
+            )
+            return lines
+
+
+def parse_timeouts(value):
+    """Parse "name=seconds,name=seconds" into a dict"""
+    timeouts = {}
+    for item in (value or "").split(","):
+        if "=" in item:
+            name, seconds = item.split("=", 1)
+            timeouts[name.strip()] = float(seconds)
+    return timeouts
+
+
+def create_tool_registry(definitions, implementations):
+    """
+    Build the tool registry from environment variables
+
+    TOOL_TIMEOUT_SECONDS: Default per-call timeout (default 10)
+    TOOL_TIMEOUTS: Per-tool overrides, e.g. "get_team_meetings=3,search_training_courses=5"
+    """
+    return ToolRegistry(
+        definitions,
+        implementations,
+        default_timeout=float(os.getenv("TOOL_TIMEOUT_SECONDS", 10)),
+        timeouts=parse_timeouts(os.getenv("TOOL_TIMEOUTS"))
+    )
@@ -0,0 +1,297 @@
+"""
+Request tracing
+Times each request and its steps (prompt build, LLM calls, tool calls, JSON serialization)
+as nested spans, aggregates them into Prometheus histograms for /api/metrics and can
+append every finished trace to a file in the OTLP/JSON format
+"""
+
+import functools
+import json
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from metrics import LatencyHistogram, counter_lines, histogram_lines
+
+
+# Span the current code runs in (None outside a traced request)
+_current_span = ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed operation; spans of a request share a trace id"""
+
+    def __init__(self, name, trace_id, parent=None, attributes=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.root = parent.root if parent else self
+        self.attributes = dict(attributes or {})
+        self.error = None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self._started = time.perf_counter()
+        self.duration_ms = None
+        # Finished spans of the whole request, collected on the root span
+        self.children = [] if parent is None else None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def finish(self):
+        self.duration_ms = (time.perf_counter() - self._started) * 1000
+        self.end_ns = self.start_ns + int(self.duration_ms * 1_000_000)
+        # A background task outliving its request (e.g. a summary) only feeds the histograms
+        if self.root is not self and self.root.end_ns is None:
+            self.root.children.append(self)
+
+    def to_otlp(self):
+        """Span in the OTLP/JSON encoding"""
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 2 if self.parent_id is None else 1,  # SERVER / INTERNAL
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [otlp_attribute(key, value) for key, value in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1}
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def otlp_attribute(key, value):
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class TraceFileExporter:
+    """
+    Appends finished traces to a file, one OTLP/JSON ExportTraceServiceRequest per line
+    (the format the OpenTelemetry Collector's file exporter writes and otlpjsonfile reads)
+
+    Writes happen on a background thread so request handlers never wait on disk.
+    """
+
+    def __init__(self, path, service_name):
+        self.path = path
+        self.resource = {"attributes": [otlp_attribute("service.name", service_name)]}
+        self.exported = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=10000)
+        self._thread = threading.Thread(target=self._write_loop, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, root):
+        try:
+            self._queue.put_nowait(root)
+        except queue.Full:
+            self.dropped += 1
+
+    def _write_loop(self):
+        while True:
+            root = self._queue.get()
+            request = {
+                "resourceSpans": [{
+                    "resource": self.resource,
+                    "scopeSpans": [{
+                        "scope": {"name": "onboarding-chatbot"},
+                        "spans": [span.to_otlp() for span in [root] + root.children]
+                    }]
+                }]
+            }
+            try:
+                with open(self.path, "a", encoding="utf-8") as file:
+                    file.write(json.dumps(request, ensure_ascii=False) + "\n")
+                self.exported += 1
+            except OSError as e:
+                self.dropped += 1
+                print(f"Error exporting trace: {str(e)}")
+
+
+class Tracer:
+    """
+    Per-request spans plus latency histograms per request name and span name
+
+    Usage:
+        @app.route('/api/chat', methods=['POST'])
+        @tracer.traced("/api/chat")
+        async def chat(): ...
+
+        with tracer.span("llm.completion", step=1):
+            response = await client.chat.completions.create(...)
+
+        async def generate():  # streamed response body
+            with tracer.request("/api/chat/stream"):
+                ...
+
+    The current span is kept in a ContextVar, so spans opened in concurrent
+    tasks (asyncio.gather of tool calls) still attach to the right request.
+    Spans opened outside a traced request only feed the histograms.
+    """
+
+    def __init__(self, enabled=True, exporter=None):
+        """
+        Args:
+            enabled: If False, spans are not recorded at all
+            exporter: Optional TraceFileExporter receiving every finished request
+        """
+        self.enabled = enabled
+        self.exporter = exporter
+        self._lock = threading.Lock()
+        self._requests = {}  # (request name, status class) -> LatencyHistogram
+        self._spans = {}     # span name -> LatencyHistogram
+        self._span_errors = {}  # span name -> count
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Time a block as a child of the current span"""
+        if not self.enabled:
+            yield None
+            return
+        parent = _current_span.get()
+        span = Span(name, parent.trace_id if parent else None, parent, attributes)
+        token = _current_span.set(span) if parent else None
+        try:
+            yield span
+        except BaseException as e:
+            span.error = str(e) or type(e).__name__
+            raise
+        finally:
+            if token is not None:
+                _current_span.reset(token)
+            span.finish()
+            with self._lock:
+                histogram = self._spans.get(name)
+                if histogram is None:
+                    histogram = self._spans[name] = LatencyHistogram()
+                histogram.observe(span.duration_ms)
+                if span.error:
+                    self._span_errors[name] = self._span_errors.get(name, 0) + 1
+
+    def annotate(self, **attributes):
+        """Add attributes to the current span (no-op outside a traced request)"""
+        span = _current_span.get()
+        if span is not None:
+            span.set(**attributes)
+
+    @contextmanager
+    def request(self, name):
+        """
+        Root span of a request trace
+
+        traced() wraps a handler in one; a handler that returns a streamed body
+        opens it inside the body generator instead, so the trace ends with the stream.
+        Set the "http.status_code" attribute on the yielded span to change the
+        recorded status (default 200, 500 if the block raises).
+        """
+        if not self.enabled:
+            yield None
+            return
+        root = Span(name, os.urandom(16).hex(), attributes={"http.route": name, "http.status_code": 200})
+        token = _current_span.set(root)
+        try:
+            yield root
+        except BaseException as e:
+            root.error = str(e) or type(e).__name__
+            root.set(**{"http.status_code": 500})
+            raise
+        finally:
+            try:
+                _current_span.reset(token)
+            except ValueError:  # a streamed body closed from another context (client disconnect)
+                pass
+            status = root.attributes["http.status_code"]
+            if status >= 500 and root.error is None:
+                root.error = f"HTTP {status}"
+            root.finish()
+            self._record_request(name, status, root)
+
+    def traced(self, name):
+        """Decorator making an async route handler the root span of a request trace"""
+        def decorator(handler):
+            @functools.wraps(handler)
+            async def wrapper(*args, **kwargs):
+                with self.request(name) as root:
+                    result = await handler(*args, **kwargs)
+                    if root is not None:
+                        response = result[0] if isinstance(result, tuple) else result
+                        status = result[1] if isinstance(result, tuple) and len(result) > 1 else getattr(response, "status_code", 200)
+                        root.set(**{"http.status_code": status})
+                    return result
+            return wrapper
+        return decorator
+
+    def _record_request(self, name, status, root):
+        key = (name, f"{status // 100}xx")
+        with self._lock:
+            histogram = self._requests.get(key)
+            if histogram is None:
+                histogram = self._requests[key] = LatencyHistogram()
+            histogram.observe(root.duration_ms)
+        if self.exporter:
+            self.exporter.export(root)
+
+    def prometheus_lines(self):
+        """Request and span histograms in Prometheus text format"""
+        with self._lock:
+            lines = histogram_lines(
+                "hr_request_duration_seconds", "Request latency by route and status class",
+                [({"route": name, "status": status}, histogram) for (name, status), histogram in self._requests.items()]
+            )
+            lines += histogram_lines(
+                "hr_span_duration_seconds", "Latency of request steps (prompt build, LLM calls, tools, JSON)",
+                [({"span": name}, histogram) for name, histogram in self._spans.items()]
+            )
+            lines += counter_lines(
+                "hr_span_errors_total", "Request steps that raised",
+                [({"span": name}, count) for name, count in self._span_errors.items()]
+            )
+            return lines
+
+    def stats(self):
+        """Return tracing configuration and span latency summaries for monitoring"""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "export_file": self.exporter.path if self.exporter else None,
+                "exported": self.exporter.exported if self.exporter else 0,
+                "dropped": self.exporter.dropped if self.exporter else 0,
+                "spans": {
+                    name: {
+                        "count": histogram.count,
+                        "avg_ms": round(histogram.sum_ms / histogram.count, 3),
+                        "p95_ms": histogram.quantile(0.95)
+                    }
+                    for name, histogram in self._spans.items()
+                }
+            }
+
+
+def create_tracer():
+    """
+    Build the tracer from environment variables
+
+    TRACING_ENABLED: "false" disables spans and their histograms (default true)
+    TRACE_EXPORT_FILE: Append OTLP/JSON traces to this file (default: no export)
+    TRACE_SERVICE_NAME: service.name resource attribute (default onboarding-chatbot)
+    """
+    export_file = os.getenv("TRACE_EXPORT_FILE")
+    exporter = None
+    if export_file:
+        exporter = TraceFileExporter(export_file, os.getenv("TRACE_SERVICE_NAME", "onboarding-chatbot"))
+    return Tracer(
+        enabled=os.getenv("TRACING_ENABLED", "true").lower() != "false",
+        exporter=exporter
+    )
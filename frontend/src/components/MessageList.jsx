@@ -8,6 +8,8 @@ import TypingIndicator from './TypingIndicator'
 
 const MessageList = React.memo(({ messages, isLoading, onSuggestionClick }) => {
   const messagesEndRef = useRef(null)
+  // Hide the typing indicator once the streamed answer starts to appear
+  const isWaiting = isLoading && messages[messages.length - 1]?.role !== 'assistant'
 
   // Auto-scroll to bottom when new messages arrive
   useEffect(() => {
@@ -24,7 +26,7 @@ const MessageList = React.memo(({ messages, isLoading, onSuggestionClick }) => {
           isLoading={isLoading}
         />
       ))}
-      {isLoading && <TypingIndicator />}
+      {isWaiting && <TypingIndicator />}
       <div ref={messagesEndRef} />
     </div>
   )
@@ -2,12 +2,14 @@
  * useChat Hook - Manages chat state and logic
  */
 
-import { useState, useCallback } from 'react'
-import { sendChatMessage } from '../services/chatService'
+import { useState, useCallback, useRef } from 'react'
+import { streamChatMessage, resetChatSession } from '../services/chatService'
 
 export const useChat = () => {
   const [messages, setMessages] = useState([])
   const [isLoading, setIsLoading] = useState(false)
+  // Server-side session holding the conversation history
+  const sessionIdRef = useRef(null)
 
   /**
    * Send a message to the chat
@@ -26,7 +28,19 @@ export const useChat = () => {
     setIsLoading(true)
 
     try {
-      const response = await sendChatMessage(updatedMessages)
+      // Stream the answer into a placeholder assistant message as tokens arrive
+      let streamedContent = ''
+      const response = await streamChatMessage(userMessage.content, sessionIdRef.current, {
+        onToken: (text) => {
+          streamedContent += text
+          setMessages([...updatedMessages, {
+            role: 'assistant',
+            content: streamedContent,
+            suggested_prompts: []
+          }])
+        }
+      })
+      sessionIdRef.current = response.sessionId
 
       if (response.success) {
         const assistantMessage = {
@@ -60,6 +74,10 @@ export const useChat = () => {
    * Clear all messages
    */
   const clearMessages = useCallback(() => {
+    if (sessionIdRef.current) {
+      resetChatSession(sessionIdRef.current)
+      sessionIdRef.current = null
+    }
     setMessages([])
   }, [])
 
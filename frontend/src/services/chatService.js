@@ -44,17 +44,19 @@ export const fetchGreeting = async (employeeId = DEFAULT_EMPLOYEE_ID) => {
 
 /**
  * Send chat message to backend
- * @param {Array} messages - Message history
+ * Only the new user message is sent - the history is kept server-side per session
+ * @param {string} message - New user message
+ * @param {string|null} sessionId - Session ID from a previous turn (null starts a new session)
  * @returns {Promise<Object>} Response data
  */
-export const sendChatMessage = async (messages) => {
+export const sendChatMessage = async (message, sessionId = null) => {
   try {
     const response = await fetch(`${API_URL}/chat`, {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
       },
-      body: JSON.stringify({ messages })
+      body: JSON.stringify({ message, session_id: sessionId, employee_id: DEFAULT_EMPLOYEE_ID })
     })
 
     const data = await response.json()
@@ -62,6 +64,7 @@ export const sendChatMessage = async (messages) => {
     if (data.success) {
       return {
         success: true,
+        sessionId: data.session_id,
         content: data.response.content,
         suggestedPrompts: data.response.suggested_prompts || []
       }
@@ -72,6 +75,7 @@ export const sendChatMessage = async (messages) => {
     console.error('Error sending message:', error)
     return {
       success: false,
+      sessionId,
       content: 'Xin lỗi, không thể kết nối với server. Vui lòng kiểm tra lại backend.',
       suggestedPrompts: [],
       error: error.message
@@ -79,5 +83,122 @@ export const sendChatMessage = async (messages) => {
   }
 }
 
+/**
+ * Parse Server-Sent Event frames from a text buffer
+ * @param {string} buffer - Accumulated stream text
+ * @returns {{events: Array<{event: string, data: Object}>, rest: string}} Complete events and leftover text
+ */
+const parseSseFrames = (buffer) => {
+  const frames = buffer.split('\n\n')
+  const rest = frames.pop()
+  const events = frames.map((frame) => {
+    let event = 'message'
+    let data = ''
+    frame.split('\n').forEach((line) => {
+      if (line.startsWith('event: ')) event = line.slice(7)
+      else if (line.startsWith('data: ')) data += line.slice(6)
+    })
+    return { event, data: data ? JSON.parse(data) : {} }
+  })
+  return { events, rest }
+}
+
+/**
+ * Send chat message and stream the answer as it is generated
+ * @param {string} message - New user message
+ * @param {string|null} sessionId - Session ID from a previous turn (null starts a new session)
+ * @param {Object} handlers - Callbacks: onToken(text), onToolStarted(name), onToolFinished(name)
+ * @returns {Promise<Object>} Final response data (same shape as sendChatMessage)
+ */
+export const streamChatMessage = async (message, sessionId = null, handlers = {}) => {
+  const result = {
+    success: false,
+    sessionId,
+    content: '',
+    suggestedPrompts: []
+  }
+
+  try {
+    const response = await fetch(`${API_URL}/chat/stream`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ message, session_id: sessionId, employee_id: DEFAULT_EMPLOYEE_ID })
+    })
+
+    if (!response.ok || !response.body) {
+      throw new Error('Failed to open chat stream')
+    }
+
+    const reader = response.body.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ''
+
+    while (true) {
+      const { value, done } = await reader.read()
+      if (done) break
+
+      buffer += decoder.decode(value, { stream: true })
+      const { events, rest } = parseSseFrames(buffer)
+      buffer = rest
+
+      for (const { event, data } of events) {
+        switch (event) {
+          case 'session':
+            result.sessionId = data.session_id
+            break
+          case 'tool_started':
+            handlers.onToolStarted?.(data.name)
+            break
+          case 'tool_finished':
+            handlers.onToolFinished?.(data.name)
+            break
+          case 'token':
+            result.content += data.text
+            handlers.onToken?.(data.text)
+            break
+          case 'suggested_prompts':
+            result.suggestedPrompts = data.suggested_prompts || []
+            break
+          case 'done':
+            result.success = true
+            result.content = data.content
+            break
+          case 'error':
+            throw new Error(data.error || 'Failed to send message')
+          default:
+            break
+        }
+      }
+    }
+
+    if (!result.success) {
+      throw new Error('Chat stream ended unexpectedly')
+    }
+    return result
+  } catch (error) {
+    console.error('Error streaming message:', error)
+    return {
+      ...result,
+      success: false,
+      content: result.content || 'Xin lỗi, không thể kết nối với server. Vui lòng kiểm tra lại backend.',
+      error: error.message
+    }
+  }
+}
+
+/**
+ * Discard a server-side chat session
+ * @param {string} sessionId - Session ID to delete
+ */
+export const resetChatSession = async (sessionId) => {
+  try {
+    await fetch(`${API_URL}/session/${sessionId}`, { method: 'DELETE' })
+  } catch (error) {
+    console.error('Error resetting session:', error)
+  }
+}
+
 export { DEFAULT_EMPLOYEE_ID }
 